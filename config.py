@@ -8,9 +8,120 @@ class Config:
     CLIENT_ID = os.getenv("CLIENT_ID")
     CLIENT_SECRET = os.getenv("CLIENT_SECRET")
     TENANT_ID = os.getenv("TENANT_ID")
+    # Endereços base do Microsoft Graph e do Azure AD (alterados apenas para
+    # apontar para um servidor local de testes, como fake_graph.py)
+    GRAPH_BASE_URL = os.getenv("GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0")
+    LOGIN_BASE_URL = os.getenv("LOGIN_BASE_URL", "https://login.microsoftonline.com")
     LOG_FILE = os.getenv("LOG_FILE", "/tmp/m365_meeting_reminder.log")
+    # Formato do arquivo de log: "text" (padrão) ou "json" (uma linha JSON por
+    # registro)
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+    # Nível mínimo registrado (DEBUG, INFO, WARNING ou ERROR)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    # Repete os registros no console (stdout), em formato texto
+    LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() in ("1", "true", "yes")
+    # Tamanho máximo do arquivo de log antes da rotação (0 = sem rotação) e número
+    # de arquivos antigos mantidos
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 0))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+    # Registros aguardando gravação; com a fila cheia, "block" faz a execução
+    # aguardar e "drop" descarta os novos registros
+    LOG_QUEUE_SIZE = max(1, int(os.getenv("LOG_QUEUE_SIZE", 10000)))
+    LOG_OVERFLOW = os.getenv("LOG_OVERFLOW", "block").lower()
     TIMEZONE_OFFSET = int(os.getenv("TIMEZONE_OFFSET", -3))
+    # Fuso padrão pelo nome IANA (ex.: America/Sao_Paulo), com horário de verão;
+    # quando definido, substitui TIMEZONE_OFFSET
+    TIMEZONE = os.getenv("TIMEZONE", "")
+    # Usa o fuso horário de cada usuário (mailboxSettings) para o dia de hoje e os
+    # horários das mensagens
+    USER_TIMEZONES = os.getenv("USER_TIMEZONES", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # Segundos em que o fuso de cada usuário fica em cache antes de ser consultado
+    # de novo
+    USER_TIMEZONE_TTL = max(0.0, float(os.getenv("USER_TIMEZONE_TTL", 604800)))
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
+    # Servidor SMTP usado para as notificações de erro ao administrador
+    SMTP_SERVER = os.getenv("SMTP_SERVER")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+    SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+    SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+    # Intervalo (em segundos) entre os resumos de falhas enviados ao administrador
+    # (0 envia cada falha assim que ocorre); o resumo pendente é enviado ao final
+    ADMIN_DIGEST_INTERVAL = max(0.0, float(os.getenv("ADMIN_DIGEST_INTERVAL", 300)))
+    # Quantidade máxima de falhas detalhadas em cada resumo
+    ADMIN_DIGEST_MAX_DETAILS = max(0, int(os.getenv("ADMIN_DIGEST_MAX_DETAILS", 20)))
+    # Número de usuários processados em paralelo (1 = execução serial)
+    MAX_WORKERS = max(1, int(os.getenv("MAX_WORKERS", 1)))
+    # Usuários agrupados por chamada ao /$batch do Graph (1 = sem $batch, máximo 20)
+    GRAPH_BATCH_SIZE = min(20, max(1, int(os.getenv("GRAPH_BATCH_SIZE", 1))))
+    # "full" consulta todo o diretório e calendário a cada execução; "delta" usa
+    # consultas delta do Graph e um armazenamento local (STATE_DB_FILE);
+    # "prefetch" mantém em cache (STATE_DB_FILE) a agenda de vários dias
+    SYNC_MODE = os.getenv("SYNC_MODE", "full").lower()
+    # Dias de agenda obtidos de uma vez nos modos prefetch e delta, a partir de hoje
+    CALENDAR_PREFETCH_DAYS = max(1, int(os.getenv("CALENDAR_PREFETCH_DAYS", 7)))
+    # Segundos em que a agenda em cache é usada sem consultar o Graph; depois
+    # disso ela é revalidada pelo changeKey dos eventos
+    CALENDAR_CACHE_TTL = max(0.0, float(os.getenv("CALENDAR_CACHE_TTL", 3600)))
+    STATE_DB_FILE = os.getenv("STATE_DB_FILE", "/tmp/m365_reminder_state.db")
+    # Usuários solicitados por página ao Graph ($top, máximo 999)
+    USERS_PAGE_SIZE = min(999, max(1, int(os.getenv("USERS_PAGE_SIZE", 100))))
+    # Conexões keep-alive mantidas por host na sessão HTTP compartilhada
+    HTTP_POOL_SIZE = max(1, int(os.getenv("HTTP_POOL_SIZE", max(10, MAX_WORKERS))))
+    # Timeouts (em segundos) de conexão e de leitura das chamadas HTTP
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 60))
+    # Arquivo opcional para reaproveitar o token de acesso entre execuções (permissão 0600)
+    TOKEN_CACHE_FILE = os.getenv("TOKEN_CACHE_FILE")
+    # Segundos antes da expiração em que o token é renovado de forma proativa
+    TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", 300))
+    # Requisições por segundo ao Graph para todo o tenant (0 = sem limite local)
+    GRAPH_TENANT_RPS = float(os.getenv("GRAPH_TENANT_RPS", 0))
+    # Requisições por segundo ao Graph por caixa de correio (0 = sem limite local)
+    GRAPH_MAILBOX_RPS = float(os.getenv("GRAPH_MAILBOX_RPS", 16))
+    # Tentativas por chamada ao Graph antes de desistir (limitação e erros transitórios)
+    GRAPH_MAX_ATTEMPTS = max(1, int(os.getenv("GRAPH_MAX_ATTEMPTS", 5)))
+    # Espera máxima (em segundos) aceita de um cabeçalho Retry-After
+    GRAPH_MAX_RETRY_AFTER = float(os.getenv("GRAPH_MAX_RETRY_AFTER", 120))
+    # Arquivo opcional com as métricas da execução para o textfile collector do
+    # node exporter (ex.: /var/lib/node_exporter/textfile/m365_reminder.prom)
+    METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+    # Formato do arquivo de métricas: "prometheus" ou "openmetrics"
+    METRICS_FORMAT = os.getenv("METRICS_FORMAT", "prometheus").lower()
+    # Arquivo de exportação da agenda do dia (JSON lines, um registro por usuário
+    # com eventos, conflitos e blocos de foco); vazio desativa. {day} é
+    # substituído pela data e o sufixo .gz comprime o arquivo com gzip
+    EXPORT_FILE = os.getenv("EXPORT_FILE", "")
+    # Diretório opcional para o bytecode compilado dos templates Jinja2
+    TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")
+    # Evita reenviar ao OneDrive um arquivo cujo conteúdo não mudou desde o último
+    # upload (o hash de cada arquivo enviado fica em STATE_DB_FILE)
+    ONEDRIVE_SKIP_UNCHANGED = os.getenv("ONEDRIVE_SKIP_UNCHANGED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # Uploads simultâneos no pool compartilhado do OneDrive (0 = MAX_WORKERS)
+    ONEDRIVE_UPLOAD_WORKERS = max(0, int(os.getenv("ONEDRIVE_UPLOAD_WORKERS", 0)))
+    # Arquivos acima deste tamanho (em bytes) usam uma sessão de upload em blocos
+    ONEDRIVE_SIMPLE_UPLOAD_LIMIT = int(
+        os.getenv("ONEDRIVE_SIMPLE_UPLOAD_LIMIT", 4 * 1024 * 1024)
+    )
+    # Tamanho de cada bloco da sessão de upload (arredondado para múltiplo de 320 KiB)
+    ONEDRIVE_CHUNK_SIZE = int(os.getenv("ONEDRIVE_CHUNK_SIZE", 10 * 320 * 1024))
+    # Envia também a mensagem de lembrete pelo Teams (o id do chat de cada
+    # usuário fica em cache em STATE_DB_FILE)
+    TEAMS_ENABLED = os.getenv("TEAMS_ENABLED", "false").lower() in ("1", "true", "yes")
+    # Modo daemon (--daemon): os lembretes de cada usuário são enviados em um
+    # horário fixo dentro da janela que começa em SCHEDULE_WINDOW_START (HH:MM,
+    # horário local) e dura SCHEDULE_WINDOW_MINUTES minutos (0 = todos no início)
+    SCHEDULE_WINDOW_START = os.getenv("SCHEDULE_WINDOW_START", "07:00")
+    SCHEDULE_WINDOW_MINUTES = max(0, int(os.getenv("SCHEDULE_WINDOW_MINUTES", 120)))
+    # Intervalo máximo (em segundos) entre dois ciclos do agendador
+    SCHEDULER_TICK = max(1.0, float(os.getenv("SCHEDULER_TICK", 30)))
 
     FRASES_SEM_COMPROMISSOS = [
         "Que tal aproveitar o dia para colocar suas tarefas em dia?",
@@ -0,0 +1,226 @@
+import atexit
+import queue
+import threading
+import time
+
+from config import Config
+from m365_reminder_project.api import log_action
+
+
+# Conexão SMTP autenticada reaproveitada entre os envios. É aberta (STARTTLS e
+# login) no primeiro envio e refeita uma única vez se o servidor a encerrar. O
+# smtplib só é importado quando há algo a enviar: execuções sem falhas não
+# pagam o custo da importação.
+class SmtpConnection:
+    def __init__(self, server, port, username, password, timeout=30):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.connections = 0
+        self._smtp = None
+
+    def _connect(self):
+        import smtplib
+
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            smtp.starttls()  # Inicia a criptografia TLS
+            smtp.login(self.username, self.password)  # Autentica no servidor
+        except Exception:
+            smtp.close()
+            raise
+        self.connections += 1
+        return smtp
+
+    def send(self, msg):
+        import smtplib
+
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(msg)
+                return
+            except smtplib.SMTPServerDisconnected:
+                # Conexão ociosa encerrada pelo servidor: reconecta e tenta de novo
+                self._smtp = None
+                if attempt:
+                    raise
+
+    def close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        import smtplib
+
+        try:
+            smtp.quit()
+        except smtplib.SMTPException:
+            smtp.close()
+
+
+# Monta o e-mail de um resumo. Uma única falha é enviada como a notificação
+# original; várias são agrupadas por tipo, com a quantidade de cada um e até
+# max_details mensagens de exemplo.
+def build_digest(notifications, max_details=20):
+    if len(notifications) == 1:
+        subject, message, _ = notifications[0]
+        return subject, message
+
+    counts = {}
+    for _, _, category in notifications:
+        counts[category] = counts.get(category, 0) + 1
+
+    lines = [f"{len(notifications)} falha(s) registrada(s) pelo M365 Reminder:", ""]
+    for category, count in sorted(counts.items(), key=lambda item: -item[1]):
+        lines.append(f"- {category}: {count}")
+    lines.append("")
+    lines.append("Detalhes:")
+    for subject, message, _ in notifications[:max_details]:
+        lines.append(f"* {subject}: {message}")
+    if len(notifications) > max_details:
+        lines.append(f"... e mais {len(notifications) - max_details} falha(s).")
+
+    subject = f"Resumo de Falhas do Script M365 Reminder ({len(notifications)})"
+    return subject, "\n".join(lines)
+
+
+# Despachante das notificações ao administrador: notify() apenas enfileira a
+# falha; uma thread de fundo acumula as falhas e envia, a cada flush_interval
+# segundos (e ao encerrar), um único e-mail de resumo pela conexão SMTP
+# reaproveitada. Com flush_interval=0 cada falha é enviada assim que chega.
+class AdminNotifier:
+    def __init__(
+        self, connection, sender, recipient, flush_interval=300, max_details=20
+    ):
+        self.connection = connection
+        self.sender = sender
+        self.recipient = recipient
+        self.flush_interval = flush_interval
+        self.max_details = max_details
+        self.sent = 0
+        self._queue = queue.Queue()
+        self._pending = []
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="admin-notifier", daemon=True
+        )
+        self._thread.start()
+
+    # Enfileira uma falha. category agrupa as falhas no resumo (padrão: assunto)
+    def notify(self, subject, message, category=None):
+        if self._closed:
+            return False
+        self._queue.put((subject, message, category or subject))
+        return True
+
+    # Aguarda até que as falhas enfileiradas tenham sido acumuladas e envia o
+    # resumo pendente
+    def flush(self):
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    # Envia o resumo pendente e encerra a thread e a conexão SMTP
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            # Com flush_interval=0 não há resumo periódico: a thread fica
+            # bloqueada até a próxima falha (um get com timeout 0 retornaria na
+            # hora e a thread ficaria girando sem parar)
+            timeout = (
+                max(0, deadline - time.monotonic()) if self.flush_interval > 0 else None
+            )
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if isinstance(item, tuple):
+                self._pending.append(item)
+                if self.flush_interval > 0:
+                    continue
+
+            self._send_pending()
+            deadline = time.monotonic() + self.flush_interval
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                self.connection.close()
+                return
+
+    def _send_pending(self):
+        if not self._pending:
+            return
+        notifications, self._pending = self._pending, []
+        subject, body = build_digest(notifications, self.max_details)
+
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["To"] = self.recipient
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+
+        try:
+            self.connection.send(msg)
+            self.sent += 1
+            log_action(
+                f"Notificação de erro enviada para o administrador ({self.recipient}) "
+                f"com {len(notifications)} falha(s)."
+            )
+        except Exception as e:
+            log_action(
+                f"Falha ao enviar notificação de erro para o administrador: {e}",
+                success=False,
+            )
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+# Retorna o despachante compartilhado, criando-o com as configurações SMTP atuais
+def get_admin_notifier():
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                connection = SmtpConnection(
+                    Config.SMTP_SERVER,
+                    Config.SMTP_PORT,
+                    Config.SMTP_USERNAME,
+                    Config.SMTP_PASSWORD,
+                )
+                _notifier = AdminNotifier(
+                    connection,
+                    Config.SMTP_USERNAME,
+                    Config.ADMIN_EMAIL,
+                    flush_interval=Config.ADMIN_DIGEST_INTERVAL,
+                    max_details=Config.ADMIN_DIGEST_MAX_DETAILS,
+                )
+    return _notifier
+
+
+# Envia o resumo pendente e encerra o despachante compartilhado (a próxima
+# chamada a get_admin_notifier cria outro)
+def close_admin_notifier():
+    global _notifier
+    with _notifier_lock:
+        notifier, _notifier = _notifier, None
+    if notifier is not None:
+        notifier.close()
+
+
+atexit.register(close_admin_notifier)
@@ -1,37 +1,127 @@
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 import requests
 import json
 import random
-from tenacity import retry, wait_exponential, stop_after_attempt, Retrying
+import threading
+import time
+from tenacity import (
+    retry,
+    retry_if_exception,
+    wait_exponential,
+    stop_after_attempt,
+    Retrying,
+)
 
 from config import Config
+from m365_reminder_project.calendar_cache import (
+    TIME_KEY_FORMAT,
+    get_calendar_cache,
+    utc_key,
+)
+from m365_reminder_project.http_client import get_session, REQUEST_TIMEOUT
+from m365_reminder_project import token_cache
+from m365_reminder_project.log_writer import get_log_writer
+from m365_reminder_project.metrics import body_size, endpoint_class, get_metrics
+from m365_reminder_project.state_store import get_state_store
+from m365_reminder_project.throttling import (
+    get_rate_limiter,
+    is_retryable,
+    mailbox_for_endpoint,
+    retry_after_seconds,
+    wait_retry_after,
+)
+from m365_reminder_project.timezones import (
+    day_bounds,
+    default_zone,
+    get_timezone_cache,
+    local_today,
+    resolve_zone,
+)
 
+# Limite de requisições por chamada ao endpoint /$batch do Microsoft Graph
+GRAPH_BATCH_MAX_REQUESTS = 20
+# Os itens de um $batch são executados em paralelo e o Graph aceita no máximo 4
+# requisições simultâneas por caixa de correio; os excedentes recebem 429
+GRAPH_BATCH_MAX_PER_MAILBOX = 4
+# Status de itens do $batch que devem ser reenviados (throttling / indisponibilidade)
+GRAPH_BATCH_RETRY_STATUSES = {429, 503, 504}
 
-# Função para registrar ações e erros em um arquivo de log e no console
-def log_action(message, success=True):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    status = "SUCESSO" if success else "FALHA"
-    log_entry = f"[{timestamp}] [{status}] {message}"
-    print(log_entry)
+# Campos dos usuários solicitados ao Graph (listagem completa e delta)
+USER_SELECT_FIELDS = "id,displayName,mail,userPrincipalName"
+# Campos dos eventos solicitados ao Graph
+EVENT_SELECT_FIELDS = "id,iCalUId,changeKey,subject,bodyPreview,start,end,location,organizer,attendees,isAllDay"
+# Eventos por página do calendarView no modo prefetch
+CALENDAR_PAGE_SIZE = 500
+
+# Garante que apenas uma thread por vez solicite um novo token ao Azure AD
+_token_refresh_lock = threading.Lock()
 
-    try:
-        # Tenta escrever no arquivo de log configurado
-        with open(Config.LOG_FILE, "a") as f:
-            f.write(log_entry + "\n")
-    except Exception as e:
-        # Em caso de erro ao escrever no log, imprime no console
-        print(f"Erro ao escrever no arquivo de log: {e}")
 
+# Função para registrar ações e erros no arquivo de log e no console. A gravação
+# é feita em segundo plano pelo escritor de log compartilhado; campos extras
+# (user_id, latency_ms, ...) são incluídos nos registros em JSON.
+def log_action(message, success=True, level=None, **fields):
+    get_log_writer().log(message, success=success, level=level, **fields)
 
-# Função para obter token de acesso do Microsoft Graph API com retentativas
-@retry(wait=wait_exponential(multiplier=1, min=4, max=10), stop=stop_after_attempt(3))
+
+# Função para obter token de acesso do Microsoft Graph API. Reaproveita o token em
+# cache (memória ou disco) enquanto ele for válido e só consulta o Azure AD quando
+# não houver token ou ele estiver perto de expirar.
 def get_access_token():
+    cached_token = token_cache.get_valid_token()
+    if cached_token:
+        log_action("Usando token de acesso em cache.")
+        return cached_token
+
+    with _token_refresh_lock:
+        # Outra thread pode ter renovado o token enquanto esta aguardava o lock
+        cached_token = token_cache.get_valid_token()
+        if cached_token:
+            return cached_token
+        return _request_access_token()
+
+
+# Renova o token depois que o Graph o rejeitou (401), a menos que outra thread
+# já tenha feito a renovação
+def refresh_access_token(rejected_token):
+    with _token_refresh_lock:
+        current = token_cache.current_token()
+        if current and current != rejected_token:
+            return current
+        return _request_access_token()
+
+
+# Substitui tokens emitidos por este processo pelo token vigente, renovando-o de
+# forma proativa quando estiver perto de expirar. Tokens externos são mantidos.
+def resolve_token(token):
+    if not token_cache.is_managed(token):
+        return token
+    return token_cache.get_valid_token() or get_access_token()
+
+
+# Contabiliza nas métricas uma retentativa de token (antes da espera do tenacity)
+def _record_token_retry(retry_state):
+    get_metrics().record_retry("token")
+
+
+# Contabiliza nas métricas uma retentativa de chamada ao Graph
+def _record_graph_retry(retry_state):
+    get_metrics().record_retry(endpoint_class(retry_state.args[1]))
+
+
+# Solicita um novo token ao Azure AD (client_credentials) com retentativas,
+# respeitando o Retry-After quando o Azure AD limitar as requisições
+@retry(
+    wait=wait_retry_after(wait_exponential(multiplier=1, min=4, max=10)),
+    stop=stop_after_attempt(3),
+    before_sleep=_record_token_retry,
+    reraise=True,
+)
+def _request_access_token():
     log_action("Tentando obter token de acesso...")
 
     # URL do endpoint de token do Azure AD
-    token_url = (
-        f"https://login.microsoftonline.com/{Config.TENANT_ID}/oauth2/v2.0/token"
-    )
+    token_url = f"{Config.LOGIN_BASE_URL}/{Config.TENANT_ID}/oauth2/v2.0/token"
     # Dados para a requisição do token (client_credentials flow)
     token_data = {
         "grant_type": "client_credentials",
@@ -42,13 +132,20 @@ def get_access_token():
 
     try:
         # Envia a requisição POST para obter o token
-        response = requests.post(token_url, data=token_data)
+        with get_metrics().timed("token") as call:
+            response = get_session().post(
+                token_url, data=token_data, timeout=REQUEST_TIMEOUT
+            )
+            call["status"] = response.status_code
+            call["bytes_received"] = body_size(response.content)
         response.raise_for_status()  # Lança exceção para erros HTTP (4xx ou 5xx)
         token_info = response.json()
         access_token = token_info.get("access_token")
 
         if access_token:
             log_action("Token de acesso obtido com sucesso!")
+            # Sem expires_in o token não é reaproveitado (expira imediatamente no cache)
+            token_cache.store_token(access_token, token_info.get("expires_in", 0))
             return access_token
         else:
             log_action("Falha ao extrair token de acesso da resposta.", success=False)
@@ -63,23 +160,38 @@ def get_access_token():
         raise
 
 
-# Função genérica para chamar a API do Microsoft Graph com retentativas
-@retry(wait=wait_exponential(multiplier=1, min=4, max=10), stop=stop_after_attempt(3))
+# Função genérica para chamar a API do Microsoft Graph com retentativas. Apenas
+# falhas transitórias são repetidas; em respostas 429/503 a próxima tentativa
+# aguarda o tempo indicado no cabeçalho Retry-After.
+@retry(
+    retry=retry_if_exception(is_retryable),
+    wait=wait_retry_after(wait_exponential(multiplier=1, min=4, max=10)),
+    stop=stop_after_attempt(Config.GRAPH_MAX_ATTEMPTS),
+    before_sleep=_record_graph_retry,
+    reraise=True,
+)
 def call_graph_api(token, endpoint, method="GET", data=None):
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    url = f"https://graph.microsoft.com/v1.0{endpoint}"
+    # Links de paginação (@odata.nextLink) já chegam como URLs absolutas
+    if endpoint.startswith(("https://", "http://")):
+        url = endpoint
+    else:
+        url = f"{Config.GRAPH_BASE_URL}{endpoint}"
+    token = resolve_token(token)
+    # Cada requisição de um $batch conta para os limites do Graph
+    cost = len(data.get("requests", [])) if endpoint == "/$batch" and data else 1
 
     try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        elif method == "PUT":
-            response = requests.put(url, headers=headers, json=data)
-        else:
+        response = _send_limited_request(token, url, method, data, cost)
+        if response is None:
             log_action(f"Método HTTP não suportado: {method}", success=False)
             return None
 
+        # Token expirado ou revogado: renova uma única vez e repete a chamada
+        if response.status_code == 401 and token_cache.is_managed(token):
+            log_action("Token rejeitado pelo Graph (401). Renovando token de acesso...")
+            token = refresh_access_token(token)
+            response = _send_limited_request(token, url, method, data, cost)
+
         response.raise_for_status()
 
         # Verificar se há conteúdo para decodificar como JSON
@@ -93,8 +205,13 @@ def call_graph_api(token, endpoint, method="GET", data=None):
             return {"status": "success", "message": "Operation completed successfully"}
 
     except requests.exceptions.HTTPError as e:
+        detail = (
+            f"{e.response.status_code} - {e.response.text}"
+            if e.response is not None
+            else str(e)
+        )
         log_action(
-            f"Erro HTTP ao chamar API do Graph ({endpoint}): {e.response.status_code} - {e.response.text}",
+            f"Erro HTTP ao chamar API do Graph ({endpoint}): {detail}",
             success=False,
         )
         raise
@@ -111,17 +228,187 @@ def call_graph_api(token, endpoint, method="GET", data=None):
         raise
 
 
+# Envia uma requisição ao Graph respeitando o limitador de requisições compartilhado
+# e o atualiza com o status e o Retry-After da resposta
+def _send_limited_request(token, url, method, data, cost=1):
+    limiter = get_rate_limiter()
+    with limiter.request(url, cost):
+        # A latência medida não inclui a espera imposta pelo limitador
+        with get_metrics().timed(endpoint_class(url)) as call:
+            response = _send_graph_request(token, url, method, data)
+            if response is not None:
+                call["status"] = response.status_code
+                call["bytes_sent"] = body_size(getattr(response.request, "body", None))
+                call["bytes_received"] = body_size(response.content)
+    if response is not None:
+        limiter.on_response(url, response.status_code, response.headers)
+    return response
+
+
+# Envia uma requisição ao Graph pela sessão compartilhada (None se o método não
+# for suportado)
+def _send_graph_request(token, url, method, data):
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    session = get_session()
+
+    if method == "GET":
+        return session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    elif method == "POST":
+        return session.post(url, headers=headers, json=data, timeout=REQUEST_TIMEOUT)
+    elif method == "PUT":
+        return session.put(url, headers=headers, json=data, timeout=REQUEST_TIMEOUT)
+    return None
+
+
+# Função para enviar várias requisições ao Graph usando o endpoint /$batch.
+# Cada item de batch_requests é um dicionário com "method", "url" (relativa a /v1.0)
+# e opcionalmente "body". Retorna uma lista, na mesma ordem, de dicionários com
+# "status", "headers" e "body" de cada requisição individual. Itens limitados são
+# reenviados em até max_attempts rodadas (GRAPH_MAX_ATTEMPTS por padrão).
+def call_graph_batch(token, batch_requests, max_attempts=None):
+    max_attempts = max_attempts or Config.GRAPH_MAX_ATTEMPTS
+    results = [{"status": 0, "headers": {}, "body": None} for _ in batch_requests]
+    pending = list(range(len(batch_requests)))
+
+    for attempt in range(1, max_attempts + 1):
+        retry_after = 0
+        throttled = []
+
+        for chunk in _batch_chunks(pending, batch_requests):
+            payload = {
+                "requests": [_build_batch_item(i, batch_requests[i]) for i in chunk]
+            }
+            # Cada item conta para o limitador da sua caixa de correio
+            limiter = get_rate_limiter()
+            limiter.acquire_mailboxes(batch_requests[i]["url"] for i in chunk)
+            batch_result = call_graph_api(token, "/$batch", "POST", payload)
+
+            for item in (batch_result or {}).get("responses", []):
+                index = int(item["id"])
+                headers = item.get("headers") or {}
+                status = item.get("status", 0)
+                results[index] = {
+                    "status": status,
+                    "headers": headers,
+                    "body": item.get("body"),
+                }
+                # Itens limitados pausam o limitador da caixa de correio correspondente
+                limiter.on_response(batch_requests[index]["url"], status, headers)
+                if status in GRAPH_BATCH_RETRY_STATUSES:
+                    throttled.append(index)
+                    if attempt < max_attempts:
+                        get_metrics().record_retry(
+                            endpoint_class(batch_requests[index]["url"])
+                        )
+                    retry_after = max(retry_after, retry_after_seconds(headers, 0))
+
+        pending = sorted(throttled)
+        if not pending or attempt == max_attempts:
+            break
+
+        # Aguarda o tempo indicado pelo Graph (ou um backoff exponencial) e reenvia
+        # apenas os itens que falharam
+        wait_seconds = min(retry_after, Config.GRAPH_MAX_RETRY_AFTER) or min(
+            2**attempt, 10
+        )
+        log_action(
+            f"{len(pending)} requisição(ões) do $batch limitada(s) pelo Graph. "
+            f"Nova tentativa em {wait_seconds:g}s..."
+        )
+        time.sleep(wait_seconds)
+
+    if pending:
+        log_action(
+            f"{len(pending)} requisição(ões) do $batch falharam após {max_attempts} tentativas.",
+            success=False,
+        )
+    return results
+
+
+# Divide os índices pendentes em grupos de até GRAPH_BATCH_MAX_REQUESTS itens,
+# com no máximo GRAPH_BATCH_MAX_PER_MAILBOX itens da mesma caixa de correio por
+# grupo (ex.: os sendMail do remetente vão em grupos de 4). Cada grupo ocupa o
+# primeiro $batch em que couber, preservando a ordem dentro dele.
+def _batch_chunks(pending, batch_requests):
+    chunks = []
+    for index in pending:
+        mailbox = mailbox_for_endpoint(batch_requests[index]["url"])
+        for chunk, per_mailbox in chunks:
+            if len(chunk) < GRAPH_BATCH_MAX_REQUESTS and (
+                per_mailbox.get(mailbox, 0) < GRAPH_BATCH_MAX_PER_MAILBOX
+            ):
+                break
+        else:
+            chunk, per_mailbox = [], {}
+            chunks.append((chunk, per_mailbox))
+        chunk.append(index)
+        if mailbox is not None:
+            per_mailbox[mailbox] = per_mailbox.get(mailbox, 0) + 1
+    return [chunk for chunk, _ in chunks]
+
+
+# Converte uma requisição no formato esperado pelo corpo do /$batch
+def _build_batch_item(index, batch_request):
+    item = {
+        "id": str(index),
+        "method": batch_request.get("method", "GET"),
+        "url": batch_request["url"],
+    }
+    if batch_request.get("body") is not None:
+        item["body"] = batch_request["body"]
+        item["headers"] = {"Content-Type": "application/json"}
+    return item
+
+
+# Verifica se a resposta de um item do $batch indica sucesso (2xx)
+def is_batch_success(response):
+    return 200 <= response.get("status", 0) < 300
+
+
+# Gerador que percorre todos os usuários do tenant, página por página, seguindo
+# o @odata.nextLink retornado pelo Graph. Os usuários de uma página ficam
+# disponíveis antes de a próxima página ser solicitada.
+def iter_users(token, page_size=None):
+    # No modo incremental os usuários vêm do armazenamento local após aplicar o delta
+    if Config.SYNC_MODE == "delta":
+        sync_users_delta(token)
+        yield from get_state_store().iter_users()
+        return
+
+    if page_size is None:
+        page_size = Config.USERS_PAGE_SIZE
+
+    # Seleciona apenas os campos necessários
+    endpoint = f"/users?$select={USER_SELECT_FIELDS}&$top={page_size}"
+    page_number = 0
+    total = 0
+
+    while endpoint:
+        users_data = call_graph_api(token, endpoint)
+        if not users_data or "value" not in users_data:
+            log_action(
+                f"Falha ao obter a página {page_number + 1} de usuários.",
+                success=False,
+            )
+            return
+
+        page_number += 1
+        total += len(users_data["value"])
+        log_action(
+            f"Página {page_number} de usuários obtida: {len(users_data['value'])} usuário(s) (total {total})."
+        )
+        yield from users_data["value"]
+
+        endpoint = users_data.get("@odata.nextLink")
+
+
 # Função para obter a lista de todos os usuários do tenant
 def get_all_users(token):
     log_action("Obtendo lista de todos os usuários...")
 
-    # Chama a API do Graph para obter usuários, selecionando apenas os campos necessários
-    users_data = call_graph_api(
-        token, "/users?$select=id,displayName,mail,userPrincipalName"
-    )
+    users = list(iter_users(token))
 
-    if users_data and "value" in users_data:
-        users = users_data["value"]
+    if users:
         log_action(f"Obtidos {len(users)} usuários com sucesso!")
         return users
     else:
@@ -129,21 +416,56 @@ def get_all_users(token):
         return []
 
 
-# Função para obter eventos do calendário de um usuário para o dia atual
-def get_todays_events(token, user_id):
-    log_action(f"Obtendo eventos de hoje para o usuário {user_id}...")
+# Início (meia-noite local no fuso zone, ou no fuso padrão) do dia atual e o fim
+# do intervalo de days dias a partir dele, como datetimes em UTC. Os limites são
+# calculados uma vez por fuso (day_bounds), não uma vez por usuário.
+def _local_days(days=1, zone=None):
+    zone = zone or default_zone()
+    return day_bounds(zone, local_today(zone), days)
+
+
+# Converte um datetime UTC para o formato ISO que a API do Graph espera
+def _graph_time(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-3] + "Z"
+
+
+# Converte um datetime UTC para a chave de comparação do cache de agendas
+def _time_key(value):
+    return value.strftime(TIME_KEY_FORMAT)
+
 
-    # Define o início e o fim do dia atual no timezone UTC diretamente
-    today = datetime.now(timezone.utc)
-    start_of_day = today.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_day = today.replace(hour=23, minute=59, second=59, microsecond=999999)
+# Retorna o início e o fim do dia atual no formato ISO que a API do Graph
+# espera. O dia é o dia local (do fuso zone ou do fuso padrão), não o dia UTC:
+# com offset -3 um evento às 22h locais cai no dia UTC seguinte.
+def _todays_window(days=1, zone=None):
+    start, end = _local_days(days, zone)
+    return _graph_time(start), _graph_time(end)
 
-    # Converte para o formato ISO que a API do Graph espera
-    start_of_day_utc = start_of_day.strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-3] + "Z"
-    end_of_day_utc = end_of_day.strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-3] + "Z"
+
+# Monta o endpoint de eventos do calendário de um usuário para o dia atual
+def _todays_events_endpoint(user_id, zone=None):
+    start_of_day_utc, end_of_day_utc = _todays_window(zone=zone)
 
     # Constrói o endpoint da API
-    endpoint = f"/users/{user_id}/calendar/events?$filter=start/dateTime le '{end_of_day_utc}' and end/dateTime ge '{start_of_day_utc}'&$select=id,subject,bodyPreview,start,end,location,organizer,attendees,isAllDay"
+    return f"/users/{user_id}/calendar/events?$filter=start/dateTime le '{end_of_day_utc}' and end/dateTime ge '{start_of_day_utc}'&$select={EVENT_SELECT_FIELDS}"
+
+
+# Função para obter eventos do calendário de um usuário para o dia atual (o dia
+# local no fuso zone do usuário, ou no fuso padrão)
+def get_todays_events(token, user_id, zone=None):
+    log_action(f"Obtendo eventos de hoje para o usuário {user_id}...")
+
+    # No modo incremental os eventos vêm do armazenamento local após aplicar o delta
+    if Config.SYNC_MODE == "delta":
+        events = sync_events_delta(token, user_id, zone)
+        log_action(f"Obtidos {len(events)} eventos para hoje para o usuário {user_id}.")
+        return events
+
+    # No modo prefetch os eventos vêm do cache de agendas de vários dias
+    if Config.SYNC_MODE == "prefetch":
+        return get_prefetched_events_batch(token, [user_id], [zone])[0]
+
+    endpoint = _todays_events_endpoint(user_id, zone)
 
     # Chama a API do Graph para obter os eventos
     events_data = call_graph_api(token, endpoint)
@@ -155,3 +477,400 @@ def get_todays_events(token, user_id):
     else:
         log_action(f"Falha ao obter eventos para o usuário {user_id}.", success=False)
         return []
+
+
+# Função para obter os eventos de hoje de vários usuários com uma única chamada
+# ao /$batch a cada 20 usuários. zones é a lista opcional com o fuso de cada
+# usuário (get_user_zones). Retorna uma lista de eventos por usuário, na mesma
+# ordem de user_ids.
+def get_todays_events_batch(token, user_ids, zones=None):
+    if zones is None:
+        zones = [None] * len(user_ids)
+    # Delta links são URLs absolutas por usuário; no modo incremental cada usuário
+    # é sincronizado individualmente
+    if Config.SYNC_MODE == "delta":
+        return [
+            get_todays_events(token, user_id, zone)
+            for user_id, zone in zip(user_ids, zones)
+        ]
+    if Config.SYNC_MODE == "prefetch":
+        return get_prefetched_events_batch(token, user_ids, zones)
+
+    log_action(f"Obtendo eventos de hoje para {len(user_ids)} usuários via $batch...")
+
+    responses = call_graph_batch(
+        token,
+        [
+            {"method": "GET", "url": _todays_events_endpoint(user_id, zone)}
+            for user_id, zone in zip(user_ids, zones)
+        ],
+    )
+
+    events_per_user = []
+    for user_id, response in zip(user_ids, responses):
+        body = response.get("body") or {}
+        if is_batch_success(response) and "value" in body:
+            events = body["value"]
+            log_action(
+                f"Obtidos {len(events)} eventos para hoje para o usuário {user_id}."
+            )
+            events_per_user.append(events)
+        else:
+            log_action(
+                f"Falha ao obter eventos para o usuário {user_id} (status {response.get('status')}).",
+                success=False,
+            )
+            events_per_user.append([])
+    return events_per_user
+
+
+# Executa várias requisições GET ao Graph (com /$batch quando houver mais de
+# uma) e retorna o corpo de cada resposta, na mesma ordem, seguindo o
+# @odata.nextLink das respostas paginadas. Falhas viram None.
+def _get_many(token, endpoints):
+    if not endpoints:
+        return []
+    if len(endpoints) == 1:
+        try:
+            bodies = [call_graph_api(token, endpoints[0])]
+        except requests.exceptions.RequestException:
+            bodies = [None]
+    else:
+        try:
+            responses = call_graph_batch(
+                token, [{"method": "GET", "url": endpoint} for endpoint in endpoints]
+            )
+        except requests.exceptions.RequestException:
+            responses = [{}] * len(endpoints)
+        bodies = [
+            response.get("body") if is_batch_success(response) else None
+            for response in responses
+        ]
+
+    for index, body in enumerate(bodies):
+        next_link = body.get("@odata.nextLink") if body else None
+        while next_link:
+            try:
+                page = call_graph_api(token, next_link) or {}
+            except requests.exceptions.RequestException:
+                bodies[index] = None
+                break
+            body.setdefault("value", []).extend(page.get("value", []))
+            next_link = page.get("@odata.nextLink")
+    return bodies
+
+
+# Fuso horário (tzinfo) de cada usuário, na mesma ordem de user_ids. O timeZone
+# do mailboxSettings só é consultado ao Graph (via $batch) para os usuários sem
+# fuso em cache ou com o cache mais antigo que USER_TIMEZONE_TTL segundos; os
+# fusos obtidos são gravados no cache persistente. Usuários cujo fuso não pôde
+# ser obtido ou convertido usam o fuso padrão.
+def get_user_zones(token, user_ids):
+    cache = get_timezone_cache()
+    cached = cache.get_many(user_ids)
+    names = {user_id: name for user_id, (name, _) in cached.items()}
+    now = time.time()
+    missing = [
+        user_id
+        for user_id in user_ids
+        if user_id not in cached or now - cached[user_id][1] >= Config.USER_TIMEZONE_TTL
+    ]
+
+    if missing:
+        log_action(
+            f"Obtendo o fuso horário de {len(missing)} usuário(s) (mailboxSettings)..."
+        )
+        bodies = _get_many(
+            token,
+            [f"/users/{user_id}/mailboxSettings/timeZone" for user_id in missing],
+        )
+        fetched = {}
+        for user_id, body in zip(missing, bodies):
+            name = body.get("value") if body else None
+            if not name:
+                log_action(
+                    f"Falha ao obter o fuso horário do usuário {user_id}; usando o "
+                    "fuso padrão.",
+                    level="WARNING",
+                )
+                continue
+            if resolve_zone(name) is None:
+                log_action(
+                    f"Fuso horário desconhecido ({name}) do usuário {user_id}; "
+                    "usando o fuso padrão.",
+                    level="WARNING",
+                )
+            fetched[user_id] = name
+        if fetched:
+            cache.put_many(fetched.items())
+            names.update(fetched)
+
+    fallback = default_zone()
+    return [resolve_zone(names.get(user_id)) or fallback for user_id in user_ids]
+
+
+# Endpoint do calendarView de um usuário em uma janela (UTC, formato do Graph)
+def _calendar_view_endpoint(user_id, start, end, select=EVENT_SELECT_FIELDS):
+    return (
+        f"/users/{user_id}/calendarView?startDateTime={start}&endDateTime={end}"
+        f"&$select={select}&$top={CALENDAR_PAGE_SIZE}"
+    )
+
+
+# Eventos de hoje de vários usuários no modo prefetch. Cada usuário tem em cache
+# a agenda de CALENDAR_PREFETCH_DAYS dias, obtida do calendarView em uma única
+# consulta. Dentro de CALENDAR_CACHE_TTL segundos o cache é usado sem consultar o
+# Graph; depois disso ele é revalidado com uma listagem leve (id e changeKey) e
+# apenas os eventos novos ou alterados são baixados. Quando a janela em cache não
+# cobre o dia atual, ela é consultada de novo a partir de hoje. zones é a lista
+# opcional com o fuso de cada usuário. Retorna uma lista de eventos por usuário,
+# na mesma ordem de user_ids.
+def get_prefetched_events_batch(token, user_ids, zones=None):
+    cache = get_calendar_cache()
+    if zones is None:
+        zones = [None] * len(user_ids)
+    # Dia atual de cada usuário, no seu fuso
+    days = [
+        tuple(_time_key(value) for value in _local_days(zone=zone)) for zone in zones
+    ]
+    now = time.time()
+
+    fetch, revalidate = [], []
+    for user_id, zone, (day_start, day_end) in zip(user_ids, zones, days):
+        window = cache.window(user_id)
+        if not window or window[0] > day_start or window[1] < day_end:
+            fetch.append((user_id, _local_days(Config.CALENDAR_PREFETCH_DAYS, zone)))
+        elif now - window[2] >= Config.CALENDAR_CACHE_TTL:
+            revalidate.append(user_id)
+        else:
+            cache.count("hits")
+
+    failed = set()
+    if fetch:
+        log_action(
+            f"Obtendo a agenda de {Config.CALENDAR_PREFETCH_DAYS} dia(s) de "
+            f"{len(fetch)} usuário(s) (calendarView)..."
+        )
+        bodies = _get_many(
+            token,
+            [
+                _calendar_view_endpoint(
+                    user_id, _graph_time(window_start), _graph_time(window_end)
+                )
+                for user_id, (window_start, window_end) in fetch
+            ],
+        )
+        for (user_id, (window_start, window_end)), body in zip(fetch, bodies):
+            if body is None:
+                log_action(
+                    f"Falha ao obter eventos para o usuário {user_id}.", success=False
+                )
+                failed.add(user_id)
+                continue
+            cache.replace(
+                user_id,
+                _time_key(window_start),
+                _time_key(window_end),
+                body.get("value", []),
+            )
+            cache.count("fetched")
+
+    if revalidate:
+        _revalidate_calendars(token, cache, revalidate)
+
+    events_per_user = []
+    for user_id, (day_start, day_end) in zip(user_ids, days):
+        if user_id in failed:
+            events_per_user.append([])
+            continue
+        events = cache.events_between(user_id, day_start, day_end)
+        log_action(f"Obtidos {len(events)} eventos para hoje para o usuário {user_id}.")
+        events_per_user.append(events)
+    return events_per_user
+
+
+# Revalida a agenda em cache de vários usuários: compara o changeKey de cada
+# evento da janela com o armazenado e baixa apenas os eventos novos ou alterados.
+# Se a revalidação falhar, a agenda em cache continua sendo usada e é revalidada
+# de novo na próxima execução.
+def _revalidate_calendars(token, cache, user_ids):
+    windows = [cache.window(user_id) for user_id in user_ids]
+    listings = _get_many(
+        token,
+        [
+            _calendar_view_endpoint(
+                user_id,
+                _graph_time(datetime.strptime(window[0], TIME_KEY_FORMAT)),
+                _graph_time(datetime.strptime(window[1], TIME_KEY_FORMAT)),
+                select="id,changeKey",
+            )
+            for user_id, window in zip(user_ids, windows)
+        ],
+    )
+
+    changed = []
+    removed = {}
+    for user_id, listing in zip(user_ids, listings):
+        if listing is None:
+            log_action(
+                f"Falha ao revalidar a agenda do usuário {user_id}; usando o cache.",
+                level="WARNING",
+            )
+            continue
+        cached = cache.change_keys(user_id)
+        current = {item["id"]: item.get("changeKey") for item in listing["value"]}
+        removed[user_id] = [event_id for event_id in cached if event_id not in current]
+        changed.extend(
+            (user_id, event_id)
+            for event_id, change_key in current.items()
+            if cached.get(event_id) != change_key
+        )
+
+    bodies = _get_many(
+        token,
+        [
+            f"/users/{user_id}/events/{event_id}?$select={EVENT_SELECT_FIELDS}"
+            for user_id, event_id in changed
+        ],
+    )
+    updated = {}
+    incomplete = set()
+    for (user_id, _), body in zip(changed, bodies):
+        if body is None:
+            incomplete.add(user_id)
+        else:
+            updated.setdefault(user_id, []).append(body)
+
+    for user_id, removed_ids in removed.items():
+        cache.apply(user_id, updated.get(user_id, []), removed_ids)
+        # Com algum evento alterado não obtido, a agenda continua vencida
+        if user_id not in incomplete:
+            cache.touch(user_id)
+        cache.count("revalidated")
+    cache.count("changed", sum(len(events) for events in updated.values()))
+
+
+# Indica se o Graph rejeitou um delta link expirado (410 Gone), caso em que é
+# preciso refazer a sincronização completa
+def _is_expired_delta(error):
+    return error.response is not None and error.response.status_code == 410
+
+
+# Percorre as páginas de uma consulta delta, chamando apply_page para cada página,
+# e retorna o @odata.deltaLink da última página
+def _walk_delta_pages(token, endpoint, apply_page):
+    delta_link = None
+    while endpoint:
+        page = call_graph_api(token, endpoint) or {}
+        apply_page(page.get("value", []))
+        endpoint = page.get("@odata.nextLink")
+        delta_link = page.get("@odata.deltaLink", delta_link)
+    return delta_link
+
+
+# Sincroniza o diretório de usuários no armazenamento local usando /users/delta.
+# Com um delta link salvo apenas as alterações desde a última execução são
+# transferidas; sem ele (ou se ele expirou) é feita uma sincronização completa.
+def sync_users_delta(token):
+    store = get_state_store()
+    counts = {"updated": 0, "removed": 0}
+
+    def apply_page(items):
+        removed = [item["id"] for item in items if "@removed" in item]
+        updated = [item for item in items if "@removed" not in item]
+        store.delete_users(removed)
+        store.upsert_users(updated)
+        counts["removed"] += len(removed)
+        counts["updated"] += len(updated)
+
+    delta_link = store.get_delta_link("users")
+    if delta_link:
+        log_action("Sincronizando alterações no diretório de usuários (delta)...")
+        try:
+            new_delta_link = _walk_delta_pages(token, delta_link, apply_page)
+            store.set_delta_link("users", new_delta_link or delta_link)
+            log_action(
+                f"Diretório sincronizado: {counts['updated']} usuário(s) alterado(s), {counts['removed']} removido(s)."
+            )
+            return counts
+        except requests.exceptions.HTTPError as e:
+            if not _is_expired_delta(e):
+                raise
+            log_action(
+                "Delta link de usuários expirado. Executando sincronização completa...",
+                success=False,
+            )
+
+    log_action("Executando sincronização completa do diretório de usuários...")
+    store.delete_delta_link("users")
+    store.clear_users()
+    new_delta_link = _walk_delta_pages(
+        token, f"/users/delta?$select={USER_SELECT_FIELDS}", apply_page
+    )
+    if new_delta_link:
+        store.set_delta_link("users", new_delta_link)
+    log_action(f"Sincronização completa: {counts['updated']} usuário(s).")
+    return counts
+
+
+# Sincroniza os eventos de um usuário usando calendarView/delta e retorna os
+# eventos de hoje armazenados. O delta link é obtido para uma janela de
+# CALENDAR_PREFETCH_DAYS dias a partir de hoje e continua valendo nos dias
+# seguintes enquanto a janela cobrir o dia atual; quando deixa de cobrir (ou o
+# link expira) os eventos do usuário são sincronizados do zero. O dia é o dia
+# local no fuso zone do usuário (ou no fuso padrão).
+def sync_events_delta(token, user_id, zone=None):
+    store = get_state_store()
+    resource = f"calendarView:{user_id}"
+    day_start, day_end = (_time_key(value) for value in _local_days(zone=zone))
+
+    def apply_page(items):
+        store.delete_events(
+            user_id, [item["id"] for item in items if "@removed" in item]
+        )
+        store.upsert_events(user_id, [item for item in items if "@removed" not in item])
+
+    # O escopo do delta link é a janela consultada ("início/fim", em UTC)
+    scope = store.get_delta_scope(resource)
+    window = scope.split("/") if scope else []
+    delta_link = None
+    if len(window) == 2 and window[0] <= day_start and window[1] >= day_end:
+        delta_link = store.get_delta_link(resource, scope=scope)
+    if delta_link:
+        try:
+            new_delta_link = _walk_delta_pages(token, delta_link, apply_page)
+            store.set_delta_link(resource, new_delta_link or delta_link, scope=scope)
+            return _events_between(store.get_events(user_id), day_start, day_end)
+        except requests.exceptions.HTTPError as e:
+            if not _is_expired_delta(e):
+                raise
+            log_action(
+                f"Delta link de eventos do usuário {user_id} expirado. Sincronizando novamente...",
+                success=False,
+            )
+
+    window_start, window_end = _local_days(Config.CALENDAR_PREFETCH_DAYS, zone)
+    store.delete_delta_link(resource)
+    store.clear_events(user_id)
+    new_delta_link = _walk_delta_pages(
+        token,
+        f"/users/{user_id}/calendarView/delta?startDateTime={_graph_time(window_start)}&endDateTime={_graph_time(window_end)}",
+        apply_page,
+    )
+    if new_delta_link:
+        store.set_delta_link(
+            resource,
+            new_delta_link,
+            scope=f"{_time_key(window_start)}/{_time_key(window_end)}",
+        )
+    return _events_between(store.get_events(user_id), day_start, day_end)
+
+
+# Eventos que se sobrepõem ao intervalo [start, end] (chaves UTC), como no
+# cache de agendas do modo prefetch
+def _events_between(events, start, end):
+    return [
+        event
+        for event in events
+        if utc_key(event.get("start")) <= end and utc_key(event.get("end")) >= start
+    ]
@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+
+from m365_reminder_project.state_store import get_state_store
+
+_CALENDAR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendar_windows (
+    user_id TEXT PRIMARY KEY,
+    window_start TEXT NOT NULL,
+    window_end TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calendar_events (
+    user_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    change_key TEXT,
+    start_utc TEXT NOT NULL,
+    end_utc TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS calendar_events_by_start
+    ON calendar_events (user_id, start_utc);
+"""
+
+
+# Formato das chaves de horário (UTC) usadas nas comparações do cache
+TIME_KEY_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+# Horário UTC de um início/fim do Graph no formato das chaves de comparação.
+# Sem o cabeçalho Prefer: outlook.timezone o Graph devolve os horários em UTC.
+def utc_key(value):
+    return (value or {}).get("dateTime", "")[:19]
+
+
+# Cache local (no armazenamento de estado) da agenda de vários dias de cada
+# usuário, obtida do calendarView. Guarda a janela consultada, o momento da
+# consulta e o changeKey de cada evento, usado para revalidar apenas os eventos
+# alterados.
+class CalendarCache:
+    def __init__(self, store):
+        self.store = store
+        store.ensure_schema(_CALENDAR_SCHEMA)
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "fetched": 0, "changed": 0}
+
+    def count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    # Janela armazenada de um usuário: (início, fim, fetched_at) ou None
+    def window(self, user_id):
+        rows = self.store.query(
+            "SELECT window_start, window_end, fetched_at FROM calendar_windows "
+            "WHERE user_id = ?",
+            (user_id,),
+        )
+        return rows[0] if rows else None
+
+    # Substitui toda a agenda armazenada de um usuário por uma nova janela
+    def replace(self, user_id, window_start, window_end, events):
+        self.store.execute("DELETE FROM calendar_events WHERE user_id = ?", (user_id,))
+        self.apply(user_id, events, [])
+        self.store.execute(
+            "INSERT OR REPLACE INTO calendar_windows "
+            "(user_id, window_start, window_end, fetched_at) VALUES (?, ?, ?, ?)",
+            (user_id, window_start, window_end, time.time()),
+        )
+
+    # changeKey de cada evento armazenado do usuário
+    def change_keys(self, user_id):
+        return dict(
+            self.store.query(
+                "SELECT event_id, change_key FROM calendar_events WHERE user_id = ?",
+                (user_id,),
+            )
+        )
+
+    # Aplica eventos alterados e removidos à agenda armazenada
+    def apply(self, user_id, updated, removed_ids):
+        if removed_ids:
+            self.store.executemany(
+                "DELETE FROM calendar_events WHERE user_id = ? AND event_id = ?",
+                [(user_id, event_id) for event_id in removed_ids],
+            )
+        if updated:
+            self.store.executemany(
+                "INSERT OR REPLACE INTO calendar_events "
+                "(user_id, event_id, change_key, start_utc, end_utc, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        user_id,
+                        event["id"],
+                        event.get("changeKey"),
+                        utc_key(event.get("start")),
+                        utc_key(event.get("end")),
+                        json.dumps(event),
+                    )
+                    for event in updated
+                ],
+            )
+
+    # Marca a agenda do usuário como revalidada agora
+    def touch(self, user_id):
+        self.store.execute(
+            "UPDATE calendar_windows SET fetched_at = ? WHERE user_id = ?",
+            (time.time(), user_id),
+        )
+
+    # Eventos armazenados que se sobrepõem ao intervalo [start, end], em ordem
+    # de início
+    def events_between(self, user_id, start, end):
+        rows = self.store.query(
+            "SELECT data FROM calendar_events "
+            "WHERE user_id = ? AND start_utc <= ? AND end_utc >= ? "
+            "ORDER BY start_utc, event_id",
+            (user_id, end, start),
+        )
+        return [json.loads(data) for (data,) in rows]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Retorna o cache de agendas sobre o armazenamento de estado atual
+def get_calendar_cache():
+    global _cache
+    store = get_state_store()
+    if _cache is None or _cache.store is not store:
+        with _cache_lock:
+            if _cache is None or _cache.store is not store:
+                _cache = CalendarCache(store)
+    return _cache
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from m365_reminder_project.state_store import get_state_store
+
+_CHAT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS teams_chats (
+    user_id TEXT PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+# Cache persistente (no armazenamento de estado) do chat one-on-one do Teams de
+# cada usuário. Com o id do chat em cache, a mensagem diária é enviada com uma
+# única chamada a /chats/{id}/messages, sem o POST /chats que cria ou localiza o
+# chat. Um chat que deixou de existir ou de ser acessível (404/403) é removido.
+class ChatCache:
+    def __init__(self, store):
+        self.store = store
+        store.ensure_schema(_CHAT_SCHEMA)
+
+    # Ids de chat em cache dos usuários (apenas os encontrados)
+    def get_many(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        placeholders = ",".join("?" * len(user_ids))
+        return dict(
+            self.store.query(
+                f"SELECT user_id, chat_id FROM teams_chats WHERE user_id IN ({placeholders})",
+                user_ids,
+            )
+        )
+
+    # Grava vários pares (user_id, chat_id) em uma única transação
+    def put_many(self, chats):
+        now = time.time()
+        self.store.executemany(
+            "INSERT OR REPLACE INTO teams_chats (user_id, chat_id, updated_at) "
+            "VALUES (?, ?, ?)",
+            [(user_id, chat_id, now) for user_id, chat_id in chats],
+        )
+
+    def invalidate(self, user_id):
+        self.store.execute("DELETE FROM teams_chats WHERE user_id = ?", (user_id,))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Retorna o cache de chats sobre o armazenamento de estado atual
+def get_chat_cache():
+    global _cache
+    store = get_state_store()
+    if _cache is None or _cache.store is not store:
+        with _cache_lock:
+            if _cache is None or _cache.store is not store:
+                _cache = ChatCache(store)
+    return _cache
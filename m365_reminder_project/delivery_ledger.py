@@ -0,0 +1,136 @@
+import threading
+import time
+from datetime import timedelta
+
+from m365_reminder_project.state_store import get_state_store
+from m365_reminder_project.timezones import default_zone, local_today
+
+# Canais registrados no livro de entregas
+EMAIL = "email"
+ONEDRIVE = "onedrive"
+TEAMS = "teams"
+# Registro do usuário gravado na exportação da agenda (EXPORT_FILE)
+EXPORT = "export"
+
+# Dias mantidos no livro; registros mais antigos são descartados ao abri-lo
+RETENTION_DAYS = 7
+
+_LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS delivery_ledger (
+    day TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    delivered INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (day, user_id, channel)
+);
+"""
+
+
+# Livro de entregas do dia (no armazenamento de estado): para cada usuário e
+# canal, se o lembrete já foi entregue e quantas tentativas foram feitas. Permite
+# que uma execução interrompida seja retomada (--resume) apenas com o que falta,
+# sem reenviar e-mails a quem já os recebeu.
+class DeliveryLedger:
+    def __init__(self, store):
+        self.store = store
+        store.ensure_schema(_LEDGER_SCHEMA)
+        cutoff = (
+            local_today(default_zone()) - timedelta(days=RETENTION_DAYS)
+        ).isoformat()
+        store.execute("DELETE FROM delivery_ledger WHERE day < ?", (cutoff,))
+
+    # Canais já entregues no dia para cada um dos usuários (consulta única)
+    def delivered(self, day, user_ids):
+        delivered = {user_id: set() for user_id in user_ids}
+        if not delivered:
+            return delivered
+        placeholders = ",".join("?" * len(delivered))
+        rows = self.store.query(
+            "SELECT user_id, channel FROM delivery_ledger "
+            f"WHERE day = ? AND delivered = 1 AND user_id IN ({placeholders})",
+            (day, *delivered),
+        )
+        for user_id, channel in rows:
+            delivered[user_id].add(channel)
+        return delivered
+
+    # Registra o resultado de várias entregas de um canal em uma única
+    # transação. entries é uma lista de (user_id, entregue). Uma entrega já
+    # confirmada não volta a ser marcada como pendente.
+    def record(self, day, channel, entries):
+        now = time.time()
+        self.store.executemany(
+            "INSERT INTO delivery_ledger "
+            "(day, user_id, channel, delivered, attempts, updated_at) "
+            "VALUES (?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT(day, user_id, channel) DO UPDATE SET "
+            "delivered = MAX(delivered, excluded.delivered), "
+            "attempts = attempts + 1, updated_at = excluded.updated_at",
+            [
+                (day, user_id, channel, int(bool(success)), now)
+                for user_id, success in entries
+            ],
+        )
+
+    # Registros do dia (user_id, channel, delivered, attempts), para combinar
+    # os livros de vários shards
+    def rows(self, day):
+        return self.store.query(
+            "SELECT user_id, channel, delivered, attempts FROM delivery_ledger "
+            "WHERE day = ?",
+            (day,),
+        )
+
+    # Incorpora registros de outro livro (rows), mantendo as entregas confirmadas
+    # e o maior número de tentativas
+    def merge(self, day, rows):
+        now = time.time()
+        self.store.executemany(
+            "INSERT INTO delivery_ledger "
+            "(day, user_id, channel, delivered, attempts, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(day, user_id, channel) DO UPDATE SET "
+            "delivered = MAX(delivered, excluded.delivered), "
+            "attempts = MAX(attempts, excluded.attempts), "
+            "updated_at = excluded.updated_at",
+            [
+                (day, user_id, channel, delivered, attempts, now)
+                for user_id, channel, delivered, attempts in rows
+            ],
+        )
+
+    # Quantidade de entregas confirmadas e pendentes por canal no dia
+    def summary(self, day):
+        rows = self.store.query(
+            "SELECT channel, delivered, COUNT(*) FROM delivery_ledger "
+            "WHERE day = ? GROUP BY channel, delivered",
+            (day,),
+        )
+        summary = {}
+        for channel, delivered, count in rows:
+            counts = summary.setdefault(channel, {"delivered": 0, "pending": 0})
+            counts["delivered" if delivered else "pending"] += count
+        return summary
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+# Retorna o livro de entregas sobre o armazenamento de estado atual
+def get_delivery_ledger():
+    global _ledger
+    store = get_state_store()
+    if _ledger is None or _ledger.store is not store:
+        with _ledger_lock:
+            if _ledger is None or _ledger.store is not store:
+                _ledger = DeliveryLedger(store)
+    return _ledger
+
+
+# Dia usado como chave do livro: o dia local no fuso padrão, o mesmo dia dos
+# lembretes e do agendador (não o dia do sistema, que pode estar em UTC)
+def ledger_day():
+    return local_today(default_zone()).isoformat()
@@ -0,0 +1,98 @@
+import threading
+
+from m365_reminder_project.models import Event
+
+
+# Chave de deduplicação de um evento vindo do Graph. Cada participante recebe uma
+# cópia do evento com um id próprio, mas o iCalUId é o mesmo em todas as cópias;
+# o horário entra na chave para distinguir ocorrências de uma série.
+def event_key(event_dict):
+    uid = event_dict.get("iCalUId") or event_dict["id"]
+    start = (event_dict.get("start") or {}).get("dateTime")
+    end = (event_dict.get("end") or {}).get("dateTime")
+    return uid, start, end
+
+
+# Cache de eventos válido durante uma execução: reaproveita os campos do Event já
+# convertido quando a mesma reunião aparece na agenda de vários usuários, junto
+# com os fragmentos formatados a partir dele (horário, linhas dos templates, ...).
+# Só o id, próprio da cópia de cada participante, é mantido por usuário. Memória e
+# CPU passam a crescer com o número de reuniões distintas.
+class EventCache:
+    def __init__(self):
+        self._events = {}
+        self._fragments = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Retorna o Event correspondente ao dicionário do Graph, convertendo-o apenas
+    # na primeira vez que a reunião aparece. As cópias dos demais participantes
+    # compartilham os campos do primeiro Event, com o id de cada um.
+    def intern(self, event_dict):
+        key = event_key(event_dict)
+        with self._lock:
+            event = self._events.get(key)
+            if event is not None:
+                self.hits += 1
+                return _with_id(event, event_dict["id"])
+            self.misses += 1
+
+        # A conversão é feita fora do lock; se outra thread converteu a mesma
+        # reunião nesse meio-tempo, prevalece o primeiro Event armazenado
+        event = Event.from_dict(event_dict)
+        event.cache_key = key
+        with self._lock:
+            existing = self._events.setdefault(key, event)
+        return _with_id(existing, event_dict["id"])
+
+    # Retorna um fragmento derivado do evento (identificado por kind), chamando
+    # build(event) apenas na primeira vez. Eventos que não passaram por intern()
+    # não são armazenados.
+    def fragment(self, event, kind, build):
+        key = event.cache_key
+        if key is None:
+            return build(event)
+        fragment_key = (kind, key)
+        value = self._fragments.get(fragment_key)
+        if value is None:
+            value = build(event)
+            self._fragments[fragment_key] = value
+        return value
+
+    # Estatísticas de uso: consultas, acertos, eventos distintos e taxa de acerto
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "lookups": lookups,
+                "hits": self.hits,
+                "unique": len(self._events),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# O próprio evento, se já tiver o id pedido, ou uma cópia com esse id
+def _with_id(event, event_id):
+    return event if event.id == event_id else event.with_id(event_id)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Retorna o cache de eventos compartilhado da execução atual
+def get_event_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EventCache()
+    return _cache
+
+
+# Descarta o cache de eventos (a próxima chamada cria outro vazio)
+def reset_event_cache():
+    global _cache
+    with _cache_lock:
+        _cache = None
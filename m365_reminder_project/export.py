@@ -0,0 +1,189 @@
+import atexit
+import gzip
+import json
+import queue
+import threading
+
+from config import Config
+from m365_reminder_project.api import log_action
+from m365_reminder_project.delivery_ledger import EXPORT, get_delivery_ledger
+
+# Registros aguardando gravação; com a fila cheia o pipeline aguarda a escrita,
+# então a memória usada pela exportação não cresce com o número de usuários
+EXPORT_QUEUE_SIZE = 1000
+
+# Tempo máximo (segundos) que close() aguarda a gravação dos registros pendentes
+EXPORT_CLOSE_TIMEOUT = 30
+
+
+# Monta o registro de exportação de um usuário: os eventos processados
+# (Event.to_dict), os conflitos de horário (pares e grupos de ids de eventos) e
+# os blocos de foco sugeridos
+def agenda_record(
+    day, user_id, user_name, zone, events, conflicts, clusters, focus_blocks
+):
+    return {
+        "day": day,
+        "user_id": user_id,
+        "user_name": user_name,
+        "time_zone": str(zone) if zone is not None else None,
+        "events": [event.to_dict() for event in events],
+        "conflicts": [[first.id, second.id] for first, second in conflicts],
+        "conflict_clusters": [[event.id for event in cluster] for cluster in clusters],
+        "focus_blocks": [
+            [start.isoformat(), end.isoformat()] for start, end in focus_blocks
+        ],
+    }
+
+
+# Exportação da agenda do dia: um registro JSON por usuário processado (JSON
+# lines), gravado à medida que os usuários são processados. Como no escritor de
+# log, record() apenas enfileira o registro e uma thread de fundo grava os lotes;
+# a fila é limitada, então a memória é constante. O caminho pode conter {day}
+# (um arquivo por dia); caminhos terminados em .gz são comprimidos com gzip. O
+# arquivo é aberto para acréscimo, então execuções retomadas e o modo daemon
+# continuam o arquivo do dia. Com um livro de entregas (ledger), cada registro
+# gravado é marcado no canal EXPORT, e o pipeline não exporta de novo os
+# usuários já marcados no dia.
+class AgendaExporter:
+    def __init__(self, path, queue_size=EXPORT_QUEUE_SIZE, batch_size=256, ledger=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.ledger = ledger
+        self.exported = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._file = None
+        self._file_path = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="agenda-export", daemon=True
+        )
+        self._thread.start()
+
+    # Enfileira o registro de um usuário (ver agenda_record)
+    def record(self, record):
+        if not self._closed:
+            self._queue.put(record)
+
+    # Aguarda até que todos os registros enfileirados tenham sido gravados
+    def flush(self):
+        self._queue.join()
+
+    # Grava os registros pendentes, fecha o arquivo e encerra a thread de escrita,
+    # aguardando no máximo timeout segundos
+    def close(self, timeout=EXPORT_CLOSE_TIMEOUT):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            log_action(
+                "A exportação da agenda não terminou de gravar os registros "
+                f"pendentes em {timeout} segundo(s).",
+                success=False,
+            )
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            try:
+                self._write(records)
+            except Exception as e:
+                # Um erro não pode encerrar a thread: record() e close() ficariam
+                # bloqueados esperando a fila
+                self.errors += len(records)
+                log_action(f"Erro ao gravar a exportação da agenda: {e}", success=False)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._close_file()
+                return
+
+    def _write(self, records):
+        # Registros do mesmo dia são gravados com uma única escrita
+        by_day = {}
+        for record in records:
+            by_day.setdefault(record["day"], []).append(record)
+        for day, day_records in by_day.items():
+            lines = [json.dumps(r, ensure_ascii=False) + "\n" for r in day_records]
+            try:
+                self._open(self.path.format(day=day)).write("".join(lines))
+                self._file.flush()
+                self.exported += len(lines)
+            except OSError as e:
+                self.errors += len(lines)
+                log_action(f"Erro ao gravar a exportação da agenda: {e}", success=False)
+                continue
+            if self.ledger is None:
+                continue
+            try:
+                self.ledger.record(
+                    day, EXPORT, [(r["user_id"], True) for r in day_records]
+                )
+            except Exception as e:
+                # Os registros já foram gravados; sem a marcação no livro eles
+                # podem ser exportados de novo por uma execução retomada
+                log_action(
+                    f"Erro ao registrar a exportação da agenda no livro de entregas: {e}",
+                    success=False,
+                )
+
+    # Arquivo aberto para o caminho (fecha o anterior ao virar o dia)
+    def _open(self, path):
+        if self._file_path != path:
+            self._close_file()
+            if path.endswith(".gz"):
+                self._file = gzip.open(path, "at", encoding="utf-8")
+            else:
+                self._file = open(path, "a", encoding="utf-8")
+            self._file_path = path
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_path = None
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+# Retorna o exportador compartilhado (EXPORT_FILE), criando-o no primeiro uso
+def get_agenda_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = AgendaExporter(
+                    Config.EXPORT_FILE, ledger=get_delivery_ledger()
+                )
+    return _exporter
+
+
+# Grava os registros pendentes e encerra o exportador compartilhado. Retorna o
+# exportador encerrado (None se não havia exportação), para o resumo da execução.
+def close_agenda_exporter():
+    global _exporter
+    with _exporter_lock:
+        exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.close()
+    return exporter
+
+
+atexit.register(close_agenda_exporter)
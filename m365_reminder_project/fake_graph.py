@@ -0,0 +1,440 @@
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from m365_reminder_project.throttling import mailbox_for_endpoint
+
+# Servidor local que imita as partes do Microsoft Graph e do Azure AD usadas pelo
+# script (token, /users com paginação e delta, eventos do calendário e
+# calendarView, sendMail, /$batch, upload no OneDrive, simples ou por sessão de
+# upload, e chats do Teams). Serve para medir a vazão de main.main() de ponta a
+# ponta e para testes de regressão sem acesso ao tenant.
+# Basta apontar Config.GRAPH_BASE_URL e Config.LOGIN_BASE_URL para o servidor.
+
+_USER_PATH = re.compile(r"^/users/([^/]+)(/.*)?$")
+_CHAT_MESSAGES_PATH = re.compile(r"^/chats/([^/]+)/messages$")
+_UPLOAD_PATH = re.compile(r"^/upload/([^/]+)$")
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+# Cenário simulado: tamanho do tenant, eventos por usuário, latência e limitação
+class FakeTenant:
+    def __init__(
+        self,
+        users=100,
+        events_per_user=3,
+        meeting_size=10,
+        latency=0.0,
+        throttle_rate=0.0,
+        retry_after=1,
+        mailbox_concurrency=4,
+        seed=42,
+    ):
+        self.users = users
+        self.events_per_user = events_per_user
+        # Usuários consecutivos compartilham as mesmas reuniões (mesmo iCalUId)
+        self.meeting_size = max(1, meeting_size)
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        # Como no Graph, os itens de um $batch são executados em paralelo e cada
+        # caixa de correio aceita no máximo mailbox_concurrency deles; os
+        # excedentes recebem 429 (0 desativa o limite)
+        self.mailbox_concurrency = mailbox_concurrency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.throttled = 0
+        self.chat_ids = itertools.count(1)
+        # Chat one-on-one de cada usuário (como no Graph, o POST /chats devolve o
+        # chat existente), chats excluídos (mensagens retornam 404) e mensagens
+        # recebidas por chat
+        self.chats = {}
+        self.deleted_chats = set()
+        self.messages = {}
+        # Sessões de upload abertas (id -> usuário, caminho, bytes recebidos) e
+        # conteúdo final dos arquivos enviados ao OneDrive, por (usuário, caminho)
+        self.upload_sessions = {}
+        self.files = {}
+        self.session_ids = itertools.count(1)
+        # Incrementar revision altera o changeKey de todos os eventos (simula
+        # alterações nas agendas entre duas execuções)
+        self.revision = 0
+        # Fuso horário (nome do Windows, como no mailboxSettings) por usuário;
+        # usuários sem entrada usam default_time_zone
+        self.time_zones = {}
+        self.default_time_zone = "E. South America Standard Time"
+
+    def user(self, index):
+        return {
+            "id": f"user-{index}",
+            "displayName": f"Usuário {index} Teste",
+            "mail": f"user{index}@example.com",
+            "userPrincipalName": f"user{index}@example.com",
+        }
+
+    def events(self, user_id):
+        index = int(user_id.rsplit("-", 1)[-1])
+        group = index // self.meeting_size
+        today = datetime.now(timezone.utc).replace(
+            hour=12, minute=0, second=0, microsecond=0
+        )
+        events = []
+        for k in range(self.events_per_user):
+            start = today + timedelta(minutes=45 * k)
+            events.append(
+                {
+                    "id": f"{user_id}-event-{k}",
+                    "iCalUId": f"meeting-{group}-{k}",
+                    "changeKey": f"ck-{group}-{k}-{self.revision}",
+                    "subject": f"Reunião {group}-{k}",
+                    "bodyPreview": "Pauta da reunião",
+                    "start": {"dateTime": start.isoformat(), "timeZone": "UTC"},
+                    "end": {
+                        "dateTime": (start + timedelta(hours=1)).isoformat(),
+                        "timeZone": "UTC",
+                    },
+                    "location": {"displayName": f"Sala {group % 20}"},
+                    "organizer": {"emailAddress": self.user(group * self.meeting_size)},
+                    "attendees": [],
+                    "isAllDay": False,
+                }
+            )
+        return events
+
+    # Registra a requisição e indica se ela deve ser limitada (429)
+    def count(self, route):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            if self.throttle_rate and self._random.random() < self.throttle_rate:
+                self.throttled += 1
+                return True
+        return False
+
+
+class _FakeGraphHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def tenant(self):
+        return self.server.tenant
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.tenant.latency:
+            time.sleep(self.tenant.latency)
+
+        parts = urlsplit(self.path)
+        if parts.path.endswith("/oauth2/v2.0/token"):
+            self.tenant.count("token")
+            self._send(200, {"access_token": "fake-token", "expires_in": 3600})
+            return
+
+        upload = _UPLOAD_PATH.match(parts.path)
+        if upload:
+            self._send(*self._upload_session(method, upload.group(1), body))
+            return
+
+        path = parts.path.removeprefix("/v1.0")
+        if method == "POST" and path == "/$batch":
+            if self.tenant.count("batch"):
+                self._send_throttled()
+                return
+            self._send(200, {"responses": self._batch(json.loads(body or b"{}"))})
+            return
+
+        status, payload, headers = self.dispatch(method, path, parts.query, body)
+        self._send(status, payload, headers)
+
+    # Atende uma requisição do Graph e retorna (status, corpo, cabeçalhos)
+    def dispatch(self, method, path, query, body):
+        route = self._route(method, path)
+        if route is None:
+            return 404, {"error": {"code": "NotFound", "message": path}}, {}
+        if self.tenant.count(route):
+            return (
+                429,
+                {"error": {"code": "TooManyRequests"}},
+                {"Retry-After": str(self.tenant.retry_after)},
+            )
+
+        params = parse_qs(query)
+        if route == "users":
+            return 200, self._users_page(params), {}
+        if route == "users_delta":
+            users = [self.tenant.user(i) for i in range(self.tenant.users)]
+            return (
+                200,
+                {
+                    "value": users,
+                    "@odata.deltaLink": self._url("/users/delta?$deltatoken=1"),
+                },
+                {},
+            )
+
+        if route == "chats":
+            return 201, {"id": self._chat_for(body)}, {}
+        if route == "chat_messages":
+            chat_id = _CHAT_MESSAGES_PATH.match(path).group(1)
+            if chat_id in self.tenant.deleted_chats:
+                return 404, {"error": {"code": "NotFound"}}, {}
+            with self.tenant._lock:
+                self.tenant.messages[chat_id] = self.tenant.messages.get(chat_id, 0) + 1
+            return 201, {"id": f"message-{next(self.tenant.chat_ids)}"}, {}
+
+        user_id = _USER_PATH.match(path).group(1)
+        if route == "events":
+            return 200, {"value": self.tenant.events(user_id)}, {}
+        if route == "calendar_view":
+            events = self.tenant.events(user_id)
+            select = params.get("$select", [""])[0]
+            if select == "id,changeKey":
+                events = [{"id": e["id"], "changeKey": e["changeKey"]} for e in events]
+            return 200, {"value": events}, {}
+        if route == "event":
+            event_id = path.rsplit("/", 1)[-1]
+            for event in self.tenant.events(user_id):
+                if event["id"] == event_id:
+                    return 200, event, {}
+            return 404, {"error": {"code": "ErrorItemNotFound"}}, {}
+        if route == "events_delta":
+            return (
+                200,
+                {
+                    "value": self.tenant.events(user_id),
+                    "@odata.deltaLink": self._url(
+                        f"/users/{user_id}/calendarView/delta?$deltatoken=1"
+                    ),
+                },
+                {},
+            )
+        if route == "time_zone":
+            name = self.tenant.time_zones.get(user_id, self.tenant.default_time_zone)
+            return 200, {"value": name}, {}
+        if route == "sendmail":
+            return 202, None, {}
+        if route == "drive":
+            item_path = path.split("/drive/root:/", 1)[-1].removesuffix(":/content")
+            self.tenant.files[(user_id, item_path)] = body
+            return 201, {"id": f"file-{user_id}", "size": len(body)}, {}
+        if route == "upload_session":
+            item_path = path.split("/drive/root:/", 1)[-1].removesuffix(
+                ":/createUploadSession"
+            )
+            session_id = f"session-{next(self.tenant.session_ids)}"
+            self.tenant.upload_sessions[session_id] = {
+                "user_id": user_id,
+                "path": item_path,
+                "data": bytearray(),
+            }
+            return 200, {"uploadUrl": self._upload_url(session_id)}, {}
+        return 404, {"error": {"code": "NotFound", "message": path}}, {}
+
+    def _route(self, method, path):
+        if method == "GET" and path == "/users":
+            return "users"
+        if method == "GET" and path == "/users/delta":
+            return "users_delta"
+        if method == "POST" and path == "/chats":
+            return "chats"
+        if method == "POST" and _CHAT_MESSAGES_PATH.match(path):
+            return "chat_messages"
+        match = _USER_PATH.match(path)
+        if not match:
+            return None
+        rest = match.group(2) or ""
+        if method == "GET" and rest == "/calendar/events":
+            return "events"
+        if method == "GET" and rest == "/calendarView/delta":
+            return "events_delta"
+        if method == "GET" and rest == "/calendarView":
+            return "calendar_view"
+        if method == "GET" and rest.startswith("/events/"):
+            return "event"
+        if method == "GET" and rest == "/mailboxSettings/timeZone":
+            return "time_zone"
+        if method == "POST" and rest == "/sendMail":
+            return "sendmail"
+        if method == "PUT" and rest.startswith("/drive/"):
+            return "drive"
+        if method == "POST" and rest.endswith(":/createUploadSession"):
+            return "upload_session"
+        return None
+
+    # Chat one-on-one com o último membro do corpo do POST /chats: o existente
+    # ou, se ainda não houver (ou tiver sido excluído), um novo
+    def _chat_for(self, body):
+        members = json.loads(body or b"{}").get("members") or [{}]
+        user_id = members[-1].get("user@odata.bind", "").rsplit("/", 1)[-1]
+        with self.tenant._lock:
+            chat_id = self.tenant.chats.get(user_id)
+            if chat_id is None or chat_id in self.tenant.deleted_chats:
+                chat_id = f"chat-{next(self.tenant.chat_ids)}"
+                self.tenant.chats[user_id] = chat_id
+        return chat_id
+
+    def _users_page(self, params):
+        top = int(params.get("$top", ["100"])[0])
+        skip = int(params.get("$skiptoken", ["0"])[0])
+        end = min(skip + top, self.tenant.users)
+        page = {"value": [self.tenant.user(i) for i in range(skip, end)]}
+        if end < self.tenant.users:
+            page["@odata.nextLink"] = self._url(f"/users?$top={top}&$skiptoken={end}")
+        return page
+
+    def _batch(self, payload):
+        responses = []
+        per_mailbox = {}
+        for item in payload.get("requests", []):
+            parts = urlsplit(item["url"])
+            mailbox = mailbox_for_endpoint(parts.path)
+            if mailbox is not None and self.tenant.mailbox_concurrency:
+                per_mailbox[mailbox] = per_mailbox.get(mailbox, 0) + 1
+                if per_mailbox[mailbox] > self.tenant.mailbox_concurrency:
+                    with self.tenant._lock:
+                        self.tenant.throttled += 1
+                    responses.append(
+                        {
+                            "id": item["id"],
+                            "status": 429,
+                            "headers": {"Retry-After": str(self.tenant.retry_after)},
+                            "body": {"error": {"code": "ApplicationThrottled"}},
+                        }
+                    )
+                    continue
+            body = json.dumps(item.get("body")).encode() if item.get("body") else b""
+            status, result, headers = self.dispatch(
+                item.get("method", "GET"), parts.path, parts.query, body
+            )
+            responses.append(
+                {"id": item["id"], "status": status, "headers": headers, "body": result}
+            )
+        return responses
+
+    # Recebe um bloco (PUT com Content-Range), informa o progresso (GET) ou
+    # cancela (DELETE) uma sessão de upload. O bloco deve começar no primeiro
+    # byte ainda esperado; o último bloco conclui o arquivo.
+    def _upload_session(self, method, session_id, body):
+        session = self.tenant.upload_sessions.get(session_id)
+        if session is None:
+            return 404, {"error": {"code": "itemNotFound"}}, {}
+        if method == "DELETE":
+            del self.tenant.upload_sessions[session_id]
+            return 204, None, {}
+        if method == "GET":
+            return 200, {"nextExpectedRanges": [f"{len(session['data'])}-"]}, {}
+
+        if self.tenant.count("upload_chunk"):
+            return (
+                429,
+                {"error": {"code": "TooManyRequests"}},
+                {"Retry-After": str(self.tenant.retry_after)},
+            )
+        match = _CONTENT_RANGE.match(self.headers.get("Content-Range", ""))
+        if not match or int(match.group(1)) != len(session["data"]):
+            return 416, {"error": {"code": "invalidRange"}}, {}
+        session["data"].extend(body)
+        total = int(match.group(3))
+        if len(session["data"]) < total:
+            return (
+                202,
+                {"nextExpectedRanges": [f"{len(session['data'])}-{total - 1}"]},
+                {},
+            )
+
+        del self.tenant.upload_sessions[session_id]
+        self.tenant.files[(session["user_id"], session["path"])] = bytes(
+            session["data"]
+        )
+        return 201, {"id": f"file-{session['user_id']}", "size": total}, {}
+
+    def _upload_url(self, session_id):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/upload/{session_id}"
+
+    def _url(self, path):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1.0{path}"
+
+    def _send_throttled(self):
+        self._send(
+            429,
+            {"error": {"code": "TooManyRequests"}},
+            {"Retry-After": str(self.tenant.retry_after)},
+        )
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# Servidor HTTP local do Graph simulado. Use como gerenciador de contexto:
+#   with FakeGraphServer(FakeTenant(users=1000)) as server:
+#       Config.GRAPH_BASE_URL = server.graph_url
+#       Config.LOGIN_BASE_URL = server.login_url
+class FakeGraphServer:
+    def __init__(self, tenant=None, host="127.0.0.1", port=0):
+        self.tenant = tenant or FakeTenant()
+        self._server = ThreadingHTTPServer((host, port), _FakeGraphHandler)
+        self._server.daemon_threads = True
+        self._server.tenant = self.tenant
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def graph_url(self):
+        return f"{self.base_url}/v1.0"
+
+    @property
+    def login_url(self):
+        return self.base_url
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-graph", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
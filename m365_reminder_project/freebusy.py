@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+from datetime import time as day_time
+
+import numpy as np
+
+from m365_reminder_project.timezones import as_utc, default_zone, local_today
+
+
+# Encontra as sequências de valores True em cada linha de uma matriz booleana.
+# Retorna três arrays (linha, início, fim), com fim exclusivo, em ordem de linha
+# e de início.
+def _runs(mask):
+    rows, width = mask.shape
+    padded = np.zeros((rows, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return start_rows, starts, ends
+
+
+# Mapa de ocupação de vários usuários em um dia de trabalho, com resolução de
+# um minuto: busy[i, m] indica se o usuário i está ocupado no minuto m a partir
+# de work_starts[i] (o início do expediente no dia e no horário local do
+# usuário). Todas as análises são feitas de uma só vez para todos os usuários.
+class FreeBusyGrid:
+    def __init__(self, user_ids, work_starts, busy):
+        self.user_ids = list(user_ids)
+        self.work_starts = list(work_starts)
+        self.busy = busy
+        self._rows = {user_id: row for row, user_id in enumerate(self.user_ids)}
+
+    # Monta o mapa a partir de um dicionário user_id -> eventos. Os eventos são
+    # convertidos para o horário local e recortados no horário de trabalho do dia.
+    # zones é o dicionário opcional user_id -> fuso; o expediente de cada usuário
+    # é o do seu fuso (os demais usam o fuso padrão). Sem day, cada usuário usa o
+    # dia de hoje no seu fuso, como suggest_focus_blocks.
+    @classmethod
+    def from_events(
+        cls, events_by_user, day=None, start_hour=9, end_hour=17, zones=None
+    ):
+        fallback = default_zone()
+        minutes = (end_hour - start_hour) * 60
+        # Início do expediente (local e com timezone) de cada fuso, calculado uma
+        # vez por fuso e dia, para medir os eventos sem convertê-los um a um
+        # (horários sem timezone são considerados UTC)
+        starts_by_zone = {}
+        minute = timedelta(minutes=1)
+
+        user_ids = list(events_by_user)
+        work_starts = []
+        rows, starts, ends = [], [], []
+        for row, user_id in enumerate(user_ids):
+            zone = (zones or {}).get(user_id) or fallback
+            zone_day = day or local_today(zone)
+            zone_starts = starts_by_zone.get((zone, zone_day))
+            if zone_starts is None:
+                work_start = datetime.combine(zone_day, day_time(start_hour))
+                zone_starts = starts_by_zone[(zone, zone_day)] = (
+                    work_start,
+                    work_start.replace(tzinfo=zone),
+                )
+            work_start, work_start_aware = zone_starts
+            work_starts.append(work_start)
+            for event in events_by_user[user_id]:
+                rows.append(row)
+                # Minutos parcialmente ocupados contam como ocupados
+                starts.append(
+                    (as_utc(event.start_datetime) - work_start_aware) // minute
+                )
+                ends.append(
+                    -((work_start_aware - as_utc(event.end_datetime)) // minute)
+                )
+
+        # Cada evento soma +1 no minuto de início e -1 no de fim; a soma acumulada
+        # por linha indica quantos eventos cobrem cada minuto
+        coverage = np.zeros((len(user_ids), minutes + 1), dtype=np.int32)
+        if rows:
+            rows = np.asarray(rows)
+            starts = np.clip(np.asarray(starts), 0, minutes)
+            ends = np.clip(np.asarray(ends), 0, minutes)
+            valid = starts < ends
+            np.add.at(coverage, (rows[valid], starts[valid]), 1)
+            np.add.at(coverage, (rows[valid], ends[valid]), -1)
+        busy = np.cumsum(coverage, axis=1)[:, :minutes] > 0
+        return cls(user_ids, work_starts, busy)
+
+    def _to_datetime(self, row, minute):
+        return self.work_starts[row] + timedelta(minutes=int(minute))
+
+    # Blocos livres de pelo menos min_block_minutes para cada usuário, no mesmo
+    # formato de suggest_focus_blocks: user_id -> [(início, fim), ...]
+    def focus_blocks(self, min_block_minutes=60):
+        blocks = {user_id: [] for user_id in self.user_ids}
+        rows, starts, ends = _runs(~self.busy)
+        keep = (ends - starts) >= min_block_minutes
+        for row, start, end in zip(rows[keep], starts[keep], ends[keep]):
+            blocks[self.user_ids[row]].append(
+                (self._to_datetime(row, start), self._to_datetime(row, end))
+            )
+        return blocks
+
+    # Horários em que todos os usuários do grupo estão livres ao mesmo tempo, no
+    # horário local do primeiro usuário (os minutos de cada linha são contados a
+    # partir do expediente local, então o grupo deve estar no mesmo fuso)
+    def common_free_slots(self, user_ids, min_block_minutes=30):
+        rows = [self._rows[user_id] for user_id in user_ids]
+        free = ~self.busy[rows].any(axis=0, keepdims=True)
+        _, starts, ends = _runs(free)
+        return [
+            (self._to_datetime(rows[0], start), self._to_datetime(rows[0], end))
+            for start, end in zip(starts, ends)
+            if end - start >= min_block_minutes
+        ]
+
+    # Estatísticas de ocupação por usuário: minutos ocupados e fração do dia de
+    # trabalho ocupada
+    def utilization(self):
+        busy_minutes = self.busy.sum(axis=1)
+        width = self.busy.shape[1]
+        ratios = busy_minutes / width if width else np.zeros(len(self.user_ids))
+        return {
+            user_id: {"busy_minutes": int(minutes), "utilization": float(ratio)}
+            for user_id, minutes, ratio in zip(self.user_ids, busy_minutes, ratios)
+        }
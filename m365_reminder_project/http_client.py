@@ -0,0 +1,64 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+# Timeout padrão (conexão, leitura) usado em todas as chamadas HTTP de saída
+REQUEST_TIMEOUT = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# Retorna a sessão HTTP compartilhada, criando-a na primeira chamada. A sessão
+# mantém um pool de conexões keep-alive por host (login.microsoftonline.com e
+# graph.microsoft.com), evitando um novo handshake TCP+TLS a cada requisição.
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=Config.HTTP_POOL_SIZE,
+                    # Bloqueia em vez de abrir conexões extras descartáveis quando
+                    # todas as conexões do pool estão em uso
+                    pool_block=True,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["Connection"] = "keep-alive"
+                _session = session
+    return _session
+
+
+# Fecha a sessão compartilhada e suas conexões (a próxima chamada cria outra)
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+# Retorna estatísticas de uso das conexões da sessão compartilhada: total de
+# requisições, conexões abertas e requisições que reutilizaram uma conexão
+def connection_stats():
+    stats = {"requests": 0, "connections": 0, "reused": 0}
+    if _session is None:
+        return stats
+
+    for adapter in set(_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["requests"] += pool.num_requests
+            stats["connections"] += pool.num_connections
+
+    stats["reused"] = max(0, stats["requests"] - stats["connections"])
+    return stats
@@ -0,0 +1,206 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+from config import Config
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+# Formata um registro como linha de texto, no formato histórico do log:
+# [data hora] [SUCESSO|FALHA] mensagem
+def format_text(record):
+    status = "SUCESSO" if record["success"] else "FALHA"
+    return f"[{record['timestamp']}] [{status}] {record['message']}"
+
+
+# Formata um registro como uma linha JSON (JSON lines)
+def format_json(record):
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+
+# Escritor de log assíncrono: log() apenas enfileira o registro; uma thread de
+# fundo retira os registros em lotes e grava cada lote com uma única escrita no
+# arquivo (e no console). O arquivo permanece aberto e é rotacionado ao atingir
+# max_bytes. Com a fila cheia, overflow="block" faz quem registra aguardar e
+# overflow="drop" descarta o registro (os descartes são contados).
+class LogWriter:
+    def __init__(
+        self,
+        path,
+        file_format="text",
+        level="INFO",
+        console=True,
+        max_bytes=0,
+        backup_count=0,
+        queue_size=10000,
+        overflow="block",
+        batch_size=256,
+        flush_interval=0.5,
+    ):
+        self.path = path
+        self.file_format = file_format
+        self.level = LEVELS.get(level.upper(), LEVELS["INFO"])
+        self.console = console
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.run_id = uuid.uuid4().hex[:12]
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._file = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    # Enfileira um registro. Campos extras (user_id, latency_ms, ...) são
+    # incluídos na linha JSON.
+    def log(self, message, success=True, level=None, **fields):
+        if level is None:
+            level = "INFO" if success else "ERROR"
+        if LEVELS.get(level, LEVELS["INFO"]) < self.level or self._closed:
+            return
+
+        record = {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "level": level,
+            "run_id": self.run_id,
+            "success": success,
+            "message": message,
+        }
+        record.update(
+            (key, value) for key, value in fields.items() if value is not None
+        )
+
+        if self.overflow == "drop":
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self._queue.put(record)
+
+    # Aguarda até que todos os registros enfileirados tenham sido gravados
+    def flush(self):
+        self._queue.join()
+
+    # Grava os registros pendentes e encerra a thread de escrita
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            self._write([record for record in batch if record is not None])
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._close_file()
+                return
+
+    def _write(self, records):
+        if not records:
+            return
+        if self.console:
+            sys.stdout.write("".join(format_text(r) + "\n" for r in records))
+            sys.stdout.flush()
+
+        formatter = format_json if self.file_format == "json" else format_text
+        data = "".join(formatter(r) + "\n" for r in records)
+        try:
+            self._rotate_if_needed(len(data.encode("utf-8")))
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(data)
+            self._file.flush()
+        except OSError as e:
+            # Em caso de erro ao escrever no log, avisa no console
+            sys.stdout.write(f"Erro ao escrever no arquivo de log: {e}\n")
+
+    # Rotaciona o arquivo (log -> log.1 -> log.2 ...) se a escrita ultrapassar
+    # max_bytes
+    def _rotate_if_needed(self, pending_bytes):
+        if self.max_bytes <= 0:
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size == 0 or size + pending_bytes <= self.max_bytes:
+            return
+
+        self._close_file()
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+# Retorna o escritor de log compartilhado, criando-o com as configurações atuais
+def get_log_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter(
+                    Config.LOG_FILE,
+                    file_format=Config.LOG_FORMAT,
+                    level=Config.LOG_LEVEL,
+                    console=Config.LOG_CONSOLE,
+                    max_bytes=Config.LOG_MAX_BYTES,
+                    backup_count=Config.LOG_BACKUP_COUNT,
+                    queue_size=Config.LOG_QUEUE_SIZE,
+                    overflow=Config.LOG_OVERFLOW,
+                )
+    return _writer
+
+
+# Grava os registros pendentes e encerra o escritor compartilhado (a próxima
+# chamada a get_log_writer cria outro)
+def close_log_writer():
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+atexit.register(close_log_writer)
@@ -0,0 +1,289 @@
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+
+# Limites (em segundos) dos buckets do histograma de latência exportado
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Classes de endpoint, na ordem em que são testadas sobre o caminho da URL
+_ENDPOINT_CLASSES = (
+    ("batch", re.compile(r"^/\$batch")),
+    ("delta", re.compile(r"/delta\b")),
+    ("sendmail", re.compile(r"/sendMail\b", re.IGNORECASE)),
+    ("calendar", re.compile(r"/(calendar|calendarView|events)\b")),
+    ("onedrive", re.compile(r"/drive\b")),
+    ("teams", re.compile(r"^/chats\b")),
+    ("users", re.compile(r"^/users\b")),
+)
+_GRAPH_PREFIX = re.compile(r"^(?:https?://[^/]+)?(?:/v1\.0|/beta)?")
+
+
+# Classifica um endpoint do Graph (relativo ou URL absoluta) para agrupar as
+# métricas: users, calendar, sendmail, onedrive, teams, delta, batch ou other
+def endpoint_class(endpoint):
+    path = _GRAPH_PREFIX.sub("", endpoint, count=1)
+    for name, pattern in _ENDPOINT_CLASSES:
+        if pattern.search(path):
+            return name
+    return "other"
+
+
+# Tamanho em bytes de um corpo de requisição ou resposta (0 se desconhecido)
+def body_size(body):
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return 0
+
+
+# Percentil (nearest-rank) de uma lista de amostras já ordenada
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_samples) - 1e-9))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+# Estatísticas acumuladas de uma operação (classe de endpoint ou render)
+class OperationStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+# Coletor de métricas da execução: latência, bytes transferidos, status HTTP e
+# retentativas por operação. Os registros são feitos por várias threads.
+class Metrics:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, operation):
+        stats = self._operations.get(operation)
+        if stats is None:
+            stats = self._operations[operation] = OperationStats()
+        return stats
+
+    def record(self, operation, latency, status=None, bytes_sent=0, bytes_received=0):
+        with self._lock:
+            stats = self._stats(operation)
+            stats.latencies.append(latency)
+            if status is not None:
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+
+    def record_retry(self, operation):
+        with self._lock:
+            self._stats(operation).retries += 1
+
+    # Mede a duração do bloco. O dicionário retornado pode receber "status",
+    # "bytes_sent" e "bytes_received" dentro do bloco.
+    @contextmanager
+    def timed(self, operation):
+        info = {}
+        started = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.record(
+                operation,
+                time.perf_counter() - started,
+                status=info.get("status"),
+                bytes_sent=info.get("bytes_sent", 0),
+                bytes_received=info.get("bytes_received", 0),
+            )
+
+    # Resumo por operação: chamadas, chamadas/s, p50/p95/p99 (em segundos),
+    # bytes, retentativas e contagem por status
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        with self._lock:
+            operations = {
+                name: (sorted(stats.latencies), stats)
+                for name, stats in self._operations.items()
+            }
+
+        summary = {}
+        for name, (latencies, stats) in sorted(operations.items()):
+            summary[name] = {
+                "calls": len(latencies),
+                "calls_per_second": len(latencies) / elapsed,
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99),
+                "total_seconds": sum(latencies),
+                "bytes_sent": stats.bytes_sent,
+                "bytes_received": stats.bytes_received,
+                "retries": stats.retries,
+                "statuses": dict(sorted(stats.statuses.items(), key=str)),
+            }
+        return summary
+
+    # Retrato serializável (JSON) das métricas, com as latências resumidas nos
+    # buckets do histograma. Usado para combinar as métricas de vários processos.
+    def snapshot(self):
+        with self._lock:
+            operations = {
+                name: (sorted(stats.latencies), stats)
+                for name, stats in self._operations.items()
+            }
+        return {
+            name: {
+                "buckets": [
+                    bisect_right(latencies, bound) for bound in LATENCY_BUCKETS
+                ],
+                "count": len(latencies),
+                "sum": sum(latencies),
+                "retries": stats.retries,
+                "bytes_sent": stats.bytes_sent,
+                "bytes_received": stats.bytes_received,
+                "statuses": {str(k): v for k, v in stats.statuses.items()},
+            }
+            for name, (latencies, stats) in operations.items()
+        }
+
+    # Exporta as métricas no formato texto do Prometheus (ou OpenMetrics, que
+    # exige o marcador "# EOF" no final)
+    def export_text(self, openmetrics=False):
+        with self._lock:
+            operations = {
+                name: (sorted(stats.latencies), stats)
+                for name, stats in sorted(self._operations.items())
+            }
+
+        lines = [
+            "# HELP m365_reminder_call_duration_seconds Latência das chamadas por operação.",
+            "# TYPE m365_reminder_call_duration_seconds histogram",
+        ]
+        for name, (latencies, _) in operations.items():
+            for bound in LATENCY_BUCKETS:
+                count = bisect_right(latencies, bound)
+                lines.append(
+                    f'm365_reminder_call_duration_seconds_bucket{{operation="{name}",le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'm365_reminder_call_duration_seconds_bucket{{operation="{name}",le="+Inf"}} {len(latencies)}'
+            )
+            lines.append(
+                f'm365_reminder_call_duration_seconds_sum{{operation="{name}"}} {sum(latencies)}'
+            )
+            lines.append(
+                f'm365_reminder_call_duration_seconds_count{{operation="{name}"}} {len(latencies)}'
+            )
+
+        counters = (
+            ("calls", "Chamadas por operação e status HTTP."),
+            ("retries", "Retentativas por operação."),
+            ("bytes_sent", "Bytes enviados por operação."),
+            ("bytes_received", "Bytes recebidos por operação."),
+        )
+        for counter, help_text in counters:
+            metric = f"m365_reminder_{counter}"
+            # No OpenMetrics a família do contador não leva o sufixo _total
+            family = metric if openmetrics else f"{metric}_total"
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} counter")
+            for name, (latencies, stats) in operations.items():
+                if counter == "calls":
+                    # Operações sem status HTTP (renders) aparecem como status="none"
+                    statuses = dict(stats.statuses)
+                    without_status = len(latencies) - sum(statuses.values())
+                    if without_status:
+                        statuses["none"] = without_status
+                    for status, count in sorted(statuses.items(), key=str):
+                        lines.append(
+                            f'{metric}_total{{operation="{name}",status="{status}"}} {count}'
+                        )
+                    continue
+                value = getattr(stats, counter)
+                lines.append(f'{metric}_total{{operation="{name}"}} {value}')
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    # Grava o arquivo de texto lido pelo textfile collector do node exporter. A
+    # escrita é atômica para que o coletor nunca leia um arquivo incompleto.
+    def write_textfile(self, path, openmetrics=False):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.export_text(openmetrics=openmetrics))
+        os.replace(tmp_path, path)
+
+
+# Percentil estimado a partir dos buckets cumulativos de um histograma: o limite
+# superior do primeiro bucket que alcança a posição (infinito além do último)
+def histogram_percentile(buckets, count, fraction):
+    if not count:
+        return 0.0
+    rank = max(1, math.ceil(fraction * count - 1e-9))
+    for bound, cumulative in zip(LATENCY_BUCKETS, buckets):
+        if cumulative >= rank:
+            return bound
+    return math.inf
+
+
+# Combina os retratos (snapshot) de vários processos, somando contagens, bytes,
+# retentativas e buckets, e devolve um resumo por operação com percentis
+# estimados pelo histograma
+def merge_snapshots(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, stats in snapshot.items():
+            target = merged.setdefault(
+                name,
+                {
+                    "buckets": [0] * len(LATENCY_BUCKETS),
+                    "count": 0,
+                    "sum": 0.0,
+                    "retries": 0,
+                    "bytes_sent": 0,
+                    "bytes_received": 0,
+                    "statuses": {},
+                },
+            )
+            target["buckets"] = [
+                a + b for a, b in zip(target["buckets"], stats["buckets"])
+            ]
+            for key in ("count", "sum", "retries", "bytes_sent", "bytes_received"):
+                target[key] += stats[key]
+            for status, count in stats["statuses"].items():
+                target["statuses"][status] = target["statuses"].get(status, 0) + count
+
+    for stats in merged.values():
+        for label, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            stats[label] = histogram_percentile(
+                stats["buckets"], stats["count"], fraction
+            )
+    return dict(sorted(merged.items()))
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+# Retorna o coletor de métricas da execução atual
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+# Descarta as métricas coletadas (a próxima chamada cria um coletor vazio)
+def reset_metrics():
+    global _metrics
+    with _metrics_lock:
+        _metrics = None
@@ -1,15 +1,64 @@
 import os
+import sys
 from datetime import datetime, timedelta, timezone
 
 
+# Internaliza textos repetidos entre eventos e usuários (e-mails, nomes, locais),
+# de modo que todas as cópias compartilhem o mesmo objeto str
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# Tuplas de participantes já criadas; a mesma pessoa participa de muitas reuniões
+_attendee_tuples = {}
+
+
+# Descarta as tuplas de participantes (no modo daemon, ao virar o dia; os eventos
+# já criados mantêm as suas)
+def clear_attendee_tuples():
+    _attendee_tuples.clear()
+
+
+# Converte a lista de participantes do Graph em tuplas compactas
+# (nome, e-mail, tipo, resposta), compartilhadas entre todos os eventos
+def _compact_attendees(attendees):
+    compact = []
+    for attendee in attendees or ():
+        email = attendee.get("emailAddress") or {}
+        status = attendee.get("status") or {}
+        entry = (
+            email.get("name"),
+            email.get("address"),
+            attendee.get("type"),
+            status.get("response"),
+        )
+        compact.append(_attendee_tuples.setdefault(entry, entry))
+    return tuple(compact)
+
+
 class User:
+    __slots__ = ("id", "display_name", "email")
+
     def __init__(self, id, display_name, email):
         self.id = id
-        self.display_name = display_name
-        self.email = email
+        self.display_name = _intern(display_name)
+        self.email = _intern(email)
 
 
 class Event:
+    __slots__ = (
+        "id",
+        "subject",
+        "body_preview",
+        "start_datetime",
+        "end_datetime",
+        "location",
+        "_organizer",
+        "_attendees",
+        "is_all_day",
+        "cache_key",
+    )
+
     def __init__(
         self,
         id,
@@ -27,10 +76,52 @@ class Event:
         self.body_preview = body_preview
         self.start_datetime = start_datetime
         self.end_datetime = end_datetime
-        self.location = location
-        self.organizer = organizer
-        self.attendees = attendees
+        self.location = _intern(location)
+        self._organizer = (
+            (_intern(organizer.get("name")), _intern(organizer.get("address")))
+            if organizer
+            else None
+        )
+        self._attendees = _compact_attendees(attendees)
         self.is_all_day = is_all_day
+        # Chave da reunião no cache de eventos (None fora do cache)
+        self.cache_key = None
+
+    # Cópia do evento com outro id (a cópia do evento na agenda de outro
+    # participante). Os demais campos são imutáveis e compartilhados.
+    def with_id(self, id):
+        copy = Event.__new__(Event)
+        for name in Event.__slots__:
+            setattr(copy, name, getattr(self, name))
+        copy.id = id
+        return copy
+
+    # Organizador no formato do Graph ({"name": ..., "address": ...})
+    @property
+    def organizer(self):
+        if self._organizer is None:
+            return None
+        name, address = self._organizer
+        return {"name": name, "address": address}
+
+    # Participantes no formato do Graph, montados sob demanda a partir das tuplas
+    # compactas armazenadas no evento
+    @property
+    def attendees(self):
+        attendees = []
+        for name, address, attendee_type, response in self._attendees:
+            attendee = {"emailAddress": {"name": name, "address": address}}
+            if attendee_type is not None:
+                attendee["type"] = attendee_type
+            if response is not None:
+                attendee["status"] = {"response": response}
+            attendees.append(attendee)
+        return attendees
+
+    # Número de participantes, sem montar a lista completa
+    @property
+    def attendee_count(self):
+        return len(self._attendees)
 
     def to_dict(self):
         return {
@@ -1,80 +1,51 @@
-from datetime import datetime, timedelta
 import requests
 import random
-import os
-from jinja2 import Environment, FileSystemLoader
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 from config import Config
-from m365_reminder_project.api import log_action, call_graph_api
-
-# Configura o ambiente Jinja2 para carregar templates do diretório 'templates'
-environment = Environment(
-    loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), "..", "templates"))
+from m365_reminder_project.api import (
+    log_action,
+    call_graph_api,
+    call_graph_batch,
+    is_batch_success,
+)
+from m365_reminder_project.admin_notifier import get_admin_notifier
+from m365_reminder_project.chat_cache import get_chat_cache
+from m365_reminder_project.onedrive import upload_file
+from m365_reminder_project.rendering import (
+    format_event_time,
+    render_email_html_bulk,
+    render_teams_message_bulk,
+    today_label,
 )
 
 
 # Função para gerar o conteúdo HTML do e-mail com base nos eventos do usuário
-def generate_email_html(user_name, events):
-    # Carrega o template de e-mail
-    template = environment.get_template("email_template.html")
-    today_date = datetime.now().strftime("%d/%m/%Y")
-
-    processed_events = []
-    for event in events:
-        # Ajusta os horários do evento para o fuso horário local configurado
-        start_time = event.start_datetime + timedelta(hours=Config.TIMEZONE_OFFSET)
-        end_time = event.end_datetime + timedelta(hours=Config.TIMEZONE_OFFSET)
-
-        # Formata a string de tempo do evento
-        if event.is_all_day:
-            time_str = "Dia inteiro"
-        else:
-            time_str = f"{start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}"
-
-        # Adiciona o evento processado à lista
-        processed_events.append(
-            {
-                "subject": event.subject,
-                "time_str": time_str,
-                "location": (
-                    event.location if event.location else "Local não especificado"
-                ),
-                "body_preview": event.body_preview,
-            }
-        )
+# (com os horários no fuso zone, ou no fuso padrão)
+def generate_email_html(user_name, events, zone=None):
+    return render_email_html_bulk([(user_name, events)], [zone])[0]
 
-    # Escolhe uma frase aleatória para dias sem compromissos
-    no_events_phrase = random.choice(Config.FRASES_SEM_COMPROMISSOS)
-
-    # Renderiza o template com os dados do usuário e eventos
-    return template.render(
-        user_name=user_name,
-        today_date=today_date,
-        events=processed_events,
-        no_events_phrase=no_events_phrase,
-    )
-
-
-# Função para enviar o e-mail de lembrete ao usuário
-def send_email_reminder(token, user_email, user_name, events):
-    log_action(f"Enviando e-mail de lembrete para {user_email}...")
-
-    # Gera o conteúdo HTML do e-mail
-    email_html = generate_email_html(user_name, events)
 
+# Monta o corpo da requisição sendMail para o e-mail de lembrete de um usuário
+def _build_email_data(user_email, email_html, zone=None):
     # Prepara os dados do e-mail para a API do Graph
-    email_data = {
+    return {
         "message": {
-            "subject": f"Seus compromissos para hoje - {datetime.now().strftime('%d/%m/%Y')}",
+            "subject": f"Seus compromissos para hoje - {today_label(zone)}",
             "body": {"contentType": "HTML", "content": email_html},
             "toRecipients": [{"emailAddress": {"address": user_email}}],
         },
         "saveToSentItems": "false",  # Evita que o e-mail seja salvo na caixa de itens enviados do remetente
     }
 
+
+# Função para enviar o e-mail de lembrete ao usuário
+def send_email_reminder(token, user_email, user_name, events, zone=None):
+    log_action(f"Enviando e-mail de lembrete para {user_email}...")
+
+    email_data = _build_email_data(
+        user_email, generate_email_html(user_name, events, zone), zone
+    )
+
     # Envia o e-mail usando a API do Graph. O remetente é definido por Config.ADMIN_EMAIL
     result = call_graph_api(
         token, f"/users/{Config.ADMIN_EMAIL}/sendMail", "POST", email_data
@@ -89,92 +60,147 @@ def send_email_reminder(token, user_email, user_name, events):
         return False
 
 
-# Função para gerar o conteúdo da mensagem do Teams
-def generate_teams_message(user_name, events):
-    # Carrega o template de mensagem do Teams
-    template = environment.get_template("teams_template.txt")
-    # Escolhe um emoji de bom dia aleatoriamente
-    bom_dia_emoji = random.choice(Config.EMOJIS_BOM_DIA)
-
-    processed_events = []
-    for event in events:
-        # Ajusta os horários do evento para o fuso horário local configurado
-        start_time = event.start_datetime + timedelta(hours=Config.TIMEZONE_OFFSET)
-        end_time = event.end_datetime + timedelta(hours=Config.TIMEZONE_OFFSET)
-
-        # Formata a string de tempo do evento
-        if event.is_all_day:
-            time_str = "Dia inteiro"
-        else:
-            time_str = f"{start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}"
-
-        # Escolhe um emoji de reunião aleatoriamente
-        event_emoji = random.choice(Config.EMOJIS_REUNIAO)
+# Função para enviar os e-mails de lembrete de vários usuários pelo /$batch.
+# recipients é uma lista de tuplas (user_email, user_name, events) e zones a
+# lista opcional com o fuso de cada usuário; retorna uma lista de booleanos
+# indicando o sucesso de cada envio, na mesma ordem.
+def send_email_reminders_batch(token, recipients, zones=None):
+    log_action(f"Enviando {len(recipients)} e-mails de lembrete via $batch...")
 
-        # Adiciona o evento processado à lista
-        processed_events.append(
+    if zones is None:
+        zones = [None] * len(recipients)
+    # Os e-mails do grupo são renderizados de uma só vez
+    email_htmls = render_email_html_bulk(
+        [(user_name, events) for _, user_name, events in recipients], zones
+    )
+    responses = call_graph_batch(
+        token,
+        [
             {
-                "subject": event.subject,
-                "time_str": time_str,
-                "location": event.location,
-                "emoji": event_emoji,
+                "method": "POST",
+                "url": f"/users/{Config.ADMIN_EMAIL}/sendMail",
+                "body": _build_email_data(user_email, email_html, zone),
             }
-        )
-
-    # Escolhe um emoji e uma frase para dias sem compromissos
-    sem_compromisso_emoji = random.choice(Config.EMOJIS_SEM_COMPROMISSO)
-    no_events_phrase = random.choice(Config.FRASES_SEM_COMPROMISSOS)
-
-    # Renderiza o template com os dados do usuário e eventos
-    return template.render(
-        user_name=user_name.split()[0],  # Pega apenas o primeiro nome do usuário
-        bom_dia_emoji=bom_dia_emoji,
-        events=processed_events,
-        sem_compromisso_emoji=sem_compromisso_emoji,
-        no_events_phrase=no_events_phrase,
+            for (user_email, _, _), email_html, zone in zip(
+                recipients, email_htmls, zones
+            )
+        ],
     )
 
+    sent = []
+    for (user_email, _, _), response in zip(recipients, responses):
+        if is_batch_success(response):
+            log_action(f"E-mail enviado com sucesso para {user_email}!")
+            sent.append(True)
+        else:
+            log_action(
+                f"Falha ao enviar e-mail para {user_email} (status {response.get('status')}).",
+                success=False,
+            )
+            sent.append(False)
+    return sent
 
-# Função para enviar mensagem no Teams para o usuário
-def send_teams_message(token, user_id, user_name, events):
-    log_action(f"Enviando mensagem do Teams para o usuário {user_id}...")
 
-    # Gera o conteúdo da mensagem do Teams
-    message = generate_teams_message(user_name, events)
+# Função para gerar o conteúdo da mensagem do Teams
+def generate_teams_message(user_name, events, zone=None):
+    return render_teams_message_bulk([(user_name, events)], [zone])[0]
+
 
-    # Prepara os dados para criar um chat one-on-one com o usuário
-    chat_data = {
+# Monta o corpo da requisição que cria (ou localiza) o chat one-on-one entre o
+# remetente (Config.ADMIN_EMAIL) e o usuário
+def _build_chat_data(user_id):
+    return {
         "chatType": "oneOnOne",
         "members": [
             {
                 "@odata.type": "#microsoft.graph.aadUserConversationMember",
                 "roles": ["owner"],
-                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users/{Config.ADMIN_EMAIL}",  # O remetente da mensagem
+                "user@odata.bind": f"{Config.GRAPH_BASE_URL}/users/{Config.ADMIN_EMAIL}",  # O remetente da mensagem
             },
             {
                 "@odata.type": "#microsoft.graph.aadUserConversationMember",
                 "roles": ["owner"],
-                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users/{user_id}",  # O destinatário da mensagem
+                "user@odata.bind": f"{Config.GRAPH_BASE_URL}/users/{user_id}",  # O destinatário da mensagem
             },
         ],
     }
 
-    # Tenta criar um chat (se já existir, a API retorna o chat existente)
-    chat_result = call_graph_api(token, "/chats", method="POST", data=chat_data)
 
-    if not chat_result or "id" not in chat_result:
-        log_action(f"Falha ao criar chat com o usuário {user_id}.", success=False)
-        return False
+# Status de uma mensagem enviada a um chat que não existe mais ou ao qual o
+# remetente perdeu o acesso: o chat em cache é descartado e criado de novo
+STALE_CHAT_STATUSES = (403, 404)
+
+
+# Retorna o id do chat de cada usuário (apenas dos que puderam ser resolvidos).
+# Os ids vêm do cache persistente de chats; só os usuários sem chat em cache
+# passam pelo POST /chats (via $batch quando há mais de um), e os chats criados
+# são gravados no cache.
+def _resolve_chat_ids(token, user_ids):
+    chat_cache = get_chat_cache()
+    chat_ids = chat_cache.get_many(user_ids)
+    missing = [user_id for user_id in user_ids if user_id not in chat_ids]
+
+    created = {}
+    if len(missing) > 1:
+        responses = call_graph_batch(
+            token,
+            [
+                {"method": "POST", "url": "/chats", "body": _build_chat_data(user_id)}
+                for user_id in missing
+            ],
+        )
+        for user_id, response in zip(missing, responses):
+            if is_batch_success(response) and "id" in (response.get("body") or {}):
+                created[user_id] = response["body"]["id"]
+    elif missing:
+        try:
+            # Tenta criar um chat (se já existir, a API retorna o chat existente)
+            chat_result = call_graph_api(
+                token, "/chats", method="POST", data=_build_chat_data(missing[0])
+            )
+        except requests.exceptions.RequestException:
+            chat_result = None
+        if chat_result and "id" in chat_result:
+            created[missing[0]] = chat_result["id"]
+
+    for user_id in missing:
+        if user_id not in created:
+            log_action(f"Falha ao criar chat com o usuário {user_id}.", success=False)
+    if created:
+        chat_cache.put_many(created.items())
+        chat_ids.update(created)
+    return chat_ids
+
+
+# Função para enviar mensagem no Teams para o usuário. Com o chat em cache a
+# mensagem é enviada em uma única chamada; se o chat não existir mais (404/403),
+# ele é descartado, criado de novo e o envio é repetido uma vez.
+def send_teams_message(token, user_id, user_name, events, zone=None):
+    log_action(f"Enviando mensagem do Teams para o usuário {user_id}...")
 
-    chat_id = chat_result["id"]
+    # Gera o conteúdo da mensagem do Teams
+    message = generate_teams_message(user_name, events, zone)
 
     # Prepara os dados da mensagem a ser enviada no chat
     message_data = {"body": {"content": message, "contentType": "text"}}
 
-    # Envia a mensagem para o chat criado/existente
-    message_result = call_graph_api(
-        token, f"/chats/{chat_id}/messages", method="POST", data=message_data
-    )
+    message_result = None
+    for attempt in range(2):
+        chat_id = _resolve_chat_ids(token, [user_id]).get(user_id)
+        if chat_id is None:
+            return False
+        try:
+            message_result = call_graph_api(
+                token, f"/chats/{chat_id}/messages", method="POST", data=message_data
+            )
+            break
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if attempt or status not in STALE_CHAT_STATUSES:
+                break
+            get_chat_cache().invalidate(user_id)
+        except requests.exceptions.RequestException:
+            break
 
     # Verifica o resultado do envio da mensagem
     if message_result and "id" in message_result:
@@ -188,11 +214,70 @@ def send_teams_message(token, user_id, user_name, events):
         return False
 
 
-# Função para criar um arquivo de lembrete no OneDrive do usuário
-def create_onedrive_file(token, user_id, user_name, events):
-    log_action(f"Criando arquivo de lembrete no OneDrive do usuário {user_id}...")
+# Função para enviar as mensagens do Teams de vários usuários pelo /$batch.
+# recipients é uma lista de tuplas (user_id, user_name, events) e zones a lista
+# opcional com o fuso de cada usuário; retorna uma lista de booleanos indicando
+# o sucesso de cada envio, na mesma ordem. As mensagens cujo chat não existe
+# mais (404/403) são reenviadas uma vez, depois de recriar os chats.
+def send_teams_messages_batch(token, recipients, zones=None):
+    log_action(f"Enviando {len(recipients)} mensagens do Teams via $batch...")
 
-    today_date = datetime.now().strftime("%d/%m/%Y")
+    # As mensagens do grupo são renderizadas de uma só vez
+    messages = render_teams_message_bulk(
+        [(user_name, events) for _, user_name, events in recipients], zones
+    )
+    message_data = {
+        user_id: {"body": {"content": message, "contentType": "text"}}
+        for (user_id, _, _), message in zip(recipients, messages)
+    }
+
+    sent = {}
+    pending = [user_id for user_id, _, _ in recipients]
+    for attempt in range(2):
+        chat_ids = _resolve_chat_ids(token, pending)
+        pending = [user_id for user_id in pending if user_id in chat_ids]
+        responses = call_graph_batch(
+            token,
+            [
+                {
+                    "method": "POST",
+                    "url": f"/chats/{chat_ids[user_id]}/messages",
+                    "body": message_data[user_id],
+                }
+                for user_id in pending
+            ],
+        )
+        stale = []
+        for user_id, response in zip(pending, responses):
+            sent[user_id] = response
+            if not attempt and response.get("status") in STALE_CHAT_STATUSES:
+                get_chat_cache().invalidate(user_id)
+                stale.append(user_id)
+        pending = stale
+        if not pending:
+            break
+
+    results = []
+    for user_id, _, _ in recipients:
+        response = sent.get(user_id)
+        if response is not None and is_batch_success(response):
+            log_action(
+                f"Mensagem do Teams enviada com sucesso para o usuário {user_id}!"
+            )
+            results.append(True)
+        else:
+            status = response.get("status") if response is not None else None
+            log_action(
+                f"Falha ao enviar mensagem do Teams para o usuário {user_id} (status {status}).",
+                success=False,
+            )
+            results.append(False)
+    return results
+
+
+# Monta o nome e o conteúdo do arquivo de lembrete do OneDrive de um usuário
+def _build_onedrive_file(user_name, events, zone=None):
+    today_date = today_label(zone)
     content = f"Convite para a reunião - {today_date}\n"
     content += f"Usuário: {user_name}\n\n"
 
@@ -201,17 +286,8 @@ def create_onedrive_file(token, user_id, user_name, events):
         content += "====================\n\n"
 
         for i, event in enumerate(events, 1):
-            # Ajusta os horários do evento para o fuso horário local configurado
-            start_time = event.start_datetime + timedelta(hours=Config.TIMEZONE_OFFSET)
-            end_time = event.end_datetime + timedelta(hours=Config.TIMEZONE_OFFSET)
-
-            # Formata a string de tempo do evento
-            if event.is_all_day:
-                time_str = "Dia inteiro"
-            else:
-                time_str = (
-                    f"{start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}"
-                )
+            # Formata o horário do evento no fuso horário do usuário
+            time_str = format_event_time(event, zone)
 
             # Adiciona os detalhes do evento ao conteúdo do arquivo
             content += f"Compromisso {i}:\n"
@@ -229,32 +305,47 @@ def create_onedrive_file(token, user_id, user_name, events):
 
             content += "\n"
     else:
-        # Conteúdo para dias sem compromissos
+        # Conteúdo para dias sem compromissos. A frase é escolhida de forma
+        # determinística por usuário e dia, para que o conteúdo de uma nova
+        # execução no mesmo dia seja idêntico e o upload possa ser evitado.
         content += "Você não tem compromissos agendados para hoje.\n\n"
-        content += random.choice(Config.FRASES_SEM_COMPROMISSOS)
+        content += random.Random(f"{user_name}|{today_date}").choice(
+            Config.FRASES_SEM_COMPROMISSOS
+        )
 
     file_name = f"Convite para a reunião - {today_date}.txt"
-    file_content = content.encode("utf-8")
+    return file_name, content.encode("utf-8")
 
-    # Prepara os cabeçalhos para o upload do arquivo
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "text/plain; charset=utf-8",
-    }
 
-    # URL para upload do arquivo no OneDrive do usuário
-    url = f"https://graph.microsoft.com/v1.0/users/{user_id}/drive/root:/{file_name}:/content"
+# Função para criar um arquivo de lembrete no OneDrive do usuário. O upload é
+# evitado quando o conteúdo do dia não mudou desde o último envio
+# (ONEDRIVE_SKIP_UNCHANGED); arquivos grandes usam uma sessão de upload em blocos.
+def create_onedrive_file(token, user_id, user_name, events, zone=None):
+    log_action(f"Criando arquivo de lembrete no OneDrive do usuário {user_id}...")
 
     try:
-        # Envia a requisição PUT para criar/atualizar o arquivo
-        response = requests.put(url, headers=headers, data=file_content)
-        response.raise_for_status()
+        file_name, file_content = _build_onedrive_file(user_name, events, zone)
+        outcome = upload_file(
+            token,
+            user_id,
+            file_name,
+            file_content,
+            content_type="text/plain; charset=utf-8",
+        )
 
-        log_action(f"Arquivo criado com sucesso no OneDrive do usuário {user_id}!")
+        if outcome == "unchanged":
+            log_action(
+                f"Arquivo no OneDrive do usuário {user_id} já está atualizado; upload ignorado.",
+                user_id=user_id,
+            )
+        else:
+            log_action(f"Arquivo criado com sucesso no OneDrive do usuário {user_id}!")
         return True
     except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        text = e.response.text if e.response is not None else e
         log_action(
-            f"Erro HTTP ao criar arquivo no OneDrive do usuário {user_id}: {e.response.status_code} - {e.response.text}",
+            f"Erro HTTP ao criar arquivo no OneDrive do usuário {user_id}: {status} - {text}",
             success=False,
         )
         return False
@@ -272,8 +363,11 @@ def create_onedrive_file(token, user_id, user_name, events):
         return False
 
 
-# Função para enviar notificações de erro para o administrador via e-mail
-def send_admin_notification(subject, message):
+# Função para enviar notificações de erro para o administrador via e-mail. A
+# falha é apenas enfileirada: o despachante (admin_notifier.py) agrupa as falhas
+# em um resumo periódico (ADMIN_DIGEST_INTERVAL) enviado por uma conexão SMTP
+# reaproveitada. category agrupa as falhas por tipo no resumo.
+def send_admin_notification(subject, message, category=None):
     # Verifica se o e-mail do administrador está configurado
     if not Config.ADMIN_EMAIL:
         log_action(
@@ -282,41 +376,12 @@ def send_admin_notification(subject, message):
         )
         return False
 
-    # Configurações SMTP (exemplo - você precisará configurar seu próprio servidor SMTP)
-    # Estas variáveis devem ser carregadas do .env para segurança
-    smtp_server = os.getenv("SMTP_SERVER")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
-    smtp_username = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-
     # Verifica se as configurações SMTP estão completas
-    if not all([smtp_server, smtp_username, smtp_password]):
+    if not all([Config.SMTP_SERVER, Config.SMTP_USERNAME, Config.SMTP_PASSWORD]):
         log_action(
             "Configurações SMTP incompletas. Não é possível enviar notificação de erro por e-mail.",
             success=False,
         )
         return False
 
-    # Cria a mensagem de e-mail
-    msg = MIMEMultipart()
-    msg["From"] = smtp_username
-    msg["To"] = Config.ADMIN_EMAIL
-    msg["Subject"] = subject
-    msg.attach(MIMEText(message, "plain"))
-
-    try:
-        # Conecta ao servidor SMTP e envia o e-mail
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()  # Inicia a criptografia TLS
-            server.login(smtp_username, smtp_password)  # Autentica no servidor
-            server.send_message(msg)
-        log_action(
-            f"Notificação de erro enviada para o administrador ({Config.ADMIN_EMAIL})."
-        )
-        return True
-    except Exception as e:
-        log_action(
-            f"Falha ao enviar notificação de erro para o administrador: {e}",
-            success=False,
-        )
-        return False
+    return get_admin_notifier().notify(subject, message, category)
@@ -0,0 +1,262 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+from config import Config
+from m365_reminder_project.api import call_graph_api, log_action, resolve_token
+from m365_reminder_project.http_client import get_session, REQUEST_TIMEOUT
+from m365_reminder_project.metrics import body_size, get_metrics
+from m365_reminder_project.state_store import get_state_store
+from m365_reminder_project.throttling import (
+    get_rate_limiter,
+    is_retryable,
+    wait_retry_after,
+)
+
+# Os blocos de uma sessão de upload devem ser múltiplos de 320 KiB
+UPLOAD_CHUNK_ALIGNMENT = 320 * 1024
+
+_MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS onedrive_manifest (
+    user_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    item_id TEXT,
+    upload_url TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, path)
+);
+"""
+
+
+# Manifesto local (no armazenamento de estado) dos arquivos já enviados ao
+# OneDrive: hash do conteúdo e, para uploads interrompidos, a URL da sessão de
+# upload que pode ser retomada
+class UploadManifest:
+    def __init__(self, store):
+        self.store = store
+        store.ensure_schema(_MANIFEST_SCHEMA)
+
+    def get(self, user_id, path):
+        rows = self.store.query(
+            "SELECT sha256, size, item_id, upload_url FROM onedrive_manifest "
+            "WHERE user_id = ? AND path = ?",
+            (user_id, path),
+        )
+        if not rows:
+            return None
+        sha256, size, item_id, upload_url = rows[0]
+        return {
+            "sha256": sha256,
+            "size": size,
+            "item_id": item_id,
+            "upload_url": upload_url,
+        }
+
+    # Registra um upload concluído (upload_url=None) ou uma sessão em andamento
+    def put(self, user_id, path, sha256, size, item_id=None, upload_url=None):
+        self.store.execute(
+            "INSERT OR REPLACE INTO onedrive_manifest "
+            "(user_id, path, sha256, size, item_id, upload_url, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, path, sha256, size, item_id, upload_url, time.time()),
+        )
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_upload_manifest():
+    global _manifest
+    store = get_state_store()
+    if _manifest is None or _manifest.store is not store:
+        with _manifest_lock:
+            if _manifest is None or _manifest.store is not store:
+                _manifest = UploadManifest(store)
+    return _manifest
+
+
+# Contabiliza nas métricas uma retentativa de upload
+def _record_upload_retry(retry_state):
+    get_metrics().record_retry("onedrive")
+
+
+# Envia uma requisição de upload respeitando o limitador do Graph, registrando
+# métricas e repetindo falhas transitórias (429/503 aguardam o Retry-After)
+@retry(
+    retry=retry_if_exception(is_retryable),
+    wait=wait_retry_after(wait_exponential(multiplier=1, min=4, max=10)),
+    stop=stop_after_attempt(Config.GRAPH_MAX_ATTEMPTS),
+    before_sleep=_record_upload_retry,
+    reraise=True,
+)
+def _send_upload_request(method, url, headers=None, data=None, limiter_url=None):
+    limiter = get_rate_limiter()
+    limiter_url = limiter_url or url
+    with limiter.request(limiter_url), get_metrics().timed("onedrive") as call:
+        response = get_session().request(
+            method, url, headers=headers, data=data, timeout=REQUEST_TIMEOUT
+        )
+        call["status"] = response.status_code
+        call["bytes_sent"] = body_size(data)
+        call["bytes_received"] = body_size(response.content)
+    limiter.on_response(limiter_url, response.status_code, response.headers)
+    response.raise_for_status()
+    return response
+
+
+# Envia o arquivo inteiro em uma única requisição (arquivos pequenos)
+def _simple_upload(token, user_id, item_path, content, content_type):
+    url = f"{Config.GRAPH_BASE_URL}/users/{user_id}/drive/root:/{item_path}:/content"
+    response = _send_upload_request(
+        "PUT",
+        url,
+        headers={
+            "Authorization": f"Bearer {resolve_token(token)}",
+            "Content-Type": content_type,
+        },
+        data=content,
+    )
+    return response.json().get("id") if response.text.strip() else None
+
+
+# Bytes já recebidos por uma sessão de upload, a partir do nextExpectedRanges
+def _next_offset(ranges):
+    if not ranges:
+        return None
+    return int(str(ranges[0]).split("-")[0])
+
+
+# Envia o arquivo em blocos por uma sessão de upload. Uma sessão interrompida
+# (nesta execução ou em uma anterior) é retomada a partir do primeiro byte que
+# o Graph ainda espera.
+def _session_upload(token, user_id, item_path, content, sha256, resume_url=None):
+    manifest = get_upload_manifest()
+    mailbox_url = f"{Config.GRAPH_BASE_URL}/users/{user_id}/drive"
+    offset = 0
+    upload_url = None
+
+    if resume_url:
+        try:
+            status = _send_upload_request("GET", resume_url, limiter_url=mailbox_url)
+            offset = _next_offset(status.json().get("nextExpectedRanges"))
+            if offset is not None:
+                upload_url = resume_url
+                log_action(
+                    f"Retomando upload no OneDrive do usuário {user_id} a partir do byte {offset}.",
+                    user_id=user_id,
+                )
+        except requests.exceptions.RequestException:
+            # Sessão expirada ou inexistente: começa uma nova
+            upload_url = None
+
+    if upload_url is None:
+        session = call_graph_api(
+            token,
+            f"/users/{user_id}/drive/root:/{item_path}:/createUploadSession",
+            "POST",
+            {"item": {"@microsoft.graph.conflictBehavior": "replace"}},
+        )
+        upload_url = session["uploadUrl"]
+        offset = 0
+        manifest.put(user_id, item_path, sha256, len(content), upload_url=upload_url)
+
+    chunk_size = max(
+        UPLOAD_CHUNK_ALIGNMENT,
+        Config.ONEDRIVE_CHUNK_SIZE // UPLOAD_CHUNK_ALIGNMENT * UPLOAD_CHUNK_ALIGNMENT,
+    )
+    total = len(content)
+    item_id = None
+    while offset is not None and offset < total:
+        end = min(offset + chunk_size, total)
+        try:
+            # A URL da sessão já é autorizada: o token não deve ser enviado
+            response = _send_upload_request(
+                "PUT",
+                upload_url,
+                headers={"Content-Range": f"bytes {offset}-{end - 1}/{total}"},
+                data=content[offset:end],
+                limiter_url=mailbox_url,
+            )
+        except requests.exceptions.RequestException:
+            # Descobre quanto o Graph já recebeu antes de desistir do bloco
+            status = _send_upload_request("GET", upload_url, limiter_url=mailbox_url)
+            next_offset = _next_offset(status.json().get("nextExpectedRanges"))
+            if next_offset is None or next_offset == offset:
+                raise
+            offset = next_offset
+            continue
+
+        body = response.json() if response.text.strip() else {}
+        if response.status_code in (200, 201):
+            item_id = body.get("id")
+            break
+        next_offset = _next_offset(body.get("nextExpectedRanges"))
+        offset = end if next_offset is None else next_offset
+    return item_id
+
+
+# Envia um arquivo ao OneDrive do usuário, a menos que o manifesto indique que o
+# mesmo conteúdo já foi enviado. Arquivos maiores que ONEDRIVE_SIMPLE_UPLOAD_LIMIT
+# usam uma sessão de upload em blocos. Retorna "uploaded" ou "unchanged".
+def upload_file(token, user_id, file_name, content, content_type="text/plain"):
+    item_path = quote(file_name)
+    sha256 = hashlib.sha256(content).hexdigest()
+    manifest = get_upload_manifest()
+    entry = manifest.get(user_id, item_path)
+
+    if (
+        Config.ONEDRIVE_SKIP_UNCHANGED
+        and entry
+        and entry["sha256"] == sha256
+        and not entry["upload_url"]
+    ):
+        return "unchanged"
+
+    if len(content) <= Config.ONEDRIVE_SIMPLE_UPLOAD_LIMIT:
+        item_id = _simple_upload(token, user_id, item_path, content, content_type)
+    else:
+        # Só retoma a sessão anterior se ela for do mesmo conteúdo
+        resume_url = (
+            entry["upload_url"] if entry and entry["sha256"] == sha256 else None
+        )
+        item_id = _session_upload(
+            token, user_id, item_path, content, sha256, resume_url
+        )
+
+    manifest.put(user_id, item_path, sha256, len(content), item_id=item_id)
+    return "uploaded"
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# Pool de threads compartilhado pelos uploads de todos os usuários. Por padrão
+# tem tantas threads quanto o pipeline, para não limitar a vazão dos workers.
+def get_upload_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.ONEDRIVE_UPLOAD_WORKERS or Config.MAX_WORKERS,
+                    thread_name_prefix="onedrive-upload",
+                )
+    return _executor
+
+
+# Aguarda os uploads pendentes e encerra o pool compartilhado
+def close_upload_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,426 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import queue
+import threading
+import time
+
+from config import Config
+from m365_reminder_project.api import (
+    get_todays_events,
+    get_todays_events_batch,
+    get_user_zones,
+    log_action,
+)
+from m365_reminder_project.notifications import (
+    send_email_reminder,
+    send_email_reminders_batch,
+    send_teams_message,
+    send_teams_messages_batch,
+    create_onedrive_file,
+    send_admin_notification,
+)
+from m365_reminder_project.delivery_ledger import (
+    EMAIL,
+    EXPORT,
+    ONEDRIVE,
+    TEAMS,
+    get_delivery_ledger,
+    ledger_day,
+)
+from m365_reminder_project.event_cache import get_event_cache
+from m365_reminder_project.export import agenda_record, get_agenda_exporter
+from m365_reminder_project.onedrive import get_upload_executor
+from m365_reminder_project.utils import (
+    detect_conflict_clusters,
+    detect_conflicts,
+    suggest_focus_blocks,
+)
+
+
+# Executa func para cada item usando um pool de threads limitado, devolvendo os
+# resultados na mesma ordem de entrada (com max_workers <= 1 a execução é serial)
+def map_ordered(func, items, max_workers):
+    if max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            # Limita o número de tarefas em voo para não materializar toda a entrada
+            if len(pending) >= max_workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Consome um iterável em uma thread de fundo, mantendo até buffer_size itens já
+# prontos. Permite processar os primeiros usuários enquanto as próximas páginas
+# ainda estão sendo baixadas. Exceções do iterável são relançadas para o consumidor.
+def prefetch(items, buffer_size):
+    buffer = queue.Queue(maxsize=max(1, buffer_size))
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        try:
+            for item in items:
+                if not put((None, item)):
+                    return
+        except Exception as e:
+            put((e, None))
+            return
+        put((None, done))
+
+    thread = threading.Thread(target=producer, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            error, item = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+# Divide um iterável em listas de até size itens, sem materializá-lo por inteiro
+def chunked(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Processa um grupo de usuários: busca eventos, analisa as agendas e envia os
+# lembretes. Grupos com mais de um usuário usam o /$batch do Graph para buscar
+# eventos e enviar e-mails. As entregas são registradas no livro de entregas do
+# dia; com resume=True os canais já entregues (em uma execução anterior) não são
+# enviados de novo. Retorna um resultado por usuário, na mesma ordem.
+def process_users(token, users_data, resume=False):
+    started = time.perf_counter()
+    results = []
+    targets = []
+    for user_data in users_data:
+        user_id = user_data.get("id")
+        user_name = user_data.get("displayName", "Usuário")
+        user_email = user_data.get("mail") or user_data.get("userPrincipalName")
+        result = {"user_name": user_name, "user_id": user_id, "skipped": False}
+        results.append(result)
+
+        if not user_id or not user_email:
+            log_action(
+                f"Usuário {user_name} não possui ID ou e-mail válido. Pulando.",
+                success=False,
+            )
+            result["skipped"] = True
+            continue
+
+        targets.append((result, user_id, user_name, user_email))
+
+    ledger = get_delivery_ledger()
+    day = ledger_day()
+    # O livro também indica quem já foi exportado hoje (EXPORT_FILE), mesmo sem
+    # --resume; os canais de envio só são pulados com --resume
+    recorded = (
+        ledger.delivered(day, [user_id for _, user_id, _, _ in targets])
+        if resume or Config.EXPORT_FILE
+        else {}
+    )
+    delivered = recorded if resume else {}
+
+    # Canais enviados nesta execução (o Teams só com TEAMS_ENABLED)
+    channels = {EMAIL, ONEDRIVE, TEAMS} if Config.TEAMS_ENABLED else {EMAIL, ONEDRIVE}
+    pending = []
+    for target in targets:
+        result, user_id, user_name, user_email = target
+        if channels <= delivered.get(user_id, set()):
+            log_action(
+                f"Lembretes de {user_name} já entregues hoje. Pulando.",
+                user_id=user_id,
+            )
+            result["skipped"] = True
+            continue
+        log_action(f"Processando usuário: {user_name} ({user_email})", user_id=user_id)
+        pending.append(target)
+    targets = pending
+
+    if not targets:
+        return results
+
+    # Fuso horário de cada usuário (USER_TIMEZONES); sem ele todos usam o padrão
+    user_ids = [user_id for _, user_id, _, _ in targets]
+    zones = (
+        get_user_zones(token, user_ids)
+        if Config.USER_TIMEZONES
+        else [None] * len(targets)
+    )
+
+    if len(targets) > 1:
+        events_per_user = get_todays_events_batch(token, user_ids, zones=zones)
+    else:
+        events_per_user = [get_todays_events(token, user_ids[0], zone=zones[0])]
+
+    # Reuniões compartilhadas entre os usuários são convertidas uma única vez
+    event_cache = get_event_cache()
+    events_by_user = {}
+    for (result, user_id, _, _), events_data, zone in zip(
+        targets, events_per_user, zones
+    ):
+        events = [event_cache.intern(e) for e in events_data] if events_data else []
+        result["events"] = events
+        result["zone"] = zone
+        events_by_user[user_id] = events
+
+    # Os blocos de foco de um grupo de usuários são calculados de uma só vez
+    focus_blocks = None
+    if len(targets) > 1:
+        # Importado sob demanda: o NumPy só é carregado quando há grupos
+        from m365_reminder_project.freebusy import FreeBusyGrid
+
+        focus_blocks = FreeBusyGrid.from_events(
+            events_by_user, zones=dict(zip(user_ids, zones))
+        ).focus_blocks()
+
+    # Os eventos e a análise de cada usuário vão para a exportação (EXPORT_FILE)
+    # uma única vez por dia
+    exporter = get_agenda_exporter() if Config.EXPORT_FILE else None
+    recipients = []
+    email_targets = []
+    teams_recipients = []
+    teams_targets = []
+    for result, user_id, user_name, user_email in targets:
+        events = result["events"]
+        conflicts, clusters, user_blocks = _analyze_events(
+            user_name,
+            events,
+            focus_blocks[user_id] if focus_blocks else None,
+            result["zone"],
+        )
+        if exporter and EXPORT not in recorded.get(user_id, ()):
+            exporter.record(
+                agenda_record(
+                    day,
+                    user_id,
+                    user_name,
+                    result["zone"],
+                    events,
+                    conflicts,
+                    clusters,
+                    user_blocks,
+                )
+            )
+        # Canais já entregues (ou desativados) contam como enviados e não são
+        # repetidos
+        result["email_sent"] = result["onedrive_file_created"] = True
+        result["teams_sent"] = True
+        if EMAIL not in delivered.get(user_id, ()):
+            recipients.append((user_email, user_name, events))
+            email_targets.append(result)
+        if TEAMS in channels - delivered.get(user_id, set()):
+            teams_recipients.append((user_id, user_name, events))
+            teams_targets.append(result)
+
+    # OneDrive File: os uploads rodam no pool compartilhado, em paralelo com o
+    # envio dos e-mails
+    uploads = [
+        (
+            get_upload_executor().submit(
+                create_onedrive_file,
+                token,
+                user_id,
+                user_name,
+                result["events"],
+                zone=result["zone"],
+            )
+            if ONEDRIVE not in delivered.get(user_id, ())
+            else None
+        )
+        for result, user_id, user_name, _ in targets
+    ]
+
+    # Email Reminder
+    email_zones = [result["zone"] for result in email_targets]
+    if len(recipients) > 1:
+        emails_sent = send_email_reminders_batch(token, recipients, zones=email_zones)
+    elif recipients:
+        emails_sent = [send_email_reminder(token, *recipients[0], zone=email_zones[0])]
+    else:
+        emails_sent = []
+    for result, email_sent in zip(email_targets, emails_sent):
+        result["email_sent"] = email_sent
+    # Registrado assim que os envios terminam, para que uma execução retomada
+    # não reenvie os e-mails já entregues
+    ledger.record(
+        day,
+        EMAIL,
+        [(result["user_id"], result["email_sent"]) for result in email_targets],
+    )
+
+    # Teams Message
+    teams_zones = [result["zone"] for result in teams_targets]
+    if len(teams_recipients) > 1:
+        teams_sent = send_teams_messages_batch(
+            token, teams_recipients, zones=teams_zones
+        )
+    elif teams_recipients:
+        teams_sent = [
+            send_teams_message(token, *teams_recipients[0], zone=teams_zones[0])
+        ]
+    else:
+        teams_sent = []
+    for result, sent in zip(teams_targets, teams_sent):
+        result["teams_sent"] = sent
+    if teams_targets:
+        ledger.record(
+            day,
+            TEAMS,
+            [(result["user_id"], result["teams_sent"]) for result in teams_targets],
+        )
+
+    uploaded = []
+    for (result, user_id, user_name, user_email), upload in zip(targets, uploads):
+        del result["events"]
+        del result["zone"]
+
+        if upload is not None:
+            result["onedrive_file_created"] = upload.result()
+            uploaded.append((user_id, result["onedrive_file_created"]))
+
+        # Feedback do Usuário (simulado)
+        # Em um ambiente real, isso envolveria um link no e-mail/Teams que leva a um formulário
+        # ou a um endpoint que registra o feedback.
+        log_action(
+            f"Lembretes enviados para {user_name}. Feedback do usuário pode ser coletado via plataforma externa.",
+            user_id=user_id,
+        )
+
+    ledger.record(day, ONEDRIVE, uploaded)
+
+    # Tempo total do grupo (no $batch os usuários de um grupo são processados juntos)
+    latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    for result, _, _, _ in targets:
+        result["latency_ms"] = latency_ms
+    return results
+
+
+# Processa um único usuário (atalho para process_users com um só usuário)
+def process_user(token, user_data):
+    return process_users(token, [user_data])[0]
+
+
+# Detecta conflitos e sugere blocos de foco para a agenda de um usuário. Os
+# blocos de foco podem vir já calculados para o grupo inteiro (FreeBusyGrid).
+# Retorna os conflitos, os grupos de eventos sobrepostos e os blocos de foco.
+def _analyze_events(user_name, events, focus_blocks=None, zone=None):
+    # Detecção de Conflitos
+    conflicts = detect_conflicts(events)
+    clusters = []
+    if conflicts:
+        clusters = detect_conflict_clusters(events)
+        log_action(
+            f"Conflitos de horário detectados para {user_name}: {len(conflicts)} conflito(s) "
+            f"em {len(clusters)} grupo(s) de eventos sobrepostos."
+        )
+        # Aqui você pode adicionar lógica para notificar o usuário sobre os conflitos
+        # Por exemplo, adicionar uma seção ao e-mail ou mensagem do Teams.
+
+    # Sugestão de Blocos de Foco
+    if focus_blocks is None:
+        focus_blocks = suggest_focus_blocks(events, zone=zone)
+    if focus_blocks:
+        log_action(
+            f"Blocos de foco sugeridos para {user_name}: {len(focus_blocks)} bloco(s)."
+        )
+        # Similarmente, você pode adicionar essa informação aos lembretes.
+    return conflicts, clusters, focus_blocks
+
+
+# Registra o resultado de um usuário e notifica o administrador em caso de falha.
+# É sempre chamada na thread principal, na ordem original dos usuários.
+def report_user_result(result):
+    user_name = result["user_name"]
+    if result["skipped"]:
+        return False
+
+    if (
+        result["email_sent"]
+        and result["teams_sent"]
+        and result["onedrive_file_created"]
+    ):
+        log_action(
+            f"Lembretes enviados com sucesso para {user_name}!",
+            user_id=result["user_id"],
+            latency_ms=result.get("latency_ms"),
+        )
+        return True
+
+    log_action(
+        f"Alguns lembretes não puderam ser enviados para {user_name}.",
+        success=False,
+        user_id=result["user_id"],
+        latency_ms=result.get("latency_ms"),
+    )
+    # O tipo da falha (canais que falharam) agrupa as notificações no resumo
+    failed_channels = [
+        channel
+        for channel, key in (
+            ("e-mail", "email_sent"),
+            ("Teams", "teams_sent"),
+            ("OneDrive", "onedrive_file_created"),
+        )
+        if not result[key]
+    ]
+    send_admin_notification(
+        f"Falha no Envio de Lembretes para {user_name}",
+        f"Alguns lembretes (e-mail, Teams, OneDrive) não puderam ser enviados para {user_name}.",
+        category=f"Falha no envio de lembretes ({', '.join(failed_channels)})",
+    )
+    return False
+
+
+# Processa todos os usuários (em série ou em paralelo, conforme MAX_WORKERS, e
+# agrupados conforme GRAPH_BATCH_SIZE) e devolve um resumo da execução. Com
+# resume=True só são enviados os lembretes ainda pendentes no livro de entregas.
+def run_pipeline(token, users, max_workers=None, batch_size=None, resume=False):
+    if max_workers is None:
+        max_workers = Config.MAX_WORKERS
+    if batch_size is None:
+        batch_size = Config.GRAPH_BATCH_SIZE
+
+    summary = {"processed": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+    for results in map_ordered(
+        lambda users_chunk: process_users(token, users_chunk, resume),
+        chunked(users, batch_size),
+        max_workers,
+    ):
+        for result in results:
+            if result["skipped"]:
+                summary["skipped"] += 1
+                continue
+            summary["processed"] += 1
+            if report_user_result(result):
+                summary["succeeded"] += 1
+            else:
+                summary["failed"] += 1
+    return summary
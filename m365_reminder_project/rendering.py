@@ -0,0 +1,165 @@
+import os
+import random
+import threading
+from datetime import datetime
+
+from config import Config
+from m365_reminder_project.event_cache import get_event_cache
+from m365_reminder_project.metrics import get_metrics
+from m365_reminder_project.timezones import as_utc, default_zone
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "templates")
+EMAIL_TEMPLATE = "email_template.html"
+TEAMS_TEMPLATE = "teams_template.txt"
+
+
+# Cria o ambiente Jinja2. Os templates não mudam durante a execução, então o
+# auto_reload é desligado; com TEMPLATE_CACHE_DIR o bytecode compilado é gravado
+# em disco e reaproveitado pelas próximas execuções. O jinja2 só é importado
+# aqui, na primeira renderização, para não pesar na inicialização do script.
+def _create_environment():
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    bytecode_cache = None
+    if Config.TEMPLATE_CACHE_DIR:
+        os.makedirs(Config.TEMPLATE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(Config.TEMPLATE_CACHE_DIR)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        auto_reload=False,
+        bytecode_cache=bytecode_cache,
+    )
+
+
+_environment = None
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+# Retorna o ambiente Jinja2 compartilhado, criando-o no primeiro uso
+def get_environment():
+    global _environment
+    if _environment is None:
+        with _templates_lock:
+            if _environment is None:
+                _environment = _create_environment()
+    return _environment
+
+
+# Retorna o template compilado, compilando-o apenas na primeira chamada
+def get_template(name):
+    template = _templates.get(name)
+    if template is None:
+        environment = get_environment()
+        with _templates_lock:
+            template = _templates.get(name)
+            if template is None:
+                template = environment.get_template(name)
+                _templates[name] = template
+    return template
+
+
+# Converte um horário de evento (UTC) para o fuso zone. Horários sem timezone
+# são considerados UTC.
+def _to_zone(value, zone):
+    return as_utc(value).astimezone(zone)
+
+
+# Formata o horário de um evento no fuso zone (o fuso padrão se None). Reuniões
+# compartilhadas entre usuários são formatadas uma única vez por fuso e execução.
+def format_event_time(event, zone=None):
+    if event.is_all_day:
+        return "Dia inteiro"
+    if zone is None:
+        zone = default_zone()
+
+    def build(event):
+        start_time = _to_zone(event.start_datetime, zone)
+        end_time = _to_zone(event.end_datetime, zone)
+        return f"{start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}"
+
+    return get_event_cache().fragment(event, ("time_str", zone), build)
+
+
+# Monta a linha de um evento no template de e-mail
+def _email_row(event, zone):
+    return {
+        "subject": event.subject,
+        "time_str": format_event_time(event, zone),
+        "location": event.location if event.location else "Local não especificado",
+        "body_preview": event.body_preview,
+    }
+
+
+# Retorna a data de hoje (no fuso zone, ou no fuso padrão) no formato usado nas
+# mensagens
+def today_label(zone=None):
+    return datetime.now(zone or default_zone()).strftime("%d/%m/%Y")
+
+
+# Gera o HTML do e-mail de vários usuários. users é uma lista de tuplas
+# (user_name, events) e zones a lista opcional com o fuso de cada usuário; o
+# template e os valores de cada fuso são preparados uma vez.
+def render_email_html_bulk(users, zones=None):
+    template = get_template(EMAIL_TEMPLATE)
+    fallback = default_zone()
+    today_dates = {}
+    event_cache = get_event_cache()
+    metrics = get_metrics()
+
+    rendered = []
+    for index, (user_name, events) in enumerate(users):
+        zone = zones[index] if zones and zones[index] else fallback
+        if zone not in today_dates:
+            today_dates[zone] = today_label(zone)
+
+        def build_row(event):
+            return _email_row(event, zone)
+
+        with metrics.timed("render_email"):
+            processed_events = [
+                event_cache.fragment(event, ("email_row", zone), build_row)
+                for event in events
+            ]
+            rendered.append(
+                template.render(
+                    user_name=user_name,
+                    today_date=today_dates[zone],
+                    events=processed_events,
+                    # Frase aleatória para dias sem compromissos
+                    no_events_phrase=random.choice(Config.FRASES_SEM_COMPROMISSOS),
+                )
+            )
+    return rendered
+
+
+# Gera a mensagem do Teams de vários usuários. users é uma lista de tuplas
+# (user_name, events) e zones a lista opcional com o fuso de cada usuário.
+def render_teams_message_bulk(users, zones=None):
+    template = get_template(TEAMS_TEMPLATE)
+    fallback = default_zone()
+    metrics = get_metrics()
+
+    rendered = []
+    for index, (user_name, events) in enumerate(users):
+        zone = zones[index] if zones and zones[index] else fallback
+        with metrics.timed("render_teams"):
+            processed_events = [
+                {
+                    "subject": event.subject,
+                    "time_str": format_event_time(event, zone),
+                    "location": event.location,
+                    "emoji": random.choice(Config.EMOJIS_REUNIAO),
+                }
+                for event in events
+            ]
+            rendered.append(
+                template.render(
+                    user_name=user_name.split()[0],  # Apenas o primeiro nome
+                    bom_dia_emoji=random.choice(Config.EMOJIS_BOM_DIA),
+                    events=processed_events,
+                    sem_compromisso_emoji=random.choice(Config.EMOJIS_SEM_COMPROMISSO),
+                    no_events_phrase=random.choice(Config.FRASES_SEM_COMPROMISSOS),
+                )
+            )
+    return rendered
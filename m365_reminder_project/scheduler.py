@@ -0,0 +1,243 @@
+import hashlib
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from datetime import time as day_time
+
+from config import Config
+from m365_reminder_project.api import (
+    get_access_token,
+    get_user_zones,
+    iter_users,
+    log_action,
+)
+from m365_reminder_project import token_cache
+from m365_reminder_project.event_cache import reset_event_cache
+from m365_reminder_project.metrics import reset_metrics
+from m365_reminder_project.models import clear_attendee_tuples
+from m365_reminder_project.notifications import send_admin_notification
+from m365_reminder_project.pipeline import run_pipeline
+from m365_reminder_project.sharding import filter_shard
+from m365_reminder_project.timezones import day_bounds, default_zone
+
+
+# Converte "HH:MM" em minutos desde a meia-noite
+def parse_time_of_day(value):
+    try:
+        hours, minutes = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise ValueError(f"horário inválido: {value!r} (use HH:MM, ex.: 07:00)")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"horário inválido: {value!r} (use HH:MM, ex.: 07:00)")
+    return hours * 60 + minutes
+
+
+# Segundos após o início da janela de envio em que o lembrete do usuário é
+# enviado. Depende apenas do id, então o horário de cada usuário é o mesmo todos
+# os dias (e em todos os hosts) e os envios ficam distribuídos pela janela.
+def send_slot(user_id, window_minutes):
+    if window_minutes <= 0:
+        return 0
+    digest = hashlib.blake2b(user_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % (window_minutes * 60)
+
+
+# Dia local (no fuso padrão) de um instante (timestamp UTC)
+def local_day(now):
+    return datetime.fromtimestamp(now, default_zone()).date()
+
+
+# Instante (timestamp UTC) da meia-noite local (no fuso padrão) do dia day
+def local_midnight(day):
+    return day_bounds(default_zone(), day)[0].timestamp()
+
+
+# Instante (timestamp UTC) do envio do lembrete do usuário no dia local day.
+# window_start é o início da janela em minutos desde a meia-noite local. Com o
+# fuso zone do usuário, a janela é a do horário local do usuário: o envio é a
+# ocorrência dessa janela que cai dentro do dia day do fuso padrão, de modo que
+# cada usuário recebe um lembrete por dia do agendador.
+def send_time(user_id, day, window_start=None, window_minutes=None, zone=None):
+    if window_start is None:
+        window_start = parse_time_of_day(Config.SCHEDULE_WINDOW_START)
+    if window_minutes is None:
+        window_minutes = Config.SCHEDULE_WINDOW_MINUTES
+    zone = zone or default_zone()
+    slot = send_slot(user_id, window_minutes)
+    start = local_midnight(day)
+    end = local_midnight(day + timedelta(days=1))
+    window = day_time(*divmod(window_start, 60))
+
+    candidates = [
+        datetime.combine(day + timedelta(days=shift), window, tzinfo=zone).timestamp()
+        + slot
+        for shift in (0, -1, 1)
+    ]
+    for due in candidates:
+        if start <= due < end:
+            return due
+    return candidates[0]
+
+
+# Agendador residente (modo daemon): em vez de uma execução do cron por dia, o
+# processo permanece ativo e envia o lembrete de cada usuário no seu horário,
+# distribuído pela janela de envio (SCHEDULE_WINDOW_START, por
+# SCHEDULE_WINDOW_MINUTES minutos). A sessão HTTP, o token, os templates
+# compilados e os caches ficam aquecidos entre os envios. Os envios usam o livro
+# de entregas (resume), então reiniciar o daemon não repete lembretes do dia.
+class ReminderScheduler:
+    def __init__(self, shard=None, tick=None, report=None):
+        self.shard = shard
+        # Chamada ao concluir os envios de cada dia (ex.: métricas)
+        self.report = report
+        self.tick = Config.SCHEDULER_TICK if tick is None else tick
+        self.day = None
+        self.summary = {"processed": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+        self._queue = []
+        self._stop = threading.Event()
+
+    # Pede o encerramento do laço (o envio em andamento é concluído)
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def pending(self):
+        return len(self._queue)
+
+    # Monta a agenda de envios do dia com a lista atual de usuários. Retorna
+    # False se os usuários não puderam ser obtidos (nova tentativa no próximo
+    # ciclo).
+    def plan(self, token, day):
+        users = list(iter_users(token))
+        if not users:
+            log_action(
+                "Não foi possível obter a lista de usuários para o agendamento.",
+                success=False,
+            )
+            send_admin_notification(
+                "Erro ao Obter Usuários do Script M365 Reminder",
+                "Não foi possível obter a lista de usuários do Microsoft Graph.",
+            )
+            return False
+
+        if self.shard:
+            users = filter_shard(users, *self.shard)
+        window_start = parse_time_of_day(Config.SCHEDULE_WINDOW_START)
+        # Com USER_TIMEZONES a janela de envio é a do horário local de cada usuário
+        zones = {}
+        if Config.USER_TIMEZONES:
+            user_ids = [user["id"] for user in users if user.get("id")]
+            zones = dict(zip(user_ids, get_user_zones(token, user_ids)))
+        # Usuários sem id não têm horário; o pipeline os registra como ignorados
+        queue = [
+            (
+                send_time(
+                    user.get("id") or "",
+                    day,
+                    window_start,
+                    Config.SCHEDULE_WINDOW_MINUTES,
+                    zones.get(user.get("id")),
+                ),
+                index,
+                user,
+            )
+            for index, user in enumerate(users)
+        ]
+        if self._queue:
+            log_action(
+                f"{len(self._queue)} envio(s) do dia {self.day.isoformat()} não "
+                "foram feitos antes da virada do dia.",
+                success=False,
+            )
+        heapq.heapify(queue)
+        self._queue = queue
+        self.day = day
+        if queue:
+            first = datetime.fromtimestamp(queue[0][0], timezone.utc)
+            last = datetime.fromtimestamp(max(due for due, _, _ in queue), timezone.utc)
+            log_action(
+                f"Agenda de {day.isoformat()}: {len(queue)} usuário(s) entre "
+                f"{first:%H:%M} e {last:%H:%M} UTC."
+            )
+        return True
+
+    # Retira da agenda as entradas (horário, ordem, usuário) cujo horário de
+    # envio já chegou
+    def pop_due(self, now):
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            due.append(heapq.heappop(self._queue))
+        return due
+
+    # Executa um ciclo: monta a agenda ao virar o dia e envia os lembretes
+    # vencidos. Retorna quantos segundos faltam para o próximo envio.
+    def run_once(self, now=None):
+        if now is None:
+            now = time.time()
+        day = local_day(now)
+        if day != self.day:
+            token = get_access_token()
+            if not token:
+                log_action(
+                    "Não foi possível obter token de acesso para o agendamento.",
+                    success=False,
+                )
+                return self.tick
+            # As tuplas de participantes do dia anterior e os tokens substituídos
+            # não são mais necessários
+            clear_attendee_tuples()
+            token_cache.forget_superseded()
+            if not self.plan(token, day):
+                return self.tick
+
+        if self._queue and self._queue[0][0] <= now:
+            token = get_access_token()
+            if not token:
+                log_action(
+                    "Não foi possível obter token de acesso. Envios adiados.",
+                    success=False,
+                )
+                return self.tick
+            due = self.pop_due(now)
+            try:
+                summary = run_pipeline(token, [user for _, _, user in due], resume=True)
+            except Exception:
+                # Os usuários voltam para a agenda; o livro de entregas evita
+                # reenviar o que já foi entregue antes da falha
+                for entry in due:
+                    heapq.heappush(self._queue, entry)
+                raise
+            finally:
+                # As reuniões são compartilhadas apenas dentro de um envio: até o
+                # próximo o organizador pode alterá-las (assunto, local, pauta)
+                reset_event_cache()
+            for key in self.summary:
+                self.summary[key] += summary[key]
+            log_action(
+                f"Envio agendado: {summary['processed']} usuário(s) processado(s), "
+                f"{summary['succeeded']} com sucesso, {summary['failed']} com falha, "
+                f"{summary['skipped']} ignorado(s); {self.pending} pendente(s) hoje."
+            )
+            if not self._queue and self.report:
+                self.report()
+                # As métricas do relatório seguinte começam do zero
+                reset_metrics()
+
+        if self._queue:
+            return max(0.0, self._queue[0][0] - now)
+        # Todos os envios do dia concluídos: aguarda a próxima meia-noite local
+        return max(0.0, local_midnight(day + timedelta(days=1)) - now)
+
+    # Laço principal: executa ciclos até stop(), acordando a cada tick (no
+    # máximo) para perceber a virada do dia e novos horários de envio. Uma falha
+    # em um ciclo (ex.: Graph indisponível) é registrada e o ciclo é repetido no
+    # próximo tick, sem encerrar o daemon.
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.run_once()
+            except Exception as e:
+                log_action(f"Erro no ciclo do agendador: {e}", success=False)
+                wait = self.tick
+            self._stop.wait(min(wait, self.tick))
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from bisect import bisect_right
+from functools import lru_cache
+
+from config import Config
+from m365_reminder_project.api import log_action
+from m365_reminder_project.delivery_ledger import (
+    DeliveryLedger,
+    get_delivery_ledger,
+    ledger_day,
+)
+from m365_reminder_project.metrics import get_metrics, merge_snapshots
+from m365_reminder_project.state_store import StateStore
+
+# Pontos virtuais de cada shard no anel de hashing consistente. Quanto mais
+# pontos, mais uniforme a divisão dos usuários entre os shards.
+VIRTUAL_NODES = 160
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "main.py")
+
+
+# Converte "i/N" (0 <= i < N) em (i, N)
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"shard inválido: {value!r} (use i/N, ex.: 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard inválido: {value!r} (é preciso 0 <= i < N)")
+    return index, count
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+# Anel de hashing consistente com count shards. A posição de um usuário depende
+# apenas do seu id, então todos os processos e hosts chegam à mesma divisão; ao
+# mudar o número de shards apenas ~1/N dos usuários troca de shard.
+class HashRing:
+    def __init__(self, count, virtual_nodes=VIRTUAL_NODES):
+        self.count = count
+        points = sorted(
+            (_hash(f"shard-{shard}-{node}"), shard)
+            for shard in range(count)
+            for node in range(virtual_nodes)
+        )
+        self._keys = [key for key, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, user_id):
+        position = bisect_right(self._keys, _hash(user_id)) % len(self._keys)
+        return self._shards[position]
+
+
+@lru_cache(maxsize=None)
+def get_hash_ring(count):
+    return HashRing(count)
+
+
+# Mantém apenas os usuários do shard index (de count), preservando a ordem
+def filter_shard(users, index, count):
+    ring = get_hash_ring(count)
+    for user in users:
+        if ring.shard_for(user.get("id") or "") == index:
+            yield user
+
+
+# Caminho de um arquivo do shard: state.db -> state.shard-0-of-4.db
+def shard_path(path, index, count):
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{index}-of-{count}{ext}"
+
+
+# Arquivo com o resumo da execução de um shard, ao lado do banco de estado dele
+def shard_stats_path(index, count, state_db_file=None):
+    state_db_file = shard_path(state_db_file or Config.STATE_DB_FILE, index, count)
+    return f"{os.path.splitext(state_db_file)[0]}.json"
+
+
+# Ajusta as configurações do processo para executar apenas um shard: banco de
+# estado, log e arquivo de métricas próprios. As cotas de requisições do tenant
+# e por caixa de correio são divididas entre os shards, pois todos enviam os
+# e-mails pela mesma caixa (ADMIN_EMAIL) e compartilham o limite do tenant.
+def configure_shard(index, count):
+    Config.STATE_DB_FILE = shard_path(Config.STATE_DB_FILE, index, count)
+    Config.LOG_FILE = shard_path(Config.LOG_FILE, index, count)
+    if Config.METRICS_TEXTFILE:
+        Config.METRICS_TEXTFILE = shard_path(Config.METRICS_TEXTFILE, index, count)
+    if Config.EXPORT_FILE:
+        Config.EXPORT_FILE = shard_path(Config.EXPORT_FILE, index, count)
+    if Config.GRAPH_TENANT_RPS:
+        Config.GRAPH_TENANT_RPS = Config.GRAPH_TENANT_RPS / count
+    if Config.GRAPH_MAILBOX_RPS:
+        Config.GRAPH_MAILBOX_RPS = Config.GRAPH_MAILBOX_RPS / count
+
+
+# Grava o resumo da execução do shard (contagens e métricas) para a etapa de
+# combinação. Deve ser chamada depois de configure_shard.
+def write_shard_stats(index, count, summary):
+    stats = {
+        "shard": f"{index}/{count}",
+        "day": ledger_day(),
+        "summary": summary,
+        "metrics": get_metrics().snapshot(),
+    }
+    path = f"{os.path.splitext(Config.STATE_DB_FILE)[0]}.json"
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, path)
+
+
+# Combina os resultados de count shards: soma os resumos, combina as métricas e
+# incorpora os livros de entregas de cada shard ao livro principal
+# (Config.STATE_DB_FILE), de modo que um --resume sem shards enxergue tudo.
+# Shards sem resumo (que não terminaram) são listados em "missing".
+def merge_shards(count, state_db_file=None):
+    state_db_file = state_db_file or Config.STATE_DB_FILE
+    day = ledger_day()
+    summary = {"processed": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+    snapshots = []
+    missing = []
+    ledger = get_delivery_ledger()
+
+    for index in range(count):
+        try:
+            with open(shard_stats_path(index, count, state_db_file)) as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            missing.append(index)
+        else:
+            for key in summary:
+                summary[key] += stats["summary"].get(key, 0)
+            snapshots.append(stats["metrics"])
+
+        shard_db = shard_path(state_db_file, index, count)
+        if os.path.exists(shard_db):
+            store = StateStore(shard_db)
+            try:
+                ledger.merge(day, DeliveryLedger(store).rows(day))
+            finally:
+                store.close()
+
+    return {
+        "summary": summary,
+        "metrics": merge_snapshots(snapshots),
+        "missing": missing,
+    }
+
+
+# Copia para o livro de entregas de cada um de count shards os registros do dia
+# do livro principal (Config.STATE_DB_FILE) dos usuários do shard. Assim um
+# --resume com shards enxerga as entregas combinadas das execuções anteriores,
+# mesmo que elas tenham usado outra divisão (outro N ou nenhum shard).
+def seed_shards(count, state_db_file=None):
+    state_db_file = state_db_file or Config.STATE_DB_FILE
+    day = ledger_day()
+    ring = get_hash_ring(count)
+    rows_by_shard = {index: [] for index in range(count)}
+    for row in get_delivery_ledger().rows(day):
+        rows_by_shard[ring.shard_for(row[0])].append(row)
+
+    for index, rows in rows_by_shard.items():
+        if not rows:
+            continue
+        store = StateStore(shard_path(state_db_file, index, count))
+        try:
+            DeliveryLedger(store).merge(day, rows)
+        finally:
+            store.close()
+
+
+# Implantação de referência: executa count processos locais (main.py --shard
+# i/N), aguarda todos e combina os resultados. Os processos são independentes,
+# como seriam em hosts diferentes. Com resume=True os livros dos shards partem
+# do livro principal (seed_shards). Retorna o resultado de merge_shards.
+def run_local_shards(count, resume=False):
+    log_action(f"Iniciando {count} shard(s) locais...")
+    if resume:
+        seed_shards(count)
+    processes = []
+    for index in range(count):
+        command = [sys.executable, MAIN_SCRIPT, "--shard", f"{index}/{count}"]
+        if resume:
+            command.append("--resume")
+        # Resumos de uma execução anterior não podem ser confundidos com os novos
+        stats_path = shard_stats_path(index, count)
+        if os.path.exists(stats_path):
+            os.remove(stats_path)
+        processes.append(subprocess.Popen(command))
+
+    for index, process in enumerate(processes):
+        returncode = process.wait()
+        if returncode:
+            log_action(
+                f"Shard {index}/{count} terminou com código {returncode}.",
+                success=False,
+            )
+
+    merged = merge_shards(count)
+    summary = merged["summary"]
+    log_action(
+        f"Resumo dos {count} shard(s): {summary['processed']} usuário(s) processado(s), "
+        f"{summary['succeeded']} com sucesso, {summary['failed']} com falha, "
+        f"{summary['skipped']} ignorado(s).",
+        success=not merged["missing"],
+    )
+    for operation, stats in merged["metrics"].items():
+        log_action(
+            f"Métricas dos shards [{operation}]: {stats['count']} chamada(s), "
+            f"p50 <= {stats['p50'] * 1000:.0f} ms, p95 <= {stats['p95'] * 1000:.0f} ms, "
+            f"p99 <= {stats['p99'] * 1000:.0f} ms, {stats['retries']} retentativa(s)."
+        )
+    if merged["missing"]:
+        log_action(
+            f"Shard(s) sem resumo (não concluídos): {merged['missing']}.",
+            success=False,
+        )
+    return merged
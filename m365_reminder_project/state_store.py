@@ -0,0 +1,175 @@
+import json
+import sqlite3
+import threading
+import time
+
+from config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS delta_links (
+    resource TEXT PRIMARY KEY,
+    scope TEXT NOT NULL DEFAULT '',
+    delta_link TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    user_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, event_id)
+);
+"""
+
+
+# Armazenamento local (SQLite) do estado da sincronização incremental: delta links
+# do Graph e um retrato compacto dos usuários e dos eventos sincronizados.
+# Uma única conexão é compartilhada entre as threads, protegida por um lock.
+class StateStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Executa um script de criação de tabelas adicional (usado por outros módulos)
+    def ensure_schema(self, schema):
+        with self._lock, self._conn:
+            self._conn.executescript(schema)
+
+    # Executa uma consulta e retorna todas as linhas
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # Executa um comando de escrita em uma transação
+    def execute(self, sql, params=()):
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    # Executa um comando de escrita para várias linhas em uma única transação
+    def executemany(self, sql, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+    # Delta links
+
+    def get_delta_link(self, resource, scope=""):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT delta_link FROM delta_links WHERE resource = ? AND scope = ?",
+                (resource, scope),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_delta_link(self, resource, delta_link, scope=""):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO delta_links (resource, scope, delta_link, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (resource, scope, delta_link, time.time()),
+            )
+
+    # Escopo (por exemplo, a janela consultada) do delta link armazenado de um
+    # recurso, ou None
+    def get_delta_scope(self, resource):
+        rows = self.query(
+            "SELECT scope FROM delta_links WHERE resource = ?", (resource,)
+        )
+        return rows[0][0] if rows else None
+
+    def delete_delta_link(self, resource):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM delta_links WHERE resource = ?", (resource,)
+            )
+
+    # Usuários
+
+    # Insere ou atualiza usuários. As respostas de delta trazem apenas as
+    # propriedades alteradas, então os dados são mesclados com os já existentes.
+    def upsert_users(self, users):
+        with self._lock, self._conn:
+            for user in users:
+                row = self._conn.execute(
+                    "SELECT data FROM users WHERE id = ?", (user["id"],)
+                ).fetchone()
+                data = json.loads(row[0]) if row else {}
+                data.update(user)
+                self._conn.execute(
+                    "INSERT INTO users (id, data) VALUES (?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                    (user["id"], json.dumps(data)),
+                )
+
+    def delete_users(self, user_ids):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM users WHERE id = ?", [(i,) for i in user_ids]
+            )
+
+    def clear_users(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM users")
+
+    # Percorre os usuários armazenados na ordem em que foram sincronizados
+    def iter_users(self):
+        for (data,) in self.query("SELECT data FROM users ORDER BY rowid"):
+            yield json.loads(data)
+
+    # Eventos
+
+    def upsert_events(self, user_id, events):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO events (user_id, event_id, data) VALUES (?, ?, ?)",
+                [(user_id, event["id"], json.dumps(event)) for event in events],
+            )
+
+    def delete_events(self, user_id, event_ids):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM events WHERE user_id = ? AND event_id = ?",
+                [(user_id, i) for i in event_ids],
+            )
+
+    def clear_events(self, user_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM events WHERE user_id = ?", (user_id,))
+
+    def get_events(self, user_id):
+        rows = self.query(
+            "SELECT data FROM events WHERE user_id = ? ORDER BY rowid", (user_id,)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Retorna o armazenamento de estado compartilhado (Config.STATE_DB_FILE)
+def get_state_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = StateStore(Config.STATE_DB_FILE)
+    return _store
+
+
+# Fecha o armazenamento compartilhado (a próxima chamada abre outro)
+def close_state_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,236 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from tenacity.wait import wait_base
+
+from config import Config
+
+# Status HTTP com que o Graph sinaliza limitação de requisições
+THROTTLE_STATUSES = {429, 503}
+# Status HTTP transitórios para os quais vale a pena repetir a chamada
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_MAILBOX_PATTERN = re.compile(r"^(?:https?://[^/]+)?(?:/v1\.0|/beta)?/users/([^/?]+)")
+
+
+# Extrai o valor do cabeçalho Retry-After (em segundos) de uma resposta HTTP
+def retry_after_seconds(headers, default=None):
+    value = (headers or {}).get("Retry-After")
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+# Indica se uma exceção de uma chamada HTTP é transitória (falha de conexão,
+# timeout, limitação ou erro 5xx) e a chamada deve ser repetida. Erros 4xx
+# definitivos são propagados imediatamente, sem consumir tentativas.
+def is_retryable(exception):
+    if isinstance(exception, requests.exceptions.HTTPError):
+        response = exception.response
+        return response is not None and response.status_code in RETRY_STATUSES
+    return isinstance(exception, requests.exceptions.RequestException)
+
+
+# Estratégia de espera do tenacity que respeita o Retry-After das respostas 429/503
+# e usa a estratégia fallback para as demais falhas
+class wait_retry_after(wait_base):
+    def __init__(self, fallback, maximum=None):
+        self.fallback = fallback
+        self.maximum = maximum if maximum is not None else Config.GRAPH_MAX_RETRY_AFTER
+
+    def __call__(self, retry_state):
+        exception = retry_state.outcome.exception() if retry_state.outcome else None
+        response = getattr(exception, "response", None)
+        if response is not None and response.status_code in THROTTLE_STATUSES:
+            seconds = retry_after_seconds(response.headers)
+            if seconds is not None:
+                return min(seconds, self.maximum)
+        return self.fallback(retry_state)
+
+
+# Identifica a caixa de correio (usuário) de um endpoint /users/{id}/...
+# Retorna None para endpoints que não pertencem a uma caixa específica.
+def mailbox_for_endpoint(endpoint):
+    match = _MAILBOX_PATTERN.match(endpoint)
+    if not match:
+        return None
+    return match.group(1).lower()
+
+
+# Token bucket com reserva: cada chamada reserva seu custo imediatamente e dorme
+# apenas o tempo necessário até que a reserva seja coberta. pause() bloqueia o
+# bucket até o fim de um Retry-After.
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    # Retorna quantos segundos a chamada deve aguardar antes de prosseguir
+    def reserve(self, cost=1):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= cost
+            deficit_wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(deficit_wait, self.paused_until - now, 0.0)
+
+    def acquire(self, cost=1):
+        wait = self.reserve(cost)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+# Limite de concorrência adaptativo (AIMD): cresce 1/limite a cada sucesso e cai
+# pela metade quando o Graph começa a limitar as requisições
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, initial, minimum=1, maximum=None, cooldown=1.0):
+        self.maximum = float(maximum if maximum is not None else initial)
+        self.minimum = float(minimum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.in_flight = 0
+        self.cooldown = cooldown
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            # Uma rajada de 429 simultâneos conta como um único evento de limitação
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+# Limitador de requisições ao Graph: um token bucket para o tenant, um por caixa
+# de correio e um limite de concorrência adaptativo compartilhado
+class GraphRateLimiter:
+    def __init__(self, tenant_rps, mailbox_rps, max_concurrency):
+        self.tenant_bucket = TokenBucket(tenant_rps) if tenant_rps > 0 else None
+        self.mailbox_rps = mailbox_rps
+        self.concurrency = AdaptiveConcurrencyLimiter(max_concurrency)
+        self._mailbox_buckets = {}
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def _mailbox_bucket(self, mailbox):
+        if mailbox is None or self.mailbox_rps <= 0:
+            return None
+        with self._lock:
+            bucket = self._mailbox_buckets.get(mailbox)
+            if bucket is None:
+                bucket = TokenBucket(self.mailbox_rps)
+                self._mailbox_buckets[mailbox] = bucket
+            return bucket
+
+    # Reserva capacidade para uma chamada ao endpoint. cost permite contar cada
+    # item de um $batch como uma requisição.
+    @contextmanager
+    def request(self, endpoint, cost=1):
+        mailbox_bucket = self._mailbox_bucket(mailbox_for_endpoint(endpoint))
+        if self.tenant_bucket is not None:
+            self.tenant_bucket.acquire(cost)
+        if mailbox_bucket is not None:
+            mailbox_bucket.acquire(cost)
+
+        self.concurrency.acquire()
+        try:
+            yield
+        finally:
+            self.concurrency.release()
+
+    # Reserva capacidade nas caixas de correio dos itens de um $batch (o /$batch
+    # em si só é contado no bucket do tenant) e aguarda a maior espera entre
+    # elas, incluindo as pausas por Retry-After de respostas anteriores
+    def acquire_mailboxes(self, endpoints):
+        costs = {}
+        for endpoint in endpoints:
+            mailbox = mailbox_for_endpoint(endpoint)
+            costs[mailbox] = costs.get(mailbox, 0) + 1
+        wait = 0.0
+        for mailbox, cost in costs.items():
+            bucket = self._mailbox_bucket(mailbox)
+            if bucket is not None:
+                wait = max(wait, bucket.reserve(cost))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    # Atualiza o limitador com o resultado de uma chamada
+    def on_response(self, endpoint, status_code, headers=None):
+        if status_code in THROTTLE_STATUSES:
+            with self._lock:
+                self.throttled += 1
+            self.concurrency.on_throttle()
+            seconds = retry_after_seconds(headers)
+            if seconds:
+                # Pausa apenas a caixa de correio limitada, ou o tenant inteiro
+                # para endpoints que não pertencem a uma caixa
+                bucket = self._mailbox_bucket(mailbox_for_endpoint(endpoint))
+                bucket = bucket or self.tenant_bucket
+                if bucket is not None:
+                    bucket.pause(seconds)
+        elif isinstance(status_code, int) and status_code < 500:
+            self.concurrency.on_success()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+# Retorna o limitador compartilhado por todas as chamadas ao Graph
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = GraphRateLimiter(
+                    Config.GRAPH_TENANT_RPS,
+                    Config.GRAPH_MAILBOX_RPS,
+                    # Threads de trabalho mais a thread que baixa as páginas de usuários
+                    Config.MAX_WORKERS + 1,
+                )
+    return _limiter
+
+
+# Descarta o limitador compartilhado (a próxima chamada cria outro)
+def reset_rate_limiter():
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
@@ -0,0 +1,198 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from datetime import time as day_time
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from config import Config
+from m365_reminder_project.state_store import get_state_store
+
+# Nomes de fuso horário do Windows (os devolvidos pelo mailboxSettings do
+# Exchange) e o fuso IANA equivalente, conforme a tabela windowsZones do CLDR
+WINDOWS_TO_IANA = {
+    "Dateline Standard Time": "Etc/GMT+12",
+    "UTC-11": "Etc/GMT+11",
+    "Aleutian Standard Time": "America/Adak",
+    "Hawaiian Standard Time": "Pacific/Honolulu",
+    "Alaskan Standard Time": "America/Anchorage",
+    "Pacific Standard Time (Mexico)": "America/Tijuana",
+    "Pacific Standard Time": "America/Los_Angeles",
+    "US Mountain Standard Time": "America/Phoenix",
+    "Mountain Standard Time (Mexico)": "America/Mazatlan",
+    "Mountain Standard Time": "America/Denver",
+    "Central America Standard Time": "America/Guatemala",
+    "Central Standard Time": "America/Chicago",
+    "Central Standard Time (Mexico)": "America/Mexico_City",
+    "Canada Central Standard Time": "America/Regina",
+    "SA Pacific Standard Time": "America/Bogota",
+    "Eastern Standard Time (Mexico)": "America/Cancun",
+    "Eastern Standard Time": "America/New_York",
+    "US Eastern Standard Time": "America/Indiana/Indianapolis",
+    "Venezuela Standard Time": "America/Caracas",
+    "Paraguay Standard Time": "America/Asuncion",
+    "Atlantic Standard Time": "America/Halifax",
+    "Central Brazilian Standard Time": "America/Cuiaba",
+    "SA Western Standard Time": "America/La_Paz",
+    "Pacific SA Standard Time": "America/Santiago",
+    "Newfoundland Standard Time": "America/St_Johns",
+    "Tocantins Standard Time": "America/Araguaina",
+    "E. South America Standard Time": "America/Sao_Paulo",
+    "SA Eastern Standard Time": "America/Cayenne",
+    "Argentina Standard Time": "America/Argentina/Buenos_Aires",
+    "Montevideo Standard Time": "America/Montevideo",
+    "Bahia Standard Time": "America/Bahia",
+    "UTC-02": "Etc/GMT+2",
+    "Azores Standard Time": "Atlantic/Azores",
+    "Cape Verde Standard Time": "Atlantic/Cape_Verde",
+    "UTC": "Etc/UTC",
+    "GMT Standard Time": "Europe/London",
+    "Greenwich Standard Time": "Atlantic/Reykjavik",
+    "Morocco Standard Time": "Africa/Casablanca",
+    "W. Europe Standard Time": "Europe/Berlin",
+    "Central Europe Standard Time": "Europe/Budapest",
+    "Romance Standard Time": "Europe/Paris",
+    "Central European Standard Time": "Europe/Warsaw",
+    "W. Central Africa Standard Time": "Africa/Lagos",
+    "GTB Standard Time": "Europe/Bucharest",
+    "E. Europe Standard Time": "Europe/Chisinau",
+    "Egypt Standard Time": "Africa/Cairo",
+    "FLE Standard Time": "Europe/Kiev",
+    "Israel Standard Time": "Asia/Jerusalem",
+    "South Africa Standard Time": "Africa/Johannesburg",
+    "Turkey Standard Time": "Europe/Istanbul",
+    "Arab Standard Time": "Asia/Riyadh",
+    "Russian Standard Time": "Europe/Moscow",
+    "E. Africa Standard Time": "Africa/Nairobi",
+    "Iran Standard Time": "Asia/Tehran",
+    "Arabian Standard Time": "Asia/Dubai",
+    "Afghanistan Standard Time": "Asia/Kabul",
+    "Pakistan Standard Time": "Asia/Karachi",
+    "West Asia Standard Time": "Asia/Tashkent",
+    "India Standard Time": "Asia/Kolkata",
+    "Nepal Standard Time": "Asia/Kathmandu",
+    "Bangladesh Standard Time": "Asia/Dhaka",
+    "SE Asia Standard Time": "Asia/Bangkok",
+    "China Standard Time": "Asia/Shanghai",
+    "Singapore Standard Time": "Asia/Singapore",
+    "W. Australia Standard Time": "Australia/Perth",
+    "Taipei Standard Time": "Asia/Taipei",
+    "Tokyo Standard Time": "Asia/Tokyo",
+    "Korea Standard Time": "Asia/Seoul",
+    "Cen. Australia Standard Time": "Australia/Adelaide",
+    "AUS Central Standard Time": "Australia/Darwin",
+    "E. Australia Standard Time": "Australia/Brisbane",
+    "AUS Eastern Standard Time": "Australia/Sydney",
+    "Tasmania Standard Time": "Australia/Hobart",
+    "New Zealand Standard Time": "Pacific/Auckland",
+    "UTC+12": "Etc/GMT-12",
+    "Tonga Standard Time": "Pacific/Tongatapu",
+}
+
+_TIMEZONE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_timezones (
+    user_id TEXT PRIMARY KEY,
+    time_zone TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+# Converte um nome de fuso (IANA ou do Windows) em um ZoneInfo. Retorna None se o
+# nome for vazio ou desconhecido. O resultado de cada nome é memorizado, então
+# milhares de usuários no mesmo fuso custam uma única conversão.
+@lru_cache(maxsize=None)
+def resolve_zone(name):
+    if not name:
+        return None
+    for candidate in (name, WINDOWS_TO_IANA.get(name)):
+        if not candidate:
+            continue
+        try:
+            return ZoneInfo(candidate)
+        except (ZoneInfoNotFoundError, ValueError):
+            continue
+    return None
+
+
+@lru_cache(maxsize=None)
+def _fixed_zone(hours):
+    return timezone(timedelta(hours=hours))
+
+
+# Fuso padrão: TIMEZONE (nome IANA, com horário de verão) ou, se não
+# configurado, o deslocamento fixo TIMEZONE_OFFSET
+def default_zone():
+    return resolve_zone(Config.TIMEZONE) or _fixed_zone(Config.TIMEZONE_OFFSET)
+
+
+# Horário com timezone: horários sem timezone são considerados UTC, como os
+# devolvidos pelo Graph (ex.: "2025-06-11T13:00:00.0000000" com timeZone "UTC")
+def as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# Dia atual no fuso zone (o fuso padrão se zone for None)
+def local_today(zone=None):
+    return datetime.now(zone or default_zone()).date()
+
+
+# Início (meia-noite local) do dia day no fuso zone e o fim do intervalo de days
+# dias a partir dele, como datetimes em UTC. Considera o horário de verão (dias
+# de 23 ou 25 horas). Os limites são calculados uma vez por fuso e dia.
+@lru_cache(maxsize=1024)
+def day_bounds(zone, day, days=1):
+    start = datetime.combine(day, day_time(), tzinfo=zone)
+    end = datetime.combine(day + timedelta(days=days), day_time(), tzinfo=zone)
+    return (
+        start.astimezone(timezone.utc),
+        end.astimezone(timezone.utc) - timedelta(microseconds=1),
+    )
+
+
+# Cache persistente (no armazenamento de estado) do fuso horário de cada
+# usuário, obtido do mailboxSettings. Guarda o nome original devolvido pelo
+# Graph; a conversão para ZoneInfo é feita por resolve_zone.
+class TimezoneCache:
+    def __init__(self, store):
+        self.store = store
+        store.ensure_schema(_TIMEZONE_SCHEMA)
+
+    # Fusos em cache dos usuários: user_id -> (nome, updated_at)
+    def get_many(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        placeholders = ",".join("?" * len(user_ids))
+        rows = self.store.query(
+            "SELECT user_id, time_zone, updated_at FROM user_timezones "
+            f"WHERE user_id IN ({placeholders})",
+            user_ids,
+        )
+        return {user_id: (name, updated_at) for user_id, name, updated_at in rows}
+
+    # Grava vários pares (user_id, nome) em uma única transação
+    def put_many(self, zones):
+        now = time.time()
+        self.store.executemany(
+            "INSERT OR REPLACE INTO user_timezones (user_id, time_zone, updated_at) "
+            "VALUES (?, ?, ?)",
+            [(user_id, name, now) for user_id, name in zones],
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Retorna o cache de fusos sobre o armazenamento de estado atual
+def get_timezone_cache():
+    global _cache
+    store = get_state_store()
+    if _cache is None or _cache.store is not store:
+        with _cache_lock:
+            if _cache is None or _cache.store is not store:
+                _cache = TimezoneCache(store)
+    return _cache
@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+
+from config import Config
+
+_lock = threading.Lock()
+_cache = {"access_token": None, "expires_at": 0.0}
+# Tokens substituídos por uma renovação; chamadas que ainda os usam recebem o atual
+_superseded = set()
+_disk_loaded = False
+
+
+# Identifica o aplicativo dono do token, para não reaproveitar um cache em disco
+# gravado com outras credenciais
+def _cache_owner():
+    return {"tenant_id": Config.TENANT_ID, "client_id": Config.CLIENT_ID}
+
+
+# Carrega (uma única vez) o token gravado em disco, se o cache em disco estiver ativo
+def _load_from_disk():
+    global _disk_loaded
+    if _disk_loaded:
+        return
+    _disk_loaded = True
+
+    if not Config.TOKEN_CACHE_FILE or not os.path.exists(Config.TOKEN_CACHE_FILE):
+        return
+    try:
+        with open(Config.TOKEN_CACHE_FILE) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    if data.get("owner") == _cache_owner() and data.get("access_token"):
+        _cache["access_token"] = data["access_token"]
+        _cache["expires_at"] = float(data.get("expires_at", 0))
+
+
+# Grava o token em disco com permissão restrita ao dono do processo (0600)
+def _save_to_disk():
+    if not Config.TOKEN_CACHE_FILE:
+        return
+    data = {
+        "owner": _cache_owner(),
+        "access_token": _cache["access_token"],
+        "expires_at": _cache["expires_at"],
+    }
+    # Arquivo temporário por processo: vários shards podem gravar ao mesmo tempo
+    tmp_path = f"{Config.TOKEN_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, Config.TOKEN_CACHE_FILE)
+    except OSError:
+        pass
+
+
+# Retorna o token em cache se ele ainda for válido por pelo menos
+# TOKEN_REFRESH_MARGIN segundos; caso contrário retorna None
+def get_valid_token():
+    with _lock:
+        _load_from_disk()
+        if _cache["access_token"] and time.time() < (
+            _cache["expires_at"] - Config.TOKEN_REFRESH_MARGIN
+        ):
+            return _cache["access_token"]
+        return None
+
+
+# Retorna o token atualmente em cache, mesmo que esteja perto de expirar
+def current_token():
+    with _lock:
+        return _cache["access_token"]
+
+
+# Armazena um novo token com base no expires_in (em segundos) retornado pelo Azure AD
+def store_token(access_token, expires_in):
+    with _lock:
+        if _cache["access_token"] and _cache["access_token"] != access_token:
+            _superseded.add(_cache["access_token"])
+        _cache["access_token"] = access_token
+        _cache["expires_at"] = time.time() + float(expires_in or 0)
+        _save_to_disk()
+
+
+# Indica se o token foi emitido por este cache (atual ou já substituído)
+def is_managed(token):
+    with _lock:
+        return token == _cache["access_token"] or token in _superseded
+
+
+# Esquece os tokens já substituídos (no modo daemon, ao virar o dia, quando não
+# há mais chamadas em andamento com eles)
+def forget_superseded():
+    with _lock:
+        _superseded.clear()
+
+
+# Limpa o cache em memória (o arquivo em disco, se houver, é mantido)
+def clear():
+    global _disk_loaded
+    with _lock:
+        _cache["access_token"] = None
+        _cache["expires_at"] = 0.0
+        _superseded.clear()
+        _disk_loaded = False
@@ -1,60 +1,96 @@
-from datetime import datetime, timedelta
+import heapq
+from datetime import datetime
 
+from m365_reminder_project.timezones import as_utc, default_zone, local_today
 
-# Função para detectar conflitos de horário entre eventos
+
+# Função para detectar conflitos de horário entre eventos. Usa uma varredura
+# (sweep line): os eventos são percorridos em ordem de início e cada um é
+# comparado apenas com os eventos ainda em andamento, guardados em um heap
+# ordenado pelo fim. O custo é O(n log n + k), onde k é o número de conflitos.
 def detect_conflicts(events):
-    conflicts = []
     # Ordena os eventos por data de início para facilitar a detecção de conflitos
     sorted_events = sorted(events, key=lambda x: x.start_datetime)
 
-    # Itera sobre os eventos para comparar cada um com os eventos subsequentes
-    for i in range(len(sorted_events)):
-        for j in range(i + 1, len(sorted_events)):
-            event1 = sorted_events[i]
-            event2 = sorted_events[j]
-
-            # Verifica se há sobreposição de horários entre os dois eventos
-            # Um conflito ocorre se o início do segundo evento for antes do fim do primeiro
-            # E o fim do primeiro evento for depois do início do segundo
-            if max(event1.start_datetime, event2.start_datetime) < min(
-                event1.end_datetime, event2.end_datetime
-            ):
-                conflicts.append(
-                    (event1, event2)
-                )  # Adiciona o par de eventos conflitantes à lista
-    return conflicts
-
-
-# Função para sugerir blocos de tempo livre para foco
+    conflicts = []
+    active = []  # heap de (fim, posição) dos eventos em andamento
+    for j, event in enumerate(sorted_events):
+        # Descarta os eventos que terminaram antes (ou no instante) deste início
+        while active and active[0][0] <= event.start_datetime:
+            heapq.heappop(active)
+
+        # Um conflito ocorre se o início do segundo evento for antes do fim do
+        # primeiro e antes do seu próprio fim (eventos sem duração não conflitam)
+        if event.start_datetime < event.end_datetime:
+            conflicts.extend((i, j) for _, i in active)
+        heapq.heappush(active, (event.end_datetime, j))
+
+    # Mantém a ordem dos pares da comparação par a par: pelo primeiro evento e,
+    # em seguida, pelo segundo
+    conflicts.sort()
+    return [(sorted_events[i], sorted_events[j]) for i, j in conflicts]
+
+
+# Agrupa os eventos conflitantes em clusters: conjuntos máximos de eventos ligados
+# por sobreposições (diretas ou em cadeia). Retorna apenas clusters com dois ou
+# mais eventos, cada um ordenado por início. Custo O(n log n).
+def detect_conflict_clusters(events):
+    sorted_events = sorted(events, key=lambda x: x.start_datetime)
+
+    clusters = []
+    current = []
+    current_end = None
+    for event in sorted_events:
+        # Eventos sem duração não se sobrepõem a nada
+        if event.end_datetime <= event.start_datetime:
+            continue
+        if current and event.start_datetime < current_end:
+            current.append(event)
+            current_end = max(current_end, event.end_datetime)
+            continue
+        if len(current) > 1:
+            clusters.append(current)
+        current = [event]
+        current_end = event.end_datetime
+
+    if len(current) > 1:
+        clusters.append(current)
+    return clusters
+
+
+# Converte um horário do Graph para o horário local do fuso zone (o fuso padrão
+# se None), sem timezone. Horários sem timezone são considerados UTC.
+def to_local_naive(value, zone=None):
+    return as_utc(value).astimezone(zone or default_zone()).replace(tzinfo=None)
+
+
+# Função para sugerir blocos de tempo livre para foco (no horário local do fuso
+# zone do usuário, ou do fuso padrão)
 def suggest_focus_blocks(
-    events, start_hour=9, end_hour=17, min_block_duration_minutes=60
+    events,
+    start_hour=9,
+    end_hour=17,
+    min_block_duration_minutes=60,
+    day=None,
+    zone=None,
 ):
-    today = datetime.now().date()
-    # Define o início e o fim do horário de trabalho para o dia atual
-    work_start = datetime(today.year, today.month, today.day, start_hour, 0, 0)
-    work_end = datetime(today.year, today.month, today.day, end_hour, 0, 0)
+    zone = zone or default_zone()
+    if day is None:
+        day = local_today(zone)
+    # Define o início e o fim do horário de trabalho para o dia
+    work_start = datetime(day.year, day.month, day.day, start_hour, 0, 0)
+    work_end = datetime(day.year, day.month, day.day, end_hour, 0, 0)
 
     busy_intervals = []
-    # Converte os eventos em intervalos de tempo ocupados
+    # Converte os eventos em intervalos de tempo ocupados no horário local,
+    # mantendo as datas reais (eventos de vários dias cobrem o dia inteiro)
     for event in events:
-        # Ajusta os horários dos eventos para a data de hoje para comparação
-        event_start_today = datetime(
-            today.year,
-            today.month,
-            today.day,
-            event.start_datetime.hour,
-            event.start_datetime.minute,
-            event.start_datetime.second,
-        )
-        event_end_today = datetime(
-            today.year,
-            today.month,
-            today.day,
-            event.end_datetime.hour,
-            event.end_datetime.minute,
-            event.end_datetime.second,
-        )
-        busy_intervals.append((event_start_today, event_end_today))
+        event_start = to_local_naive(event.start_datetime, zone)
+        event_end = to_local_naive(event.end_datetime, zone)
+        # Ignora eventos fora do horário de trabalho do dia
+        if event_end <= work_start or event_start >= work_end:
+            continue
+        busy_intervals.append((event_start, event_end))
 
     # Ordena os intervalos ocupados e mescla aqueles que se sobrepõem
     busy_intervals.sort()
@@ -1,32 +1,60 @@
-from m365_reminder_project.api import (
-    get_access_token,
-    get_all_users,
-    get_todays_events,
-    log_action,
-)
-from m365_reminder_project.notifications import (
-    send_email_reminder,
-    send_teams_message,
-    create_onedrive_file,
-    send_admin_notification,
-)
-from m365_reminder_project.models import Event, User
-from m365_reminder_project.utils import detect_conflicts, suggest_focus_blocks
+import argparse
+import os
+import sys
+from datetime import datetime
+
 from config import Config
 
+# Os módulos do projeto (e com eles requests, tenacity, jinja2, NumPy, ...) são
+# importados dentro das funções, apenas quando a execução realmente começa.
+# Assim --help e --check-config respondem sem pagar o custo dessas importações.
 
-def main():
-    log_action("Iniciando script de lembretes de compromissos...")
+# Valores aceitos pelas configurações de escolha fixa
+_CHOICES = {
+    "SYNC_MODE": ("full", "delta", "prefetch"),
+    "LOG_FORMAT": ("json", "text"),
+    "LOG_LEVEL": ("DEBUG", "INFO", "WARNING", "ERROR"),
+    "LOG_OVERFLOW": ("block", "drop"),
+    "METRICS_FORMAT": ("prometheus", "openmetrics"),
+}
 
-    if not all([Config.CLIENT_ID, Config.CLIENT_SECRET, Config.TENANT_ID]):
-        log_action(
-            "ERRO: As credenciais do aplicativo não foram configuradas. Verifique o arquivo .env.",
-            success=False,
-        )
-        send_admin_notification(
-            "Erro de Configuração do Script M365 Reminder",
-            "As credenciais do aplicativo (CLIENT_ID, CLIENT_SECRET, TENANT_ID) não foram configuradas. Verifique o arquivo .env.",
-        )
+
+# Com resume=True (--resume) a execução retoma a do dia: só envia os lembretes
+# que o livro de entregas ainda registra como pendentes. Com shard=(i, N)
+# (--shard i/N) processa apenas os usuários do shard i, com estado, log e
+# métricas próprios, e grava um resumo para a etapa de combinação.
+def main(resume=False, shard=None):
+    from itertools import chain
+
+    from m365_reminder_project.admin_notifier import close_admin_notifier
+    from m365_reminder_project.api import get_access_token, iter_users, log_action
+    from m365_reminder_project.calendar_cache import get_calendar_cache
+    from m365_reminder_project.delivery_ledger import get_delivery_ledger, ledger_day
+    from m365_reminder_project.event_cache import get_event_cache, reset_event_cache
+    from m365_reminder_project.export import close_agenda_exporter
+    from m365_reminder_project.http_client import close_session, connection_stats
+    from m365_reminder_project.log_writer import close_log_writer, get_log_writer
+    from m365_reminder_project.notifications import send_admin_notification
+    from m365_reminder_project.onedrive import close_upload_executor
+    from m365_reminder_project.pipeline import prefetch, run_pipeline
+    from m365_reminder_project.sharding import (
+        configure_shard,
+        filter_shard,
+        write_shard_stats,
+    )
+    from m365_reminder_project.state_store import close_state_store
+    from m365_reminder_project.throttling import get_rate_limiter
+
+    if shard:
+        configure_shard(*shard)
+
+    log_action(
+        "Retomando script de lembretes de compromissos..."
+        if resume
+        else "Iniciando script de lembretes de compromissos..."
+    )
+
+    if not _credentials_configured():
         return
 
     token = get_access_token()
@@ -40,8 +68,11 @@ def main():
         )
         return
 
-    users = get_all_users(token)
-    if not users:
+    # Os usuários são processados à medida que as páginas chegam do Graph
+    log_action("Obtendo lista de todos os usuários...")
+    users = prefetch(iter_users(token), Config.USERS_PAGE_SIZE)
+    first_user = next(users, None)
+    if first_user is None:
         log_action(
             "Não foi possível obter a lista de usuários. Encerrando script.",
             success=False,
@@ -52,72 +83,279 @@ def main():
         )
         return
 
-    log_action(f"Processando lembretes para {len(users)} usuários...")
+    log_action(
+        f"Processando lembretes dos usuários à medida que são obtidos "
+        f"({Config.MAX_WORKERS} worker(s))"
+        + (f", shard {shard[0]}/{shard[1]}" if shard else "")
+        + "..."
+    )
 
-    for user_data in users:
-        user_id = user_data.get("id")
-        user_name = user_data.get("displayName", "Usuário")
-        user_email = user_data.get("mail") or user_data.get("userPrincipalName")
+    users = chain([first_user], users)
+    if shard:
+        users = filter_shard(users, *shard)
+    summary = run_pipeline(token, users, resume=resume)
 
-        if not user_id or not user_email:
-            log_action(
-                f"Usuário {user_name} não possui ID ou e-mail válido. Pulando.",
-                success=False,
-            )
-            continue
+    log_action(
+        f"Resumo: {summary['processed']} usuário(s) processado(s), "
+        f"{summary['succeeded']} com sucesso, {summary['failed']} com falha, "
+        f"{summary['skipped']} ignorado(s)."
+    )
 
-        log_action(f"Processando usuário: {user_name} ({user_email})")
+    # Encerrada antes do resumo do livro, que inclui os registros exportados
+    exporter = close_agenda_exporter()
+    for channel, counts in get_delivery_ledger().summary(ledger_day()).items():
+        log_action(
+            f"Livro de entregas [{channel}]: {counts['delivered']} entregue(s), "
+            f"{counts['pending']} pendente(s) hoje."
+        )
 
-        events_data = get_todays_events(token, user_id)
-        events = [Event.from_dict(e) for e in events_data] if events_data else []
+    stats = connection_stats()
+    log_action(
+        f"Conexões HTTP: {stats['requests']} requisição(ões) em "
+        f"{stats['connections']} conexão(ões) ({stats['reused']} reutilizada(s))."
+    )
+    event_stats = get_event_cache().stats()
+    log_action(
+        f"Cache de eventos: {event_stats['unique']} reunião(ões) distinta(s) em "
+        f"{event_stats['lookups']} evento(s) ({event_stats['hit_ratio']:.0%} de acertos)."
+    )
+    reset_event_cache()
 
-        # Detecção de Conflitos
-        conflicts = detect_conflicts(events)
-        if conflicts:
-            log_action(
-                f"Conflitos de horário detectados para {user_name}: {len(conflicts)} conflito(s)."
-            )
-            # Aqui você pode adicionar lógica para notificar o usuário sobre os conflitos
-            # Por exemplo, adicionar uma seção ao e-mail ou mensagem do Teams.
-
-        # Sugestão de Blocos de Foco
-        focus_blocks = suggest_focus_blocks(events)
-        if focus_blocks:
-            log_action(
-                f"Blocos de foco sugeridos para {user_name}: {len(focus_blocks)} bloco(s)."
-            )
-            # Similarmente, você pode adicionar essa informação aos lembretes.
+    if Config.SYNC_MODE == "prefetch":
+        calendar_stats = get_calendar_cache().stats
+        log_action(
+            f"Cache de agendas: {calendar_stats['hits']} agenda(s) servida(s) do cache, "
+            f"{calendar_stats['revalidated']} revalidada(s) "
+            f"({calendar_stats['changed']} evento(s) alterado(s)), "
+            f"{calendar_stats['fetched']} obtida(s) do Graph."
+        )
+
+    limiter = get_rate_limiter()
+    log_action(
+        f"Limitação do Graph: {limiter.throttled} resposta(s) 429/503, limite de "
+        f"concorrência final {limiter.concurrency.limit:.1f}."
+    )
+    if exporter:
+        log_action(
+            f"Exportação da agenda: {exporter.exported} usuário(s) gravado(s) em "
+            f"{Config.EXPORT_FILE}"
+            + (f", {exporter.errors} com erro." if exporter.errors else ".")
+        )
+    close_upload_executor()
+    close_session()
+    close_state_store()
+    report_metrics()
+    if shard:
+        write_shard_stats(*shard, summary)
+
+    dropped = get_log_writer().dropped
+    if dropped:
+        log_action(
+            f"{dropped} registro(s) de log descartado(s) com a fila cheia.",
+            level="WARNING",
+        )
+    # Envia o resumo de falhas pendente ao administrador. Nos encerramentos
+    # antecipados acima isso é feito pelo atexit do despachante.
+    close_admin_notifier()
+    log_action("Script de lembretes de compromissos concluído!")
+    close_log_writer()
+
+
+# Verifica se as credenciais do aplicativo foram configuradas, notificando o
+# administrador caso contrário
+def _credentials_configured():
+    from m365_reminder_project.api import log_action
+    from m365_reminder_project.notifications import send_admin_notification
+
+    if all([Config.CLIENT_ID, Config.CLIENT_SECRET, Config.TENANT_ID]):
+        return True
+    log_action(
+        "ERRO: As credenciais do aplicativo não foram configuradas. Verifique o arquivo .env.",
+        success=False,
+    )
+    send_admin_notification(
+        "Erro de Configuração do Script M365 Reminder",
+        "As credenciais do aplicativo (CLIENT_ID, CLIENT_SECRET, TENANT_ID) não foram configuradas. Verifique o arquivo .env.",
+    )
+    return False
+
+
+# Modo daemon (--daemon): o processo permanece ativo e o agendador envia o
+# lembrete de cada usuário no seu horário dentro da janela de envio, com sessão,
+# token, templates e caches aquecidos. SIGTERM ou Ctrl+C encerram o daemon
+# depois do envio em andamento.
+def daemon(shard=None):
+    import signal
+
+    from m365_reminder_project.admin_notifier import close_admin_notifier
+    from m365_reminder_project.api import log_action
+    from m365_reminder_project.export import close_agenda_exporter
+    from m365_reminder_project.http_client import close_session
+    from m365_reminder_project.log_writer import close_log_writer
+    from m365_reminder_project.onedrive import close_upload_executor
+    from m365_reminder_project.scheduler import ReminderScheduler
+    from m365_reminder_project.sharding import configure_shard
+    from m365_reminder_project.state_store import close_state_store
+
+    if shard:
+        configure_shard(*shard)
+
+    log_action(
+        f"Iniciando o agendador de lembretes (janela de envio às "
+        f"{Config.SCHEDULE_WINDOW_START}, {Config.SCHEDULE_WINDOW_MINUTES} min)"
+        + (f", shard {shard[0]}/{shard[1]}" if shard else "")
+        + "..."
+    )
+    if not _credentials_configured():
+        return
+
+    scheduler = ReminderScheduler(shard=shard, report=report_metrics)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: scheduler.stop())
+    scheduler.run()
 
-        # Email Reminder
-        email_sent = send_email_reminder(token, user_email, user_name, events)
+    summary = scheduler.summary
+    log_action(
+        f"Agendador encerrado. Total: {summary['processed']} usuário(s) "
+        f"processado(s), {summary['succeeded']} com sucesso, "
+        f"{summary['failed']} com falha, {summary['skipped']} ignorado(s)."
+    )
+    close_agenda_exporter()
+    close_upload_executor()
+    close_session()
+    close_state_store()
+    report_metrics()
+    close_admin_notifier()
+    close_log_writer()
 
-        # Teams Message
-        # teams_sent = send_teams_message(token, user_id, user_name, events)
 
-        # OneDrive File
-        onedrive_file_created = create_onedrive_file(token, user_id, user_name, events)
+# Registra o resumo de latência e vazão por operação e, se configurado, grava o
+# arquivo de métricas para o node exporter
+def report_metrics():
+    from m365_reminder_project.api import log_action
+    from m365_reminder_project.metrics import get_metrics
 
-        # Feedback do Usuário (simulado)
-        # Em um ambiente real, isso envolveria um link no e-mail/Teams que leva a um formulário
-        # ou a um endpoint que registra o feedback.
+    metrics = get_metrics()
+    for operation, stats in metrics.summary().items():
+        statuses = ", ".join(
+            f"{status}: {count}" for status, count in stats["statuses"].items()
+        )
         log_action(
-            f"Lembretes enviados para {user_name}. Feedback do usuário pode ser coletado via plataforma externa."
+            f"Métricas [{operation}]: {stats['calls']} chamada(s), "
+            f"{stats['calls_per_second']:.2f}/s, "
+            f"p50 {stats['p50'] * 1000:.0f} ms, p95 {stats['p95'] * 1000:.0f} ms, "
+            f"p99 {stats['p99'] * 1000:.0f} ms, {stats['retries']} retentativa(s), "
+            f"{stats['bytes_sent']} B enviados, {stats['bytes_received']} B recebidos"
+            + (f" (status {statuses})" if statuses else "")
+            + "."
         )
-        teams_sent = True  # não vamos mexer com teams
-        if email_sent and teams_sent and onedrive_file_created:
-            log_action(f"Lembretes enviados com sucesso para {user_name}!")
-        else:
-            log_action(
-                f"Alguns lembretes não puderam ser enviados para {user_name}.",
-                success=False,
+
+    if Config.METRICS_TEXTFILE:
+        try:
+            metrics.write_textfile(
+                Config.METRICS_TEXTFILE,
+                openmetrics=Config.METRICS_FORMAT == "openmetrics",
             )
-            send_admin_notification(
-                f"Falha no Envio de Lembretes para {user_name}",
-                f"Alguns lembretes (e-mail, Teams, OneDrive) não puderam ser enviados para {user_name}.",
+        except OSError as e:
+            log_action(f"Erro ao gravar o arquivo de métricas: {e}", success=False)
+
+
+# Verifica as configurações sem importar os módulos da execução e retorna a
+# lista de problemas encontrados (vazia se a configuração estiver válida)
+def check_config():
+    problems = []
+    for name in ("CLIENT_ID", "CLIENT_SECRET", "TENANT_ID", "ADMIN_EMAIL"):
+        if not getattr(Config, name):
+            problems.append(f"{name} não foi configurado.")
+    for name, choices in _CHOICES.items():
+        value = getattr(Config, name)
+        if value not in choices:
+            problems.append(
+                f"{name}={value!r} inválido (valores aceitos: {', '.join(choices)})."
             )
+    if Config.SMTP_SERVER and not Config.SMTP_USERNAME:
+        problems.append("SMTP_SERVER configurado sem SMTP_USERNAME.")
+    try:
+        datetime.strptime(Config.SCHEDULE_WINDOW_START, "%H:%M")
+    except ValueError:
+        problems.append(
+            f"SCHEDULE_WINDOW_START={Config.SCHEDULE_WINDOW_START!r} inválido (use HH:MM)."
+        )
+    if Config.TIMEZONE:
+        from m365_reminder_project.timezones import resolve_zone
+
+        if resolve_zone(Config.TIMEZONE) is None:
+            problems.append(
+                f"TIMEZONE={Config.TIMEZONE!r} desconhecido (use um nome IANA, "
+                "ex.: America/Sao_Paulo)."
+            )
+    for name in ("STATE_DB_FILE", "LOG_FILE", "EXPORT_FILE"):
+        if not getattr(Config, name):
+            continue
+        directory = os.path.dirname(os.path.abspath(getattr(Config, name)))
+        if not os.path.isdir(directory):
+            problems.append(f"O diretório de {name} não existe: {directory}")
+    return problems
 
-    log_action("Script de lembretes de compromissos concluído!")
+
+# Valida o argumento --shard i/N
+def _shard_argument(value):
+    from m365_reminder_project.sharding import parse_shard
+
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Lembretes de compromissos do M365")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="envia apenas os lembretes ainda pendentes hoje (retoma uma execução interrompida)",
+    )
+    parser.add_argument(
+        "--check-config",
+        action="store_true",
+        help="apenas verifica as configurações e termina (código 1 se houver problemas)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="permanece ativo e envia cada lembrete no horário do usuário (janela de envio)",
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--shard",
+        type=_shard_argument,
+        metavar="i/N",
+        help="processa apenas o shard i de N (0 <= i < N), por hashing consistente dos ids",
+    )
+    group.add_argument(
+        "--shards",
+        type=int,
+        metavar="N",
+        help="executa N processos locais (um por shard) e combina os resultados",
+    )
+    args = parser.parse_args()
+    if args.daemon and args.shards:
+        parser.error("--daemon não pode ser usado com --shards (use --shard i/N)")
+    if args.check_config:
+        problems = check_config()
+        for problem in problems:
+            print(f"ERRO: {problem}", file=sys.stderr)
+        if not problems:
+            print("Configuração válida.")
+        sys.exit(1 if problems else 0)
+    if args.shards:
+        from m365_reminder_project.log_writer import close_log_writer
+        from m365_reminder_project.sharding import run_local_shards
+
+        merged = run_local_shards(args.shards, resume=args.resume)
+        close_log_writer()
+        sys.exit(1 if merged["missing"] else 0)
+    if args.daemon:
+        daemon(shard=args.shard)
+    else:
+        main(resume=args.resume, shard=args.shard)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Compara a detecção de conflitos por varredura com a comparação par a par.
+# Uso: python scripts/benchmark_conflicts.py [--sizes 10,100,1000,10000]
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from m365_reminder_project.models import Event  # noqa: E402
+from m365_reminder_project.utils import (  # noqa: E402
+    detect_conflict_clusters,
+    detect_conflicts,
+)
+
+
+# Implementação anterior (O(n²)): compara cada par de eventos
+def detect_conflicts_pairwise(events):
+    conflicts = []
+    sorted_events = sorted(events, key=lambda x: x.start_datetime)
+    for i in range(len(sorted_events)):
+        for j in range(i + 1, len(sorted_events)):
+            event1 = sorted_events[i]
+            event2 = sorted_events[j]
+            if max(event1.start_datetime, event2.start_datetime) < min(
+                event1.end_datetime, event2.end_datetime
+            ):
+                conflicts.append((event1, event2))
+    return conflicts
+
+
+# Gera reservas sintéticas de uma sala ao longo de um mês (30 a 120 minutos)
+def _sample_events(count, rng):
+    base = datetime(2025, 6, 1, 8, 0)
+    span_minutes = 30 * 24 * 60
+    events = []
+    for i in range(count):
+        start = base + timedelta(minutes=rng.randrange(span_minutes))
+        events.append(
+            Event(
+                f"event{i}",
+                f"Reserva {i}",
+                None,
+                start,
+                start + timedelta(minutes=rng.choice((30, 60, 90, 120))),
+                "Sala 1",
+                None,
+                [],
+                False,
+            )
+        )
+    return events
+
+
+def _timed(func, events):
+    started = time.perf_counter()
+    result = func(events)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark da detecção de conflitos de horário"
+    )
+    parser.add_argument("--sizes", default="10,100,1000,10000")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(
+        f"{'eventos':>8} {'conflitos':>10} {'clusters':>9} "
+        f"{'par a par':>12} {'varredura':>12}"
+    )
+    for size in (int(value) for value in args.sizes.split(",")):
+        events = _sample_events(size, rng)
+        expected, pairwise_time = _timed(detect_conflicts_pairwise, events)
+        conflicts, sweep_time = _timed(detect_conflicts, events)
+        assert conflicts == expected
+        clusters = detect_conflict_clusters(events)
+        print(
+            f"{size:>8} {len(conflicts):>10} {len(clusters):>9} "
+            f"{pairwise_time * 1000:>10.2f}ms {sweep_time * 1000:>10.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# Mede a vazão de main.main() de ponta a ponta contra o Graph simulado local
+# (m365_reminder_project/fake_graph.py), em usuários processados por minuto.
+# Uso: python scripts/benchmark_end_to_end.py [--sizes 1000,10000,50000]
+#      [--workers 8] [--batch-size 20] [--latency 0.01] [--throttle-rate 0.01]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main as reminder_main  # noqa: E402
+from config import Config  # noqa: E402
+from m365_reminder_project import token_cache  # noqa: E402
+from m365_reminder_project.event_cache import reset_event_cache  # noqa: E402
+from m365_reminder_project.fake_graph import FakeGraphServer, FakeTenant  # noqa: E402
+from m365_reminder_project.http_client import close_session  # noqa: E402
+from m365_reminder_project.log_writer import close_log_writer  # noqa: E402
+from m365_reminder_project.metrics import reset_metrics  # noqa: E402
+from m365_reminder_project.state_store import close_state_store  # noqa: E402
+from m365_reminder_project.throttling import reset_rate_limiter  # noqa: E402
+
+
+# Configura o script para usar o servidor simulado e descarta o estado
+# compartilhado (sessão HTTP, token, limitador, caches) da execução anterior
+def _configure(server, args, tmp_dir, size):
+    Config.CLIENT_ID = "benchmark-client"
+    Config.CLIENT_SECRET = "benchmark-secret"
+    Config.TENANT_ID = "benchmark-tenant"
+    Config.ADMIN_EMAIL = "admin@example.com"
+    Config.GRAPH_BASE_URL = server.graph_url
+    Config.LOGIN_BASE_URL = server.login_url
+    Config.SYNC_MODE = "full"
+    Config.MAX_WORKERS = args.workers
+    Config.GRAPH_BATCH_SIZE = args.batch_size
+    Config.HTTP_POOL_SIZE = max(10, args.workers)
+    Config.GRAPH_TENANT_RPS = args.tenant_rps
+    Config.GRAPH_MAILBOX_RPS = args.mailbox_rps
+    Config.TOKEN_CACHE_FILE = None
+    Config.METRICS_TEXTFILE = None
+    Config.LOG_FILE = os.path.join(tmp_dir, f"run-{size}.log")
+    # Manifesto do OneDrive vazio a cada tamanho, para medir os uploads
+    Config.STATE_DB_FILE = os.path.join(tmp_dir, f"state-{size}.db")
+    Config.LOG_CONSOLE = False
+
+    close_log_writer()
+    close_session()
+    close_state_store()
+    token_cache.clear()
+    reset_rate_limiter()
+    reset_metrics()
+    reset_event_cache()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de ponta a ponta contra o Graph simulado"
+    )
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--events", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    # Sem limite local por padrão, para medir o próprio script; use os valores de
+    # produção para simular os limites do Graph
+    parser.add_argument("--tenant-rps", type=float, default=0)
+    parser.add_argument("--mailbox-rps", type=float, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{'usuários':>9} {'tempo':>9} {'usuários/min':>13} "
+        f"{'requisições':>12} {'429':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in (int(value) for value in args.sizes.split(",")):
+            tenant = FakeTenant(
+                users=size,
+                events_per_user=args.events,
+                latency=args.latency,
+                throttle_rate=args.throttle_rate,
+                retry_after=args.retry_after,
+            )
+            with FakeGraphServer(tenant) as server:
+                _configure(server, args, tmp_dir, size)
+                started = time.perf_counter()
+                reminder_main.main()
+                elapsed = time.perf_counter() - started
+
+            requests_total = sum(tenant.requests.values())
+            print(
+                f"{size:>9} {elapsed:>8.1f}s {size / elapsed * 60:>13,.0f} "
+                f"{requests_total:>12} {tenant.throttled:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Benchmark do cálculo de disponibilidade de toda a organização em uma passada.
+# Uso: python scripts/benchmark_freebusy.py [--users 20000] [--events 8]
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from m365_reminder_project.freebusy import FreeBusyGrid  # noqa: E402
+from m365_reminder_project.models import Event  # noqa: E402
+from m365_reminder_project.utils import suggest_focus_blocks  # noqa: E402
+
+
+# Gera a agenda sintética de cada usuário para o dia atual
+def _sample_events_by_user(users, events_per_user, rng):
+    today = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    events_by_user = {}
+    for user in range(users):
+        events = []
+        for i in range(events_per_user):
+            start = today + timedelta(minutes=rng.randrange(0, 10 * 60, 15))
+            end = start + timedelta(minutes=rng.choice((30, 60, 90)))
+            events.append(
+                Event(f"{user}-{i}", "Reunião", None, start, end, None, None, [], False)
+            )
+        events_by_user[f"user{user}"] = events
+    return events_by_user
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark do cálculo de blocos de foco e disponibilidade"
+    )
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=8)
+    args = parser.parse_args()
+
+    events_by_user = _sample_events_by_user(args.users, args.events, random.Random(42))
+
+    grid, build_time = _timed(lambda: FreeBusyGrid.from_events(events_by_user))
+    _, blocks_time = _timed(lambda: grid.focus_blocks())
+    _, stats_time = _timed(lambda: grid.utilization())
+    group = list(events_by_user)[:50]
+    _, common_time = _timed(lambda: grid.common_free_slots(group))
+    _, serial_time = _timed(
+        lambda: [suggest_focus_blocks(events) for events in events_by_user.values()]
+    )
+
+    print(f"{args.users} usuários, {args.events} eventos por usuário")
+    print(f"Mapa de ocupação:      {build_time * 1000:8.1f} ms")
+    print(f"Blocos de foco:        {blocks_time * 1000:8.1f} ms")
+    print(f"Ocupação por usuário:  {stats_time * 1000:8.1f} ms")
+    print(f"Horários em comum (50): {common_time * 1000:7.1f} ms")
+    print(f"suggest_focus_blocks por usuário: {serial_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
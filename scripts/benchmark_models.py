@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Benchmark de memória dos modelos: bytes por Event e por User em um dia sintético.
+# Uso: python scripts/benchmark_models.py [--users 10000] [--events 200000]
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from m365_reminder_project.models import Event, User  # noqa: E402
+
+ATTENDEES_PER_EVENT = 8
+
+
+# Gera os dicionários de eventos no formato retornado pelo Graph. As listas de
+# participantes são reaproveitadas entre eventos para manter a entrada pequena.
+def _sample_event_dicts(users, count):
+    attendee_lists = [
+        [
+            {
+                "type": "required",
+                "status": {"response": "accepted"},
+                "emailAddress": {
+                    "name": f"Usuário {(i + j) % users}",
+                    "address": f"user{(i + j) % users}@example.com",
+                },
+            }
+            for j in range(ATTENDEES_PER_EVENT)
+        ]
+        for i in range(min(count, 1000))
+    ]
+    return [
+        {
+            "id": f"event{i}",
+            "subject": f"Reunião {i % 500}",
+            "bodyPreview": "Pauta da reunião",
+            "start": {"dateTime": f"2025-06-11T{9 + i % 8:02d}:00:00Z"},
+            "end": {"dateTime": f"2025-06-11T{10 + i % 8:02d}:00:00Z"},
+            "location": {"displayName": f"Sala {i % 20}"},
+            "organizer": {
+                "emailAddress": {
+                    "name": f"Usuário {i % users}",
+                    "address": f"user{i % users}@example.com",
+                }
+            },
+            "attendees": attendee_lists[i % len(attendee_lists)],
+            "isAllDay": False,
+        }
+        for i in range(count)
+    ]
+
+
+# Retorna os bytes alocados por build() que continuam vivos no resultado
+def _measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return result, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de memória dos modelos Event e User"
+    )
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=200000)
+    args = parser.parse_args()
+
+    user_dicts = [
+        (f"id{i}", f"Usuário {i}", f"user{i}@example.com") for i in range(args.users)
+    ]
+    event_dicts = _sample_event_dicts(args.users, args.events)
+
+    users, users_bytes = _measure(lambda: [User(*data) for data in user_dicts])
+    events, events_bytes = _measure(
+        lambda: [Event.from_dict(data) for data in event_dicts]
+    )
+
+    print(f"Usuários: {len(users)} ({users_bytes / len(users):.0f} bytes por User)")
+    print(
+        f"Eventos: {len(events)} com {ATTENDEES_PER_EVENT} participantes cada "
+        f"({events_bytes / len(events):.0f} bytes por Event)"
+    )
+    print(f"Total: {(users_bytes + events_bytes) / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Microbenchmark da renderização de e-mails e mensagens do Teams.
+# Uso: python scripts/benchmark_rendering.py [--users 2000] [--events 5]
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from m365_reminder_project.models import Event  # noqa: E402
+from m365_reminder_project.rendering import (  # noqa: E402
+    render_email_html_bulk,
+    render_teams_message_bulk,
+)
+
+
+# Gera eventos sintéticos para um usuário
+def _sample_events(count):
+    start = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0)
+    return [
+        Event(
+            f"event{i}",
+            f"Reunião {i}",
+            "Pauta da reunião",
+            start + timedelta(hours=i),
+            start + timedelta(hours=i, minutes=30),
+            "Sala 1" if i % 2 else None,
+            {"name": "Organizador", "address": "org@example.com"},
+            [],
+            False,
+        )
+        for i in range(count)
+    ]
+
+
+# Executa render_bulk e retorna o número de renderizações por segundo
+def _measure(render_bulk, users):
+    started = time.perf_counter()
+    render_bulk(users)
+    elapsed = time.perf_counter() - started
+    return len(users) / elapsed if elapsed else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Microbenchmark da renderização de lembretes"
+    )
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=5)
+    args = parser.parse_args()
+
+    users = [
+        (f"Usuário {i} Teste", _sample_events(args.events)) for i in range(args.users)
+    ]
+
+    # A primeira renderização compila os templates (ou os carrega do bytecode cache)
+    started = time.perf_counter()
+    render_email_html_bulk(users[:1])
+    render_teams_message_bulk(users[:1])
+    print(f"Compilação dos templates: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    for name, render_bulk in (
+        ("E-mail (HTML)", render_email_html_bulk),
+        ("Teams", render_teams_message_bulk),
+    ):
+        rate = _measure(render_bulk, users)
+        print(
+            f"{name}: {rate:,.0f} renderizações/s "
+            f"({args.users} usuários, {args.events} eventos)"
+        )
+
+
+if __name__ == "__main__":
+    main()
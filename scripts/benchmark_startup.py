@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Mede o custo de inicialização do script com python -X importtime: tempo total
+# de importação de main.py, do caminho --check-config e de todos os módulos de
+# uma execução completa, e os módulos mais caros de cada um.
+# Uso: python scripts/benchmark_startup.py [--runs 5] [--top 10]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Módulos importados por uma execução completa (main.main())
+RUN_MODULES = (
+    "m365_reminder_project.pipeline",
+    "m365_reminder_project.sharding",
+    "m365_reminder_project.rendering",
+    "m365_reminder_project.freebusy",
+    "jinja2",
+    "smtplib",
+)
+
+SCENARIOS = {
+    "import main": ["-c", "import main"],
+    "main.py --check-config": ["main.py", "--check-config"],
+    "execução completa": ["-c", "import main, " + ", ".join(RUN_MODULES)],
+}
+
+
+# Executa o Python com -X importtime e retorna o tempo total de importação (soma
+# dos módulos de nível superior) e o tempo acumulado de cada módulo, em µs
+def import_profile(args):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    total = 0
+    times = {}
+    nested = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        nested[module.strip()] = int(cumulative)
+        # Módulos importados por outros aparecem recuados, antes de quem os
+        # importou. O site (e o que ele importa) é do interpretador, não do script.
+        if not module[1:].startswith(" "):
+            if module.strip() != "site":
+                total += int(cumulative)
+                times.update(nested)
+            nested = {}
+    return total, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de inicialização")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, command in SCENARIOS.items():
+        totals = []
+        times = {}
+        for _ in range(args.runs):
+            total, times = import_profile(command)
+            totals.append(total)
+        print(
+            f"{name}: {statistics.median(totals) / 1000:.1f} ms "
+            f"(mediana de {args.runs}), {len(times)} módulo(s)"
+        )
+        slowest = sorted(times.items(), key=lambda item: -item[1])[: args.top]
+        for module, cumulative in slowest:
+            print(f"    {cumulative / 1000:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from config import Config
+from m365_reminder_project import token_cache
+from m365_reminder_project.event_cache import reset_event_cache
+from m365_reminder_project.fake_graph import FakeGraphServer
+from m365_reminder_project.http_client import close_session
+from m365_reminder_project.log_writer import close_log_writer
+from m365_reminder_project.metrics import reset_metrics
+from m365_reminder_project.state_store import close_state_store
+from m365_reminder_project.throttling import reset_rate_limiter
+
+# Configurações alteradas por todos os testes contra o Graph simulado
+_SETTINGS = (
+    "CLIENT_ID",
+    "CLIENT_SECRET",
+    "TENANT_ID",
+    "ADMIN_EMAIL",
+    "GRAPH_BASE_URL",
+    "LOGIN_BASE_URL",
+    "STATE_DB_FILE",
+    "LOG_FILE",
+    "LOG_CONSOLE",
+)
+
+
+# Base dos testes contra o Graph simulado. Salva e restaura as configurações
+# (as comuns e as listadas em SETTINGS), grava o banco de estado e o log em um
+# diretório temporário e descarta o estado compartilhado (sessão, banco, token,
+# limitador, métricas e caches) antes e depois de cada teste. Se make_tenant()
+# devolver um tenant, um FakeGraphServer com ele fica disponível em self.server
+# durante o teste; senão o teste sobe os seus próprios servidores (use_server).
+class FakeGraphTestCase(unittest.TestCase):
+    SETTINGS = ()
+
+    def make_tenant(self):
+        return None
+
+    def setUp(self):
+        self.original = {
+            name: getattr(Config, name) for name in _SETTINGS + tuple(self.SETTINGS)
+        }
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        Config.CLIENT_ID = "client"
+        Config.CLIENT_SECRET = "secret"
+        Config.TENANT_ID = "tenant"
+        Config.ADMIN_EMAIL = "admin@example.com"
+        Config.STATE_DB_FILE = self.tmp_path("state.db")
+        Config.LOG_FILE = self.tmp_path("run.log")
+        Config.LOG_CONSOLE = False
+        self.tenant = self.make_tenant()
+        self.server = None
+        if self.tenant is not None:
+            self.server = FakeGraphServer(self.tenant).start()
+            self.use_server(self.server)
+        self.reset_state()
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.stop()
+        self.reset_state()
+        for name, value in self.original.items():
+            setattr(Config, name, value)
+        self.tmp_dir.cleanup()
+
+    # Aponta o script para o servidor simulado (Graph e Azure AD)
+    def use_server(self, server):
+        Config.GRAPH_BASE_URL = server.graph_url
+        Config.LOGIN_BASE_URL = server.login_url
+
+    # Descarta o estado compartilhado entre execuções
+    def reset_state(self):
+        close_log_writer()
+        close_session()
+        close_state_store()
+        token_cache.clear()
+        reset_rate_limiter()
+        reset_metrics()
+        reset_event_cache()
+
+    def tmp_path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
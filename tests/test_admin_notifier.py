@@ -0,0 +1,133 @@
+import smtplib
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from m365_reminder_project.admin_notifier import (
+    AdminNotifier,
+    SmtpConnection,
+    build_digest,
+)
+
+
+class TestSmtpConnection(unittest.TestCase):
+
+    @patch("smtplib.SMTP")
+    def test_reuses_authenticated_connection(self, mock_smtp):
+        connection = SmtpConnection("smtp.example.com", 587, "user", "secret")
+        for _ in range(3):
+            connection.send(MagicMock())
+        connection.close()
+
+        mock_smtp.assert_called_once_with("smtp.example.com", 587, timeout=30)
+        server = mock_smtp.return_value
+        server.starttls.assert_called_once()
+        server.login.assert_called_once_with("user", "secret")
+        self.assertEqual(server.send_message.call_count, 3)
+        server.quit.assert_called_once()
+
+    @patch("smtplib.SMTP")
+    def test_reconnects_when_server_disconnects(self, mock_smtp):
+        first, second = MagicMock(), MagicMock()
+        first.send_message.side_effect = smtplib.SMTPServerDisconnected()
+        mock_smtp.side_effect = [first, second]
+
+        connection = SmtpConnection("smtp.example.com", 587, "user", "secret")
+        connection.send(MagicMock())
+
+        self.assertEqual(connection.connections, 2)
+        second.send_message.assert_called_once()
+
+
+class TestAdminNotifier(unittest.TestCase):
+
+    def test_build_digest_groups_by_category(self):
+        notifications = [
+            ("Falha A", "msg 1", "e-mail"),
+            ("Falha B", "msg 2", "OneDrive"),
+            ("Falha C", "msg 3", "e-mail"),
+        ]
+        subject, body = build_digest(notifications, max_details=2)
+
+        self.assertIn("(3)", subject)
+        self.assertLess(body.index("- e-mail: 2"), body.index("- OneDrive: 1"))
+        self.assertIn("* Falha A: msg 1", body)
+        self.assertNotIn("Falha C", body)
+        self.assertIn("e mais 1 falha(s)", body)
+
+    def test_single_notification_keeps_original_subject(self):
+        self.assertEqual(
+            build_digest([("Assunto", "Mensagem", "Assunto")]),
+            ("Assunto", "Mensagem"),
+        )
+
+    @patch("m365_reminder_project.admin_notifier.log_action")
+    def test_coalesces_failures_into_one_email(self, mock_log):
+        connection = MagicMock()
+        notifier = AdminNotifier(
+            connection, "bot@example.com", "admin@example.com", flush_interval=60
+        )
+        for i in range(50):
+            notifier.notify(f"Falha {i}", "erro", category="e-mail")
+        notifier.close()
+
+        connection.send.assert_called_once()
+        msg = connection.send.call_args.args[0]
+        self.assertEqual(msg["To"], "admin@example.com")
+        self.assertIn("(50)", msg["Subject"])
+        connection.close.assert_called_once()
+        self.assertFalse(notifier.notify("Depois", "erro"))
+
+    @patch("m365_reminder_project.admin_notifier.log_action")
+    def test_flush_sends_pending_digest(self, mock_log):
+        connection = MagicMock()
+        notifier = AdminNotifier(
+            connection, "bot@example.com", "admin@example.com", flush_interval=60
+        )
+        notifier.notify("Falha", "erro")
+        notifier.flush()
+        self.assertEqual(connection.send.call_count, 1)
+        notifier.flush()
+        self.assertEqual(connection.send.call_count, 1)
+        notifier.close()
+
+    @patch("m365_reminder_project.admin_notifier.log_action")
+    def test_send_error_is_logged(self, mock_log):
+        connection = MagicMock()
+        connection.send.side_effect = smtplib.SMTPAuthenticationError(535, b"no")
+        notifier = AdminNotifier(
+            connection, "bot@example.com", "admin@example.com", flush_interval=0
+        )
+        notifier.notify("Falha", "erro")
+        notifier.close()
+
+        self.assertEqual(notifier.sent, 0)
+        self.assertFalse(mock_log.call_args.kwargs["success"])
+
+    @patch("m365_reminder_project.admin_notifier.log_action")
+    def test_immediate_mode_waits_idle_for_failures(self, mock_log):
+        connection = MagicMock()
+        notifier = AdminNotifier(
+            connection, "bot@example.com", "admin@example.com", flush_interval=0
+        )
+        gets = []
+        original_get = notifier._queue.get
+
+        def counting_get(*args, **kwargs):
+            gets.append(kwargs.get("timeout"))
+            return original_get(*args, **kwargs)
+
+        notifier._queue.get = counting_get
+        notifier.notify("Falha", "erro")
+        time.sleep(0.3)
+
+        # Cada falha é enviada assim que chega e a thread fica bloqueada (sem
+        # timeout) enquanto não há novas falhas
+        self.assertEqual(connection.send.call_count, 1)
+        self.assertLessEqual(len(gets), 3)
+        self.assertTrue(all(timeout is None for timeout in gets))
+        notifier.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,46 @@
 import requests
 from unittest.mock import patch, MagicMock
 import pytest
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 
 from m365_reminder_project.api import (
     get_access_token,
     call_graph_api,
+    call_graph_batch,
     get_all_users,
     get_todays_events,
+    get_todays_events_batch,
+    iter_users,
+    sync_events_delta,
+    sync_users_delta,
 )
 from m365_reminder_project.models import Event
+from m365_reminder_project import token_cache
+from m365_reminder_project.state_store import close_state_store, get_state_store
 from config import Config
 
 
+# Evento de uma hora no formato do calendarView/delta (horários em UTC)
+def _delta_event(event_id, start):
+    end = datetime.fromisoformat(start) + timedelta(hours=1)
+    return {
+        "id": event_id,
+        "subject": event_id,
+        "start": {"dateTime": f"{start}.0000000", "timeZone": "UTC"},
+        "end": {"dateTime": f"{end.isoformat()}.0000000", "timeZone": "UTC"},
+    }
+
+
 class TestM365Api(unittest.TestCase):
 
-    @patch("requests.post")
+    def setUp(self):
+        token_cache.clear()
+
+    @patch("requests.Session.post")
     def test_get_access_token_success(self, mock_post):
         mock_post.return_value.raise_for_status.return_value = None
         mock_post.return_value.json.return_value = {"access_token": "fake_token"}
@@ -29,7 +52,7 @@ class TestM365Api(unittest.TestCase):
         token = get_access_token()
         self.assertEqual(token, "fake_token")
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_get_access_token_failure(self, mock_post):
         mock_post.return_value.raise_for_status.side_effect = (
             requests.exceptions.RequestException("Connection error")
@@ -42,7 +65,7 @@ class TestM365Api(unittest.TestCase):
         with self.assertRaises(requests.exceptions.RequestException):
             get_access_token()
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_call_graph_api_get_success(self, mock_get):
         mock_get.return_value.raise_for_status.return_value = None
         mock_get.return_value.json.return_value = {"value": []}
@@ -52,7 +75,7 @@ class TestM365Api(unittest.TestCase):
         result = call_graph_api(token, endpoint)
         self.assertEqual(result, {"value": []})
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_call_graph_api_get_http_error(self, mock_get):
         mock_get.return_value.raise_for_status.side_effect = (
             requests.exceptions.HTTPError("404 Not Found")
@@ -73,6 +96,33 @@ class TestM365Api(unittest.TestCase):
         self.assertEqual(len(users), 1)
         self.assertEqual(users[0]["displayName"], "User One")
 
+    @patch("m365_reminder_project.api.call_graph_api")
+    def test_iter_users_follows_next_link(self, mock_call_graph_api):
+        next_link = "https://graph.microsoft.com/v1.0/users?$skiptoken=abc"
+        mock_call_graph_api.side_effect = [
+            {"value": [{"id": "1"}, {"id": "2"}], "@odata.nextLink": next_link},
+            {"value": [{"id": "3"}]},
+        ]
+
+        users = iter_users("fake_token", page_size=2)
+        self.assertEqual(next(users), {"id": "1"})
+        # A segunda página só é solicitada quando a primeira termina
+        self.assertEqual(mock_call_graph_api.call_count, 1)
+        self.assertEqual([u["id"] for u in users], ["2", "3"])
+
+        first_endpoint = mock_call_graph_api.call_args_list[0].args[1]
+        self.assertIn("$top=2", first_endpoint)
+        self.assertEqual(mock_call_graph_api.call_args_list[1].args[1], next_link)
+
+    @patch("requests.Session.get")
+    def test_call_graph_api_accepts_absolute_next_link(self, mock_get):
+        mock_get.return_value.raise_for_status.return_value = None
+        mock_get.return_value.json.return_value = {"value": []}
+        next_link = "https://graph.microsoft.com/v1.0/users?$skiptoken=abc"
+
+        call_graph_api("fake_token", next_link)
+        self.assertEqual(mock_get.call_args.args[0], next_link)
+
     @patch("m365_reminder_project.api.call_graph_api")
     def test_get_todays_events_success(self, mock_call_graph_api):
         mock_call_graph_api.return_value = {
@@ -92,6 +142,284 @@ class TestM365Api(unittest.TestCase):
         self.assertEqual(events[0]["subject"], "Meeting")
 
 
+class TestM365TokenCache(unittest.TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        Config.TENANT_ID = "test_tenant"
+        Config.CLIENT_ID = "test_client_id"
+        Config.CLIENT_SECRET = "test_client_secret"
+
+    def tearDown(self):
+        token_cache.clear()
+        Config.TOKEN_CACHE_FILE = None
+
+    @patch("requests.Session.post")
+    def test_get_access_token_uses_cache_until_expiry(self, mock_post):
+        mock_post.return_value.json.return_value = {
+            "access_token": "cached_token",
+            "expires_in": 3600,
+        }
+
+        self.assertEqual(get_access_token(), "cached_token")
+        self.assertEqual(get_access_token(), "cached_token")
+        self.assertEqual(mock_post.call_count, 1)
+
+    @patch("requests.Session.post")
+    def test_get_access_token_refreshes_near_expiry(self, mock_post):
+        mock_post.return_value.json.return_value = {
+            "access_token": "short_lived",
+            "expires_in": Config.TOKEN_REFRESH_MARGIN - 1,
+        }
+
+        get_access_token()
+        get_access_token()
+        self.assertEqual(mock_post.call_count, 2)
+
+    @patch("requests.Session.get")
+    @patch("requests.Session.post")
+    def test_call_graph_api_refreshes_once_on_401(self, mock_post, mock_get):
+        token_cache.store_token("old_token", 3600)
+        mock_post.return_value.json.return_value = {
+            "access_token": "new_token",
+            "expires_in": 3600,
+        }
+        unauthorized = MagicMock(status_code=401)
+        ok = MagicMock(status_code=200, text='{"value": []}')
+        ok.json.return_value = {"value": []}
+        mock_get.side_effect = [unauthorized, ok]
+
+        result = call_graph_api("old_token", "/users")
+
+        self.assertEqual(result, {"value": []})
+        self.assertEqual(mock_post.call_count, 1)
+        second_headers = mock_get.call_args_list[1].kwargs["headers"]
+        self.assertEqual(second_headers["Authorization"], "Bearer new_token")
+        # Chamadas posteriores com o token antigo passam a usar o token renovado
+        mock_get.side_effect = None
+        mock_get.return_value = ok
+        call_graph_api("old_token", "/users")
+        self.assertEqual(
+            mock_get.call_args.kwargs["headers"]["Authorization"], "Bearer new_token"
+        )
+
+    @patch("requests.Session.post")
+    def test_disk_cache_is_private_and_reused(self, mock_post):
+        mock_post.return_value.json.return_value = {
+            "access_token": "disk_token",
+            "expires_in": 3600,
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            Config.TOKEN_CACHE_FILE = os.path.join(tmp_dir, "token.json")
+            get_access_token()
+            self.assertEqual(os.stat(Config.TOKEN_CACHE_FILE).st_mode & 0o777, 0o600)
+
+            token_cache.clear()
+            self.assertEqual(get_access_token(), "disk_token")
+            self.assertEqual(mock_post.call_count, 1)
+
+
+class TestM365DeltaSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        close_state_store()
+        Config.STATE_DB_FILE = os.path.join(self.tmp_dir.name, "state.db")
+
+    def tearDown(self):
+        close_state_store()
+        self.tmp_dir.cleanup()
+
+    @patch("m365_reminder_project.api.call_graph_api")
+    def test_sync_users_delta_applies_changes(self, mock_call_graph_api):
+        mock_call_graph_api.side_effect = [
+            {
+                "value": [{"id": "1", "displayName": "Ana"}],
+                "@odata.nextLink": "https://graph/next",
+            },
+            {
+                "value": [{"id": "2", "displayName": "Bruno"}],
+                "@odata.deltaLink": "https://graph/delta1",
+            },
+            {
+                "value": [
+                    {"id": "1", "mail": "ana@x.com"},
+                    {"id": "2", "@removed": {"reason": "changed"}},
+                ],
+                "@odata.deltaLink": "https://graph/delta2",
+            },
+        ]
+
+        sync_users_delta("fake_token")
+        self.assertIn("/users/delta", mock_call_graph_api.call_args_list[0].args[1])
+        self.assertEqual(len(list(get_state_store().iter_users())), 2)
+
+        sync_users_delta("fake_token")
+        self.assertEqual(
+            mock_call_graph_api.call_args_list[2].args[1], "https://graph/delta1"
+        )
+        self.assertEqual(
+            list(get_state_store().iter_users()),
+            [{"id": "1", "displayName": "Ana", "mail": "ana@x.com"}],
+        )
+        self.assertEqual(
+            get_state_store().get_delta_link("users"), "https://graph/delta2"
+        )
+
+    @patch("m365_reminder_project.api.call_graph_api")
+    def test_sync_users_delta_falls_back_to_full_sync_on_410(self, mock_call_graph_api):
+        get_state_store().set_delta_link("users", "https://graph/expired")
+        get_state_store().upsert_users([{"id": "old"}])
+        gone = requests.exceptions.HTTPError(response=MagicMock(status_code=410))
+        mock_call_graph_api.side_effect = [
+            gone,
+            {"value": [{"id": "new"}], "@odata.deltaLink": "https://graph/fresh"},
+        ]
+
+        sync_users_delta("fake_token")
+
+        self.assertEqual(list(get_state_store().iter_users()), [{"id": "new"}])
+        self.assertEqual(
+            get_state_store().get_delta_link("users"), "https://graph/fresh"
+        )
+
+    @patch("m365_reminder_project.api.local_today", return_value=date(2025, 6, 11))
+    @patch("m365_reminder_project.api.call_graph_api")
+    def test_sync_events_delta_uses_stored_link(self, mock_call_graph_api, _today):
+        mock_call_graph_api.side_effect = [
+            {
+                "value": [
+                    _delta_event("e1", "2025-06-11T13:00:00"),
+                    _delta_event("e2", "2025-06-11T15:00:00"),
+                ],
+                "@odata.deltaLink": "https://graph/events-delta",
+            },
+            {
+                "value": [{"id": "e1", "@removed": {"reason": "deleted"}}],
+                "@odata.deltaLink": "https://graph/events-delta2",
+            },
+        ]
+
+        events = sync_events_delta("fake_token", "u1", timezone.utc)
+        self.assertEqual([e["id"] for e in events], ["e1", "e2"])
+        self.assertIn(
+            "/calendarView/delta", mock_call_graph_api.call_args_list[0].args[1]
+        )
+
+        events = sync_events_delta("fake_token", "u1", timezone.utc)
+        self.assertEqual(
+            mock_call_graph_api.call_args_list[1].args[1], "https://graph/events-delta"
+        )
+        self.assertEqual([e["id"] for e in events], ["e2"])
+
+    @patch("m365_reminder_project.api.local_today")
+    @patch("m365_reminder_project.api.call_graph_api")
+    def test_sync_events_delta_link_survives_midnight(
+        self, mock_call_graph_api, mock_today
+    ):
+        original_days = Config.CALENDAR_PREFETCH_DAYS
+        self.addCleanup(setattr, Config, "CALENDAR_PREFETCH_DAYS", original_days)
+        Config.CALENDAR_PREFETCH_DAYS = 2
+        mock_call_graph_api.side_effect = [
+            {
+                "value": [
+                    _delta_event("e1", "2025-06-11T13:00:00"),
+                    _delta_event("e2", "2025-06-12T13:00:00"),
+                ],
+                "@odata.deltaLink": "https://graph/events-delta",
+            },
+            {"value": [], "@odata.deltaLink": "https://graph/events-delta2"},
+            {"value": [], "@odata.deltaLink": "https://graph/events-delta3"},
+        ]
+
+        mock_today.return_value = date(2025, 6, 11)
+        events = sync_events_delta("fake_token", "u1", timezone.utc)
+        self.assertEqual([e["id"] for e in events], ["e1"])
+        self.assertIn(
+            "endDateTime=2025-06-12T23:59:59",
+            mock_call_graph_api.call_args_list[0].args[1],
+        )
+
+        # No dia seguinte a janela de dois dias ainda cobre o dia: usa o delta link
+        mock_today.return_value = date(2025, 6, 12)
+        events = sync_events_delta("fake_token", "u1", timezone.utc)
+        self.assertEqual(
+            mock_call_graph_api.call_args_list[1].args[1], "https://graph/events-delta"
+        )
+        self.assertEqual([e["id"] for e in events], ["e2"])
+
+        # Fora da janela a agenda é sincronizada do zero
+        mock_today.return_value = date(2025, 6, 13)
+        self.assertEqual(sync_events_delta("fake_token", "u1", timezone.utc), [])
+        self.assertIn(
+            "startDateTime=2025-06-13T00:00:00",
+            mock_call_graph_api.call_args_list[2].args[1],
+        )
+
+
+class TestM365Batch(unittest.TestCase):
+
+    @patch("m365_reminder_project.api.call_graph_api")
+    def test_call_graph_batch_splits_in_groups_of_20(self, mock_call_graph_api):
+        def fake_batch(token, endpoint, method, payload):
+            return {
+                "responses": [
+                    {"id": item["id"], "status": 200, "body": {"url": item["url"]}}
+                    for item in reversed(payload["requests"])
+                ]
+            }
+
+        mock_call_graph_api.side_effect = fake_batch
+        batch_requests = [{"method": "GET", "url": f"/users/{i}"} for i in range(45)]
+
+        results = call_graph_batch("fake_token", batch_requests)
+
+        self.assertEqual(mock_call_graph_api.call_count, 3)
+        self.assertEqual(
+            [r["body"]["url"] for r in results], [f"/users/{i}" for i in range(45)]
+        )
+
+    @patch("m365_reminder_project.api.time.sleep")
+    @patch("m365_reminder_project.api.call_graph_api")
+    def test_call_graph_batch_retries_throttled_items(
+        self, mock_call_graph_api, mock_sleep
+    ):
+        mock_call_graph_api.side_effect = [
+            {
+                "responses": [
+                    {"id": "0", "status": 200, "body": {"value": []}},
+                    {"id": "1", "status": 429, "headers": {"Retry-After": "7"}},
+                ]
+            },
+            {"responses": [{"id": "1", "status": 200, "body": {"value": [1]}}]},
+        ]
+        batch_requests = [
+            {"method": "GET", "url": "/users/a"},
+            {"method": "GET", "url": "/users/b"},
+        ]
+
+        results = call_graph_batch("fake_token", batch_requests)
+
+        # A espera do Retry-After antes da nova rodada; como o sleep é simulado, a
+        # caixa "b" ainda está pausada e o limitador aguarda o restante da pausa
+        self.assertEqual(mock_sleep.call_args_list[0].args, (7,))
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertAlmostEqual(mock_sleep.call_args_list[1].args[0], 7, delta=1)
+        retried = mock_call_graph_api.call_args_list[1].args[3]["requests"]
+        self.assertEqual([item["id"] for item in retried], ["1"])
+        self.assertEqual([r["status"] for r in results], [200, 200])
+        self.assertEqual(results[1]["body"], {"value": [1]})
+
+    @patch("m365_reminder_project.api.call_graph_batch")
+    def test_get_todays_events_batch(self, mock_call_graph_batch):
+        mock_call_graph_batch.return_value = [
+            {"status": 200, "headers": {}, "body": {"value": [{"id": "e1"}]}},
+            {"status": 404, "headers": {}, "body": {"error": {}}},
+        ]
+        events = get_todays_events_batch("fake_token", ["u1", "u2"])
+        self.assertEqual(events, [[{"id": "e1"}], []])
+
+
 class TestM365Utils(unittest.TestCase):
 
     def test_detect_conflicts_no_conflict(self):
@@ -191,7 +519,12 @@ class TestM365Utils(unittest.TestCase):
         from m365_reminder_project.utils import suggest_focus_blocks
 
         focus_blocks = suggest_focus_blocks(
-            events, start_hour=9, end_hour=17, min_block_duration_minutes=60
+            events,
+            start_hour=9,
+            end_hour=17,
+            min_block_duration_minutes=60,
+            day=date(2025, 6, 11),
+            zone=timezone.utc,
         )
         self.assertEqual(len(focus_blocks), 2)
         self.assertEqual(focus_blocks[0][0].hour, 10)
@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+from fake_graph_case import FakeGraphTestCase
+from m365_reminder_project.api import _local_days, get_prefetched_events_batch
+from m365_reminder_project.calendar_cache import get_calendar_cache
+from m365_reminder_project.fake_graph import FakeTenant
+
+
+class TestCalendarPrefetch(FakeGraphTestCase):
+    SETTINGS = ("TIMEZONE_OFFSET", "CALENDAR_CACHE_TTL", "CALENDAR_PREFETCH_DAYS")
+
+    def make_tenant(self):
+        return FakeTenant(users=3, events_per_user=3)
+
+    def setUp(self):
+        super().setUp()
+        Config.TIMEZONE_OFFSET = 0
+        Config.CALENDAR_CACHE_TTL = 3600
+        Config.CALENDAR_PREFETCH_DAYS = 7
+        self.user_ids = ["user-0", "user-1", "user-2"]
+
+    def test_local_day_window_follows_timezone_offset(self):
+        Config.TIMEZONE_OFFSET = -3
+        start, end = _local_days()
+        self.assertEqual((start.hour, start.minute), (3, 0))
+        self.assertEqual(end - start, timedelta(days=1, microseconds=-1))
+        self.assertTrue(start <= datetime.now(timezone.utc) <= end)
+
+    def test_fetches_window_once_and_serves_from_cache(self):
+        first = get_prefetched_events_batch("token", self.user_ids)
+        second = get_prefetched_events_batch("token", self.user_ids)
+
+        self.assertEqual([len(events) for events in first], [3, 3, 3])
+        self.assertEqual(first, second)
+        self.assertEqual(self.tenant.requests["batch"], 1)
+        self.assertEqual(self.tenant.requests["calendar_view"], 3)
+        self.assertEqual(get_calendar_cache().stats["hits"], 3)
+
+    def test_revalidation_downloads_only_changed_events(self):
+        get_prefetched_events_batch("token", self.user_ids)
+        Config.CALENDAR_CACHE_TTL = 0
+
+        unchanged = get_prefetched_events_batch("token", self.user_ids)
+        self.assertEqual(self.tenant.requests["calendar_view"], 6)
+        self.assertNotIn("event", self.tenant.requests)
+
+        self.tenant.revision += 1
+        changed = get_prefetched_events_batch("token", ["user-0"])
+        self.assertEqual(self.tenant.requests["event"], 3)
+        self.assertEqual(
+            [e["changeKey"] for e in changed[0]],
+            [e["changeKey"] for e in self.tenant.events("user-0")],
+        )
+        self.assertNotEqual(changed[0], unchanged[0])
+
+    def test_refetches_when_window_does_not_cover_today(self):
+        get_prefetched_events_batch("token", ["user-0"])
+        get_calendar_cache().store.execute(
+            "UPDATE calendar_windows SET window_end = '2000-01-01T00:00:00'"
+        )
+        get_prefetched_events_batch("token", ["user-0"])
+        self.assertEqual(self.tenant.requests["calendar_view"], 2)
+        self.assertEqual(get_calendar_cache().stats["fetched"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from fake_graph_case import FakeGraphTestCase
+from m365_reminder_project.chat_cache import get_chat_cache
+from m365_reminder_project.fake_graph import FakeTenant
+from m365_reminder_project.notifications import (
+    send_teams_message,
+    send_teams_messages_batch,
+)
+
+
+class TestTeamsChatCache(FakeGraphTestCase):
+
+    def make_tenant(self):
+        return FakeTenant(users=3)
+
+    def setUp(self):
+        super().setUp()
+        self.recipients = [(f"user-{i}", f"Usuário {i}", []) for i in range(3)]
+
+    def test_cache_stores_and_invalidates_chat_ids(self):
+        cache = get_chat_cache()
+        cache.put_many([("user-0", "chat-a"), ("user-1", "chat-b")])
+        cache.invalidate("user-1")
+
+        self.assertEqual(
+            cache.get_many(["user-0", "user-1", "user-2"]), {"user-0": "chat-a"}
+        )
+        self.assertEqual(cache.get_many([]), {})
+
+    def test_cached_chat_sends_a_single_request(self):
+        self.assertTrue(send_teams_message("token", "user-0", "Usuário 0", []))
+        self.assertTrue(send_teams_message("token", "user-0", "Usuário 0", []))
+
+        self.assertEqual(self.tenant.requests["chats"], 1)
+        self.assertEqual(self.tenant.requests["chat_messages"], 2)
+        self.assertEqual(self.tenant.messages, {self.tenant.chats["user-0"]: 2})
+
+    def test_deleted_chat_is_recreated(self):
+        send_teams_message("token", "user-0", "Usuário 0", [])
+        stale_chat = self.tenant.chats["user-0"]
+        self.tenant.deleted_chats.add(stale_chat)
+
+        self.assertTrue(send_teams_message("token", "user-0", "Usuário 0", []))
+        self.assertNotEqual(self.tenant.chats["user-0"], stale_chat)
+        self.assertEqual(
+            get_chat_cache().get_many(["user-0"]),
+            {"user-0": self.tenant.chats["user-0"]},
+        )
+        self.assertEqual(self.tenant.requests["chats"], 2)
+
+    def test_batch_uses_cache_and_retries_deleted_chats(self):
+        self.assertEqual(
+            send_teams_messages_batch("token", self.recipients), [True] * 3
+        )
+        self.assertEqual(self.tenant.requests["chats"], 3)
+
+        self.tenant.deleted_chats.add(self.tenant.chats["user-1"])
+        self.assertEqual(
+            send_teams_messages_batch("token", self.recipients), [True] * 3
+        )
+
+        # Apenas o chat excluído foi criado de novo
+        self.assertEqual(self.tenant.requests["chats"], 4)
+        # 3 + 3 mensagens, mais a tentativa no chat excluído
+        self.assertEqual(self.tenant.requests["chat_messages"], 7)
+        self.assertEqual(sum(self.tenant.messages.values()), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from config import Config
+from m365_reminder_project.delivery_ledger import (
+    EMAIL,
+    ONEDRIVE,
+    DeliveryLedger,
+    ledger_day,
+)
+from m365_reminder_project.state_store import StateStore
+
+
+class TestDeliveryLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = StateStore(os.path.join(self.tmp_dir.name, "state.db"))
+        self.ledger = DeliveryLedger(self.store)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_delivered_channels_per_user(self):
+        self.ledger.record("2025-06-11", EMAIL, [("a", True), ("b", False)])
+        self.ledger.record("2025-06-11", ONEDRIVE, [("a", True)])
+        self.ledger.record("2025-06-10", EMAIL, [("b", True)])
+
+        self.assertEqual(
+            self.ledger.delivered("2025-06-11", ["a", "b", "c"]),
+            {"a": {EMAIL, ONEDRIVE}, "b": set(), "c": set()},
+        )
+
+    def test_confirmed_delivery_is_never_reverted(self):
+        self.ledger.record("2025-06-11", EMAIL, [("a", False)])
+        self.ledger.record("2025-06-11", EMAIL, [("a", True)])
+        self.ledger.record("2025-06-11", EMAIL, [("a", False)])
+
+        self.assertEqual(self.ledger.delivered("2025-06-11", ["a"]), {"a": {EMAIL}})
+        self.assertEqual(
+            self.store.query("SELECT attempts FROM delivery_ledger"), [(3,)]
+        )
+
+    def test_ledger_day_is_the_local_day(self):
+        original = Config.TIMEZONE
+        try:
+            # UTC+14: na maior parte do dia UTC, a data local é outra
+            Config.TIMEZONE = "Pacific/Kiritimati"
+            self.assertEqual(
+                ledger_day(),
+                datetime.now(ZoneInfo("Pacific/Kiritimati")).date().isoformat(),
+            )
+        finally:
+            Config.TIMEZONE = original
+
+    def test_summary_counts_pending(self):
+        self.ledger.record("2025-06-11", EMAIL, [("a", True), ("b", False)])
+        self.assertEqual(
+            self.ledger.summary("2025-06-11"),
+            {EMAIL: {"delivered": 1, "pending": 1}},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from m365_reminder_project.event_cache import EventCache
+
+
+def _event_dict(event_id, ical_uid="uid-1", start="2025-06-11T12:00:00Z"):
+    return {
+        "id": event_id,
+        "iCalUId": ical_uid,
+        "subject": "Planejamento",
+        "start": {"dateTime": start, "timeZone": "UTC"},
+        "end": {"dateTime": "2025-06-11T13:00:00Z", "timeZone": "UTC"},
+    }
+
+
+class TestM365EventCache(unittest.TestCase):
+
+    def test_attendee_copies_share_fields_but_keep_their_ids(self):
+        cache = EventCache()
+        first = cache.intern(_event_dict("copy-of-ana"))
+        second = cache.intern(_event_dict("copy-of-bruno"))
+
+        self.assertEqual((first.id, second.id), ("copy-of-ana", "copy-of-bruno"))
+        self.assertEqual(second.to_dict()["id"], "copy-of-bruno")
+        self.assertIs(first.subject, second.subject)
+        self.assertIs(first.start_datetime, second.start_datetime)
+        self.assertIs(cache.intern(_event_dict("copy-of-ana")).id, first.id)
+        self.assertEqual(
+            cache.stats(),
+            {"lookups": 3, "hits": 2, "unique": 1, "hit_ratio": 2 / 3},
+        )
+
+    def test_occurrences_are_kept_apart(self):
+        cache = EventCache()
+        first = cache.intern(_event_dict("a", start="2025-06-11T12:00:00Z"))
+        second = cache.intern(_event_dict("b", start="2025-06-11T12:30:00Z"))
+        self.assertIsNot(first, second)
+
+    def test_fragments_are_built_once_per_meeting(self):
+        cache = EventCache()
+        calls = []
+
+        def build(event):
+            calls.append(event)
+            return event.subject.upper()
+
+        for event_id in ("a", "b", "c"):
+            event = cache.intern(_event_dict(event_id))
+            self.assertEqual(cache.fragment(event, "subject", build), "PLANEJAMENTO")
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import sqlite3
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from m365_reminder_project.export import AgendaExporter, agenda_record
+from m365_reminder_project.models import Event
+
+
+def _event(event_id, start_hour, end_hour):
+    return Event(
+        event_id,
+        f"Reunião {event_id}",
+        "",
+        datetime(2025, 6, 11, start_hour, 0, tzinfo=timezone.utc),
+        datetime(2025, 6, 11, end_hour, 0, tzinfo=timezone.utc),
+        None,
+        None,
+        [],
+        False,
+    )
+
+
+def _read_jsonl(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestAgendaExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_record_contains_events_and_analysis(self):
+        first, second = _event("a", 12, 14), _event("b", 13, 15)
+        block = (datetime(2025, 6, 11, 15, 0), datetime(2025, 6, 11, 17, 0))
+
+        record = agenda_record(
+            "2025-06-11",
+            "user-0",
+            "Usuário 0",
+            None,
+            [first, second],
+            [(first, second)],
+            [[first, second]],
+            [block],
+        )
+
+        self.assertEqual(record["events"], [first.to_dict(), second.to_dict()])
+        self.assertEqual(record["conflicts"], [["a", "b"]])
+        self.assertEqual(record["conflict_clusters"], [["a", "b"]])
+        self.assertEqual(
+            record["focus_blocks"], [["2025-06-11T15:00:00", "2025-06-11T17:00:00"]]
+        )
+        self.assertIsNone(record["time_zone"])
+
+    def test_streams_to_gzip_with_a_bounded_queue(self):
+        path = os.path.join(self.tmp_dir.name, "agenda-{day}.jsonl.gz")
+        exporter = AgendaExporter(path, queue_size=1, batch_size=8)
+        for i in range(500):
+            exporter.record({"day": "2025-06-11", "user_id": f"user-{i}"})
+        exporter.close()
+
+        records = _read_jsonl(path.format(day="2025-06-11"))
+        self.assertEqual(
+            [r["user_id"] for r in records], [f"user-{i}" for i in range(500)]
+        )
+        self.assertEqual(exporter.exported, 500)
+
+    def test_appends_and_splits_files_by_day(self):
+        path = os.path.join(self.tmp_dir.name, "agenda-{day}.jsonl")
+        for day in ("2025-06-11", "2025-06-11", "2025-06-12"):
+            exporter = AgendaExporter(path)
+            exporter.record({"day": day, "user_id": "user-0"})
+            exporter.close()
+
+        self.assertEqual(len(_read_jsonl(path.format(day="2025-06-11"))), 2)
+        self.assertEqual(len(_read_jsonl(path.format(day="2025-06-12"))), 1)
+
+    @patch("m365_reminder_project.export.log_action")
+    def test_ledger_errors_do_not_stop_the_writer(self, mock_log_action):
+        path = os.path.join(self.tmp_dir.name, "agenda-{day}.jsonl")
+        ledger = MagicMock()
+        ledger.record.side_effect = sqlite3.OperationalError("database is locked")
+        exporter = AgendaExporter(path, queue_size=1, batch_size=1, ledger=ledger)
+        for i in range(5):
+            exporter.record({"day": "2025-06-11", "user_id": f"user-{i}"})
+        exporter.close(timeout=5)
+
+        self.assertFalse(exporter._thread.is_alive())
+        self.assertEqual(len(_read_jsonl(path.format(day="2025-06-11"))), 5)
+        self.assertEqual(exporter.exported, 5)
+        self.assertEqual(ledger.record.call_count, 5)
+        self.assertTrue(mock_log_action.called)
+
+    @patch("m365_reminder_project.export.log_action")
+    def test_close_gives_up_after_the_timeout(self, mock_log_action):
+        path = os.path.join(self.tmp_dir.name, "agenda-{day}.jsonl")
+        ledger = MagicMock()
+        exporter = AgendaExporter(path, ledger=ledger)
+        released = threading.Event()
+        ledger.record.side_effect = lambda *args: released.wait(5)
+        exporter.record({"day": "2025-06-11", "user_id": "user-0"})
+
+        exporter.close(timeout=0.1)
+
+        self.assertTrue(exporter._thread.is_alive())
+        mock_log_action.assert_called_once()
+        released.set()
+        exporter._thread.join(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
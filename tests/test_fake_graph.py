@@ -0,0 +1,161 @@
+import gzip
+import json
+import unittest
+
+import main as reminder_main
+from config import Config
+from fake_graph_case import FakeGraphTestCase
+from m365_reminder_project.api import call_graph_api
+from m365_reminder_project.fake_graph import FakeGraphServer, FakeTenant
+
+
+# Executa main.main() de ponta a ponta contra o Graph simulado
+class TestM365EndToEnd(FakeGraphTestCase):
+    SETTINGS = (
+        "MAX_WORKERS",
+        "GRAPH_BATCH_SIZE",
+        "USERS_PAGE_SIZE",
+        "TEAMS_ENABLED",
+        "USER_TIMEZONES",
+        "EXPORT_FILE",
+    )
+
+    def _run(self, tenant, workers=1, batch_size=1, resume=False):
+        with FakeGraphServer(tenant) as server:
+            self.use_server(server)
+            Config.MAX_WORKERS = workers
+            Config.GRAPH_BATCH_SIZE = batch_size
+            Config.USERS_PAGE_SIZE = 10
+            self.reset_state()
+            reminder_main.main(resume=resume)
+
+    def test_serial_run_reaches_every_user(self):
+        tenant = FakeTenant(users=25)
+        self._run(tenant)
+
+        self.assertEqual(tenant.requests["token"], 1)
+        self.assertEqual(tenant.requests["users"], 3)
+        self.assertEqual(tenant.requests["events"], 25)
+        self.assertEqual(tenant.requests["sendmail"], 25)
+        self.assertEqual(tenant.requests["drive"], 25)
+
+    def test_batched_parallel_run(self):
+        tenant = FakeTenant(users=30)
+        self._run(tenant, workers=4, batch_size=10)
+
+        # Por grupo: 1 $batch de eventos e 3 de e-mails (até 4 por caixa de correio)
+        self.assertEqual(tenant.requests["batch"], 12)
+        self.assertEqual(tenant.requests["sendmail"], 30)
+        self.assertEqual(tenant.requests["drive"], 30)
+
+    def test_batched_emails_respect_the_mailbox_limit(self):
+        # O Graph simulado responde 429 ao 5º item da mesma caixa em um $batch
+        tenant = FakeTenant(users=20, retry_after=0)
+        self._run(tenant, batch_size=20)
+
+        self.assertEqual(tenant.throttled, 0)
+        self.assertEqual(tenant.requests["sendmail"], 20)
+        # 1 $batch de eventos e 5 de e-mails
+        self.assertEqual(tenant.requests["batch"], 6)
+
+        with FakeGraphServer(tenant) as server:
+            self.use_server(server)
+            responses = call_graph_api(
+                "token",
+                "/$batch",
+                "POST",
+                {
+                    "requests": [
+                        {
+                            "id": str(i),
+                            "method": "GET",
+                            "url": "/users/user-0/mailboxSettings/timeZone",
+                        }
+                        for i in range(6)
+                    ]
+                },
+            )["responses"]
+        self.assertEqual([r["status"] for r in responses], [200] * 4 + [429] * 2)
+
+    def test_rerun_skips_unchanged_onedrive_files(self):
+        tenant = FakeTenant(users=10)
+        self._run(tenant)
+        self._run(tenant)
+
+        self.assertEqual(tenant.requests["sendmail"], 20)
+        self.assertEqual(tenant.requests["drive"], 10)
+
+    def test_resume_does_not_resend_delivered_reminders(self):
+        tenant = FakeTenant(users=10)
+        self._run(tenant, workers=2, batch_size=5)
+        self._run(tenant, workers=2, batch_size=5, resume=True)
+
+        self.assertEqual(tenant.requests["sendmail"], 10)
+        self.assertEqual(tenant.requests["drive"], 10)
+        self.assertEqual(tenant.requests["users"], 2)
+
+    def test_teams_messages_reuse_cached_chats(self):
+        Config.TEAMS_ENABLED = True
+        tenant = FakeTenant(users=10)
+        self._run(tenant, workers=2, batch_size=5)
+        self._run(tenant, workers=2, batch_size=5)
+
+        self.assertEqual(tenant.requests["chats"], 10)
+        self.assertEqual(tenant.requests["chat_messages"], 20)
+
+        self._run(tenant, workers=2, batch_size=5, resume=True)
+        self.assertEqual(tenant.requests["chat_messages"], 20)
+
+    def test_user_timezones_are_fetched_once(self):
+        Config.USER_TIMEZONES = True
+        tenant = FakeTenant(users=10)
+        tenant.time_zones = {"user-3": "Tokyo Standard Time"}
+        self._run(tenant, workers=2, batch_size=5)
+        self._run(tenant, workers=2, batch_size=5)
+
+        # Os fusos da segunda execução vêm do cache persistente
+        self.assertEqual(tenant.requests["time_zone"], 10)
+        self.assertEqual(tenant.requests["sendmail"], 20)
+
+    def test_agenda_is_exported_without_extra_graph_calls(self):
+        Config.EXPORT_FILE = self.tmp_path("agenda.jsonl.gz")
+        tenant = FakeTenant(users=10, events_per_user=3)
+        self._run(tenant, workers=2, batch_size=5)
+
+        with gzip.open(Config.EXPORT_FILE, "rt", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(
+            sorted(r["user_id"] for r in records),
+            sorted(f"user-{i}" for i in range(10)),
+        )
+        self.assertTrue(all(len(r["events"]) == 3 for r in records))
+        self.assertTrue(all("focus_blocks" in r for r in records))
+        # Apenas as chamadas da execução: eventos (1 $batch) e e-mails (2, com até 4
+        # por caixa de correio) de 2 grupos
+        self.assertEqual(tenant.requests["batch"], 6)
+
+    def test_agenda_is_exported_once_per_user_and_day(self):
+        Config.EXPORT_FILE = self.tmp_path("agenda.jsonl")
+        tenant = FakeTenant(users=10, events_per_user=3)
+        self._run(tenant, workers=2, batch_size=5)
+        self._run(tenant, workers=2, batch_size=5)
+        self._run(tenant, workers=2, batch_size=5, resume=True)
+
+        with open(Config.EXPORT_FILE, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(
+            sorted(r["user_id"] for r in records),
+            sorted(f"user-{i}" for i in range(10)),
+        )
+        # Reuniões compartilhadas mantêm o id do evento na agenda de cada usuário
+        for record in records:
+            self.assertTrue(
+                all(
+                    e["id"].startswith(f"{record['user_id']}-")
+                    for e in record["events"]
+                )
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import random
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from m365_reminder_project.freebusy import FreeBusyGrid
+from m365_reminder_project.models import Event
+from m365_reminder_project.utils import suggest_focus_blocks
+from config import Config
+
+DAY = date(2025, 6, 11)
+LOCAL = timezone(timedelta(hours=-3))
+
+
+def _event(start, end):
+    return Event("1", "Reunião", None, start, end, None, None, [], False)
+
+
+def _local(hour, minute=0, days=0):
+    return datetime(2025, 6, 11, hour, minute) + timedelta(days=days)
+
+
+# Horário local (UTC-3) com timezone, para os eventos
+def _at(hour, minute=0):
+    return _local(hour, minute).replace(tzinfo=LOCAL)
+
+
+class TestM365FreeBusy(unittest.TestCase):
+
+    def setUp(self):
+        self.original_offset = Config.TIMEZONE_OFFSET
+        Config.TIMEZONE_OFFSET = -3
+
+    def tearDown(self):
+        Config.TIMEZONE_OFFSET = self.original_offset
+
+    def test_focus_blocks_match_single_user_version(self):
+        rng = random.Random(7)
+        events_by_user = {}
+        for user in range(30):
+            events = []
+            for _ in range(rng.randint(0, 6)):
+                start = _local(7) + timedelta(minutes=rng.randrange(0, 12 * 60, 15))
+                duration = timedelta(minutes=rng.choice((30, 60, 90)))
+                events.append(_event(start, start + duration))
+            events_by_user[f"user{user}"] = events
+
+        grid = FreeBusyGrid.from_events(events_by_user, day=DAY)
+        blocks = grid.focus_blocks(min_block_minutes=60)
+        for user_id, events in events_by_user.items():
+            self.assertEqual(
+                blocks[user_id],
+                suggest_focus_blocks(events, min_block_duration_minutes=60, day=DAY),
+            )
+
+    def test_multi_day_event_blocks_whole_day(self):
+        # Evento em UTC que começa no dia anterior e termina no seguinte
+        event = _event(
+            datetime(2025, 6, 10, 12, 0, tzinfo=timezone.utc),
+            datetime(2025, 6, 12, 12, 0, tzinfo=timezone.utc),
+        )
+        self.assertEqual(suggest_focus_blocks([event], day=DAY), [])
+        grid = FreeBusyGrid.from_events({"a": [event]}, day=DAY)
+        self.assertEqual(grid.focus_blocks()["a"], [])
+        self.assertEqual(grid.utilization()["a"]["utilization"], 1.0)
+
+    def test_utc_events_are_shifted_to_local_time(self):
+        # 12:00-13:00 UTC corresponde a 09:00-10:00 no horário local (UTC-3)
+        event = _event(
+            datetime(2025, 6, 11, 12, 0, tzinfo=timezone.utc),
+            datetime(2025, 6, 11, 13, 0, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            suggest_focus_blocks([event], day=DAY), [(_local(10), _local(17))]
+        )
+
+    def test_naive_graph_times_are_utc(self):
+        # O Graph devolve horários sem timezone, em UTC
+        event = Event.from_dict(
+            {
+                "id": "1",
+                "subject": "Reunião",
+                "start": {"dateTime": "2025-06-11T13:00:00.0000000", "timeZone": "UTC"},
+                "end": {"dateTime": "2025-06-11T14:30:00.0000000", "timeZone": "UTC"},
+            }
+        )
+        expected = [(_local(9), _local(10)), (_local(11, 30), _local(17))]
+
+        self.assertEqual(
+            suggest_focus_blocks([event], min_block_duration_minutes=30, day=DAY),
+            expected,
+        )
+        grid = FreeBusyGrid.from_events({"a": [event]}, day=DAY)
+        self.assertEqual(grid.focus_blocks(min_block_minutes=30)["a"], expected)
+
+    def test_each_user_gets_the_day_of_their_zone(self):
+        # UTC+14 e UTC-11: as datas locais são sempre diferentes
+        zones = {
+            "kiritimati": ZoneInfo("Pacific/Kiritimati"),
+            "pago-pago": ZoneInfo("Pacific/Pago_Pago"),
+        }
+        events_by_user = {}
+        for user_id, zone in zones.items():
+            today = datetime.now(zone).date()
+            start = datetime.combine(today, datetime.min.time(), tzinfo=zone)
+            events_by_user[user_id] = [
+                _event(start + timedelta(hours=10), start + timedelta(hours=11))
+            ]
+
+        blocks = FreeBusyGrid.from_events(events_by_user, zones=zones).focus_blocks()
+        for user_id, zone in zones.items():
+            expected = suggest_focus_blocks(events_by_user[user_id], zone=zone)
+            self.assertEqual(blocks[user_id], expected)
+            self.assertEqual(expected[0][0].date(), datetime.now(zone).date())
+
+    def test_common_free_slots_and_utilization(self):
+        grid = FreeBusyGrid.from_events(
+            {
+                "a": [_event(_at(9), _at(12))],
+                "b": [_event(_at(13), _at(15, 30))],
+            },
+            day=DAY,
+        )
+        self.assertEqual(
+            grid.common_free_slots(["a", "b"], min_block_minutes=30),
+            [(_local(12), _local(13)), (_local(15, 30), _local(17))],
+        )
+        self.assertEqual(
+            grid.utilization()["b"], {"busy_minutes": 150, "utilization": 150 / 480}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
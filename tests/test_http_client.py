@@ -0,0 +1,56 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from m365_reminder_project.http_client import (
+    close_session,
+    connection_stats,
+    get_session,
+    REQUEST_TIMEOUT,
+)
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"value": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestM365HttpClient(unittest.TestCase):
+
+    def setUp(self):
+        close_session()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        close_session()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_is_shared(self):
+        self.assertIs(get_session(), get_session())
+
+    def test_connections_are_reused(self):
+        url = f"http://127.0.0.1:{self.server.server_port}/users"
+        for _ in range(5):
+            response = get_session().get(url, timeout=REQUEST_TIMEOUT)
+            self.assertEqual(response.json(), {"value": []})
+
+        stats = connection_stats()
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["reused"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from m365_reminder_project.log_writer import LogWriter
+
+
+class TestM365LogWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "reminder.log")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read_lines(self, path=None):
+        with open(path or self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_writes_json_lines_with_fields(self):
+        writer = LogWriter(self.path, file_format="json", console=False)
+        writer.log("Processando usuário", user_id="u1", latency_ms=12.5)
+        writer.log("Falha", success=False)
+        writer.close()
+
+        first, second = self._read_lines()
+        self.assertEqual(first["message"], "Processando usuário")
+        self.assertEqual(first["user_id"], "u1")
+        self.assertEqual(first["latency_ms"], 12.5)
+        self.assertEqual(first["level"], "INFO")
+        self.assertEqual(first["run_id"], writer.run_id)
+        self.assertEqual(second["level"], "ERROR")
+        self.assertFalse(second["success"])
+
+    def test_text_format_and_level_filter(self):
+        writer = LogWriter(self.path, file_format="text", level="INFO", console=False)
+        writer.log("detalhe", level="DEBUG")
+        writer.log("ok")
+        writer.close()
+
+        with open(self.path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith("[SUCESSO] ok"))
+
+    def test_rotates_when_file_exceeds_max_bytes(self):
+        writer = LogWriter(
+            self.path,
+            file_format="json",
+            console=False,
+            max_bytes=200,
+            backup_count=2,
+            batch_size=1,
+        )
+        for i in range(10):
+            writer.log(f"mensagem {i}")
+            writer.flush()
+        writer.close()
+
+        self.assertTrue(os.path.exists(f"{self.path}.1"))
+        self.assertTrue(os.path.exists(f"{self.path}.2"))
+        self.assertFalse(os.path.exists(f"{self.path}.3"))
+        self.assertEqual(self._read_lines()[-1]["message"], "mensagem 9")
+
+    def test_drop_overflow_counts_discarded_records(self):
+        writer = LogWriter(self.path, console=False, queue_size=1, overflow="drop")
+        release = threading.Event()
+        writing = threading.Event()
+
+        def slow_write(records):
+            writing.set()
+            release.wait(5)
+
+        with patch.object(writer, "_write", side_effect=slow_write):
+            writer.log("em gravação")
+            writing.wait(5)
+            writer.log("na fila")
+            writer.log("descartado")
+            self.assertEqual(writer.dropped, 1)
+            release.set()
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from m365_reminder_project.api import call_graph_api
+from m365_reminder_project.metrics import (
+    Metrics,
+    endpoint_class,
+    get_metrics,
+    merge_snapshots,
+    percentile,
+    reset_metrics,
+)
+
+
+class TestM365Metrics(unittest.TestCase):
+
+    def setUp(self):
+        reset_metrics()
+
+    def tearDown(self):
+        reset_metrics()
+
+    def test_endpoint_class(self):
+        self.assertEqual(endpoint_class("/users?$top=100"), "users")
+        self.assertEqual(endpoint_class("/users/u1/calendar/events?$top=1"), "calendar")
+        self.assertEqual(endpoint_class("/users/admin@x.com/sendMail"), "sendmail")
+        self.assertEqual(
+            endpoint_class("https://graph.microsoft.com/v1.0/users/u1/drive/root"),
+            "onedrive",
+        )
+        self.assertEqual(endpoint_class("/users/delta?$select=id"), "delta")
+        self.assertEqual(endpoint_class("/$batch"), "batch")
+        self.assertEqual(endpoint_class("/chats"), "teams")
+
+    def test_percentiles(self):
+        samples = [i / 100 for i in range(1, 101)]
+        self.assertEqual(percentile(samples, 0.50), 0.5)
+        self.assertEqual(percentile(samples, 0.95), 0.95)
+        self.assertEqual(percentile(samples, 0.99), 0.99)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_merge_snapshots(self):
+        first, second = Metrics(), Metrics()
+        first.record("calendar", 0.02, status=200, bytes_received=100)
+        second.record("calendar", 0.3, status=200)
+        second.record("calendar", 0.004, status=429)
+        second.record_retry("calendar")
+
+        merged = merge_snapshots([first.snapshot(), second.snapshot()])["calendar"]
+
+        self.assertEqual(merged["count"], 3)
+        self.assertEqual(merged["statuses"], {"200": 2, "429": 1})
+        self.assertEqual(merged["retries"], 1)
+        self.assertEqual(merged["bytes_received"], 100)
+        # Percentis estimados pelo limite superior do bucket
+        self.assertEqual(merged["p50"], 0.025)
+        self.assertEqual(merged["p99"], 0.5)
+
+    def test_summary_and_export(self):
+        metrics = Metrics()
+        metrics.record("calendar", 0.02, status=200, bytes_received=100)
+        metrics.record("calendar", 0.3, status=429)
+        metrics.record_retry("calendar")
+        metrics.record("render_email", 0.001)
+
+        summary = metrics.summary()
+        self.assertEqual(summary["calendar"]["calls"], 2)
+        self.assertEqual(summary["calendar"]["retries"], 1)
+        self.assertEqual(summary["calendar"]["statuses"], {200: 1, 429: 1})
+        self.assertEqual(summary["calendar"]["bytes_received"], 100)
+
+        text = metrics.export_text()
+        self.assertIn(
+            'm365_reminder_call_duration_seconds_bucket{operation="calendar",le="0.025"} 1',
+            text,
+        )
+        self.assertIn(
+            'm365_reminder_calls_total{operation="calendar",status="429"} 1', text
+        )
+        self.assertIn(
+            'm365_reminder_calls_total{operation="render_email",status="none"} 1', text
+        )
+        self.assertIn("# TYPE m365_reminder_retries_total counter", text)
+
+        openmetrics = metrics.export_text(openmetrics=True)
+        self.assertIn("# TYPE m365_reminder_retries counter", openmetrics)
+        self.assertTrue(openmetrics.endswith("# EOF\n"))
+
+    @patch("requests.Session.get")
+    def test_call_graph_api_is_instrumented(self, mock_get):
+        response = MagicMock(status_code=200, headers={}, text='{"value": []}')
+        response.content = b'{"value": []}'
+        response.json.return_value = {"value": []}
+        mock_get.return_value = response
+
+        call_graph_api("fake_token", "/users/u1/calendar/events")
+
+        stats = get_metrics().summary()["calendar"]
+        self.assertEqual(stats["calls"], 1)
+        self.assertEqual(stats["statuses"], {200: 1})
+        self.assertEqual(stats["bytes_received"], len(b'{"value": []}'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from m365_reminder_project.models import Event, User
+
+
+def _event_dict(event_id):
+    return {
+        "id": event_id,
+        "subject": "Planejamento",
+        "start": {"dateTime": "2025-06-11T12:00:00Z", "timeZone": "UTC"},
+        "end": {"dateTime": "2025-06-11T13:00:00Z", "timeZone": "UTC"},
+        "location": {"displayName": "Sala 1"},
+        "organizer": {"emailAddress": {"name": "Ana", "address": "ana@example.com"}},
+        "attendees": [
+            {
+                "type": "required",
+                "status": {"response": "accepted"},
+                "emailAddress": {"name": "Bruno", "address": "bruno@example.com"},
+            }
+        ],
+    }
+
+
+class TestM365Models(unittest.TestCase):
+
+    def test_models_have_no_instance_dict(self):
+        event = Event.from_dict(_event_dict("event1"))
+        self.assertFalse(hasattr(event, "__dict__"))
+        self.assertFalse(hasattr(User("1", "Ana", "ana@example.com"), "__dict__"))
+
+    def test_attendees_keep_graph_shape(self):
+        event = Event.from_dict(_event_dict("event1"))
+        self.assertEqual(event.attendee_count, 1)
+        self.assertEqual(event.attendees, _event_dict("event1")["attendees"])
+        self.assertEqual(event.organizer, {"name": "Ana", "address": "ana@example.com"})
+        self.assertEqual(event.to_dict()["location"], {"displayName": "Sala 1"})
+
+    def test_attendees_are_shared_between_events(self):
+        first = Event.from_dict(_event_dict("event1"))
+        second = Event.from_dict(_event_dict("event2"))
+        self.assertIs(first._attendees[0], second._attendees[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from config import Config
+from fake_graph_case import FakeGraphTestCase
+from m365_reminder_project import onedrive
+from m365_reminder_project.api import call_graph_api
+from m365_reminder_project.fake_graph import FakeTenant
+from m365_reminder_project.http_client import get_session
+
+CHUNK = onedrive.UPLOAD_CHUNK_ALIGNMENT
+
+
+class TestOneDriveUpload(FakeGraphTestCase):
+    SETTINGS = (
+        "ONEDRIVE_SKIP_UNCHANGED",
+        "ONEDRIVE_SIMPLE_UPLOAD_LIMIT",
+        "ONEDRIVE_CHUNK_SIZE",
+    )
+
+    def make_tenant(self):
+        return FakeTenant(users=1)
+
+    def setUp(self):
+        super().setUp()
+        Config.ONEDRIVE_SKIP_UNCHANGED = True
+        Config.ONEDRIVE_SIMPLE_UPLOAD_LIMIT = 1024
+        Config.ONEDRIVE_CHUNK_SIZE = CHUNK
+
+    def test_skips_unchanged_content(self):
+        first = onedrive.upload_file("token", "user-0", "agenda.txt", b"reuniao")
+        second = onedrive.upload_file("token", "user-0", "agenda.txt", b"reuniao")
+        changed = onedrive.upload_file("token", "user-0", "agenda.txt", b"outra")
+
+        self.assertEqual(
+            (first, second, changed), ("uploaded", "unchanged", "uploaded")
+        )
+        self.assertEqual(self.tenant.requests["drive"], 2)
+        self.assertEqual(self.tenant.files[("user-0", "agenda.txt")], b"outra")
+
+    def test_skip_can_be_disabled(self):
+        Config.ONEDRIVE_SKIP_UNCHANGED = False
+        onedrive.upload_file("token", "user-0", "agenda.txt", b"reuniao")
+        outcome = onedrive.upload_file("token", "user-0", "agenda.txt", b"reuniao")
+
+        self.assertEqual(outcome, "uploaded")
+        self.assertEqual(self.tenant.requests["drive"], 2)
+
+    def test_large_file_uses_chunked_session(self):
+        content = os.urandom(2 * CHUNK + 1000)
+        outcome = onedrive.upload_file("token", "user-0", "grande.bin", content)
+
+        self.assertEqual(outcome, "uploaded")
+        self.assertEqual(self.tenant.requests["upload_session"], 1)
+        self.assertEqual(self.tenant.requests["upload_chunk"], 3)
+        self.assertNotIn("drive", self.tenant.requests)
+        self.assertEqual(self.tenant.files[("user-0", "grande.bin")], content)
+        self.assertEqual(self.tenant.upload_sessions, {})
+
+    def test_restarts_when_the_session_expects_the_first_byte_again(self):
+        content = os.urandom(2 * CHUNK + 1000)
+        send = onedrive._send_upload_request
+        restarted = []
+
+        # O Graph descarta o primeiro bloco e volta a esperar o byte 0
+        def lose_first_chunk(method, url, **kwargs):
+            response = send(method, url, **kwargs)
+            if method == "PUT" and not restarted:
+                restarted.append(url)
+                for session in self.tenant.upload_sessions.values():
+                    session["data"] = bytearray()
+                response = MagicMock(status_code=202, text="{}")
+                response.json.return_value = {
+                    "nextExpectedRanges": [f"0-{len(content) - 1}"]
+                }
+            return response
+
+        with patch.object(onedrive, "_send_upload_request", lose_first_chunk):
+            outcome = onedrive.upload_file("token", "user-0", "grande.bin", content)
+
+        self.assertEqual(outcome, "uploaded")
+        self.assertEqual(self.tenant.requests["upload_chunk"], 4)
+        self.assertEqual(self.tenant.files[("user-0", "grande.bin")], content)
+
+    def test_resumes_interrupted_session(self):
+        content = os.urandom(2 * CHUNK + 1000)
+        # Simula uma execução interrompida depois do primeiro bloco
+        session = call_graph_api(
+            "token", "/users/user-0/drive/root:/grande.bin:/createUploadSession", "POST"
+        )
+        get_session().put(
+            session["uploadUrl"],
+            headers={"Content-Range": f"bytes 0-{CHUNK - 1}/{len(content)}"},
+            data=content[:CHUNK],
+        ).raise_for_status()
+        onedrive.get_upload_manifest().put(
+            "user-0",
+            "grande.bin",
+            hashlib.sha256(content).hexdigest(),
+            len(content),
+            upload_url=session["uploadUrl"],
+        )
+
+        outcome = onedrive.upload_file("token", "user-0", "grande.bin", content)
+
+        self.assertEqual(outcome, "uploaded")
+        self.assertEqual(self.tenant.requests["upload_session"], 1)
+        self.assertEqual(self.tenant.requests["upload_chunk"], 3)
+        self.assertEqual(self.tenant.files[("user-0", "grande.bin")], content)
+        # Concluído, o mesmo conteúdo não é enviado de novo
+        self.assertEqual(
+            onedrive.upload_file("token", "user-0", "grande.bin", content),
+            "unchanged",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
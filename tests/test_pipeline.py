@@ -0,0 +1,180 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from config import Config
+from m365_reminder_project.pipeline import map_ordered, prefetch, run_pipeline
+from m365_reminder_project.state_store import close_state_store
+
+
+class TestM365Pipeline(unittest.TestCase):
+
+    def setUp(self):
+        # Livro de entregas isolado em um banco temporário
+        self.original_db = Config.STATE_DB_FILE
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        Config.STATE_DB_FILE = os.path.join(self.tmp_dir.name, "state.db")
+        close_state_store()
+
+    def tearDown(self):
+        close_state_store()
+        Config.STATE_DB_FILE = self.original_db
+        self.tmp_dir.cleanup()
+
+    def test_map_ordered_preserves_input_order(self):
+        def slow_square(x):
+            # Itens iniciais demoram mais para forçar a conclusão fora de ordem
+            time.sleep(0.01 * (10 - x))
+            return x * x
+
+        results = list(map_ordered(slow_square, range(10), max_workers=4))
+        self.assertEqual(results, [x * x for x in range(10)])
+
+    def test_map_ordered_runs_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def wait_for_peers(x):
+            barrier.wait()
+            return x
+
+        results = list(map_ordered(wait_for_peers, range(3), max_workers=3))
+        self.assertEqual(results, [0, 1, 2])
+
+    def test_prefetch_yields_items_in_order(self):
+        self.assertEqual(
+            list(prefetch(iter(range(50)), buffer_size=4)), list(range(50))
+        )
+
+    def test_prefetch_reraises_producer_errors(self):
+        def pages():
+            yield 1
+            raise RuntimeError("falha na página 2")
+
+        items = prefetch(pages(), buffer_size=2)
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(RuntimeError):
+            next(items)
+
+    @patch("m365_reminder_project.pipeline.send_admin_notification")
+    @patch("m365_reminder_project.pipeline.create_onedrive_file")
+    @patch("m365_reminder_project.pipeline.send_email_reminder")
+    @patch("m365_reminder_project.pipeline.get_todays_events")
+    def test_run_pipeline_concurrent_matches_serial(
+        self, mock_events, mock_email, mock_onedrive, mock_admin
+    ):
+        users = [
+            {"id": str(i), "displayName": f"User {i}", "mail": f"u{i}@x.com"}
+            for i in range(8)
+        ]
+        users.append({"id": "8", "displayName": "Sem Email"})
+        mock_events.return_value = []
+        # Falha o e-mail para usuários ímpares
+        mock_email.side_effect = lambda token, email, name, events, zone=None: (
+            int(name.split()[1]) % 2 == 0
+        )
+        mock_onedrive.return_value = True
+
+        serial = run_pipeline("fake_token", users, max_workers=1)
+        serial_notifications = [c.args[0] for c in mock_admin.call_args_list]
+        mock_admin.reset_mock()
+
+        concurrent = run_pipeline("fake_token", users, max_workers=4)
+        concurrent_notifications = [c.args[0] for c in mock_admin.call_args_list]
+
+        self.assertEqual(serial, concurrent)
+        self.assertEqual(
+            serial, {"processed": 8, "succeeded": 4, "failed": 4, "skipped": 1}
+        )
+        self.assertEqual(serial_notifications, concurrent_notifications)
+        self.assertEqual(
+            concurrent_notifications,
+            [f"Falha no Envio de Lembretes para User {i}" for i in (1, 3, 5, 7)],
+        )
+
+    @patch("m365_reminder_project.pipeline.send_admin_notification")
+    @patch("m365_reminder_project.pipeline.create_onedrive_file")
+    @patch("m365_reminder_project.pipeline.send_email_reminders_batch")
+    @patch("m365_reminder_project.pipeline.get_todays_events_batch")
+    def test_run_pipeline_uses_batch_for_groups(
+        self, mock_events_batch, mock_email_batch, mock_onedrive, mock_admin
+    ):
+        users = [
+            {"id": str(i), "displayName": f"User {i}", "mail": f"u{i}@x.com"}
+            for i in range(4)
+        ]
+        mock_events_batch.side_effect = lambda token, user_ids, zones=None: [
+            [] for _ in user_ids
+        ]
+        mock_email_batch.side_effect = lambda token, recipients, zones=None: [
+            True for _ in recipients
+        ]
+        mock_onedrive.return_value = True
+
+        summary = run_pipeline("fake_token", users, max_workers=2, batch_size=2)
+
+        self.assertEqual(
+            summary, {"processed": 4, "succeeded": 4, "failed": 0, "skipped": 0}
+        )
+        self.assertEqual(
+            [c.args[1] for c in mock_events_batch.call_args_list],
+            [["0", "1"], ["2", "3"]],
+        )
+        mock_admin.assert_not_called()
+
+    @patch("m365_reminder_project.pipeline.send_admin_notification")
+    @patch("m365_reminder_project.pipeline.create_onedrive_file")
+    @patch("m365_reminder_project.pipeline.send_email_reminders_batch")
+    @patch("m365_reminder_project.pipeline.get_todays_events_batch")
+    def test_resume_sends_only_pending_channels(
+        self, mock_events_batch, mock_email_batch, mock_onedrive, mock_admin
+    ):
+        users = [
+            {"id": str(i), "displayName": f"User {i}", "mail": f"u{i}@x.com"}
+            for i in range(4)
+        ]
+        mock_events_batch.side_effect = lambda token, user_ids, zones=None: [
+            [] for _ in user_ids
+        ]
+        # Primeira execução: o e-mail falha para os usuários ímpares
+        mock_email_batch.side_effect = lambda token, recipients, zones=None: [
+            int(name.split()[1]) % 2 == 0 for _, name, _ in recipients
+        ]
+        mock_onedrive.return_value = True
+        first = run_pipeline("fake_token", users, max_workers=1, batch_size=4)
+        self.assertEqual(first["failed"], 2)
+
+        mock_email_batch.reset_mock()
+        mock_onedrive.reset_mock()
+        mock_email_batch.side_effect = lambda token, recipients, zones=None: [
+            True for _ in recipients
+        ]
+        resumed = run_pipeline(
+            "fake_token", users, max_workers=1, batch_size=4, resume=True
+        )
+
+        self.assertEqual(
+            resumed, {"processed": 2, "succeeded": 2, "failed": 0, "skipped": 2}
+        )
+        recipients = mock_email_batch.call_args.args[1]
+        self.assertEqual(
+            [email for email, _, _ in recipients], ["u1@x.com", "u3@x.com"]
+        )
+        mock_onedrive.assert_not_called()
+        self.assertEqual(
+            [c.args[1] for c in mock_events_batch.call_args_list[-1:]], [["1", "3"]]
+        )
+
+        # Tudo entregue: uma nova retomada não envia nada
+        mock_email_batch.reset_mock()
+        again = run_pipeline(
+            "fake_token", users, max_workers=1, batch_size=4, resume=True
+        )
+        self.assertEqual(again["skipped"], 4)
+        mock_email_batch.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
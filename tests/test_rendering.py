@@ -0,0 +1,65 @@
+import unittest
+from datetime import datetime, timezone
+
+from m365_reminder_project.models import Event
+from m365_reminder_project.notifications import (
+    generate_email_html,
+    generate_teams_message,
+)
+from m365_reminder_project.rendering import (
+    EMAIL_TEMPLATE,
+    format_event_time,
+    get_template,
+    render_email_html_bulk,
+)
+from config import Config
+
+
+def _event(is_all_day=False):
+    return Event(
+        "event1",
+        "Planejamento",
+        "Pauta",
+        datetime(2025, 6, 11, 12, 0, tzinfo=timezone.utc),
+        datetime(2025, 6, 11, 13, 30, tzinfo=timezone.utc),
+        None,
+        None,
+        [],
+        is_all_day,
+    )
+
+
+class TestM365Rendering(unittest.TestCase):
+
+    def setUp(self):
+        self.original_offset = Config.TIMEZONE_OFFSET
+        Config.TIMEZONE_OFFSET = -3
+
+    def tearDown(self):
+        Config.TIMEZONE_OFFSET = self.original_offset
+
+    def test_template_is_compiled_once(self):
+        self.assertIs(get_template(EMAIL_TEMPLATE), get_template(EMAIL_TEMPLATE))
+
+    def test_format_event_time_applies_offset(self):
+        self.assertEqual(format_event_time(_event()), "09:00 - 10:30")
+        self.assertEqual(format_event_time(_event(is_all_day=True)), "Dia inteiro")
+
+    def test_bulk_render_matches_single_render(self):
+        users = [("Ana Souza", [_event()]), ("Bruno Lima", [])]
+        bulk = render_email_html_bulk(users)
+
+        self.assertEqual(len(bulk), 2)
+        self.assertIn("09:00 - 10:30", bulk[0])
+        self.assertIn("Local não especificado", bulk[0])
+        self.assertIn("Bruno Lima", bulk[1])
+        self.assertIn("09:00 - 10:30", generate_email_html("Ana Souza", [_event()]))
+
+    def test_teams_message_uses_first_name(self):
+        message = generate_teams_message("Ana Souza", [_event()])
+        self.assertIn("Bom dia, Ana!", message)
+        self.assertIn("09:00 - 10:30", message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import time
+import unittest
+from collections import Counter
+
+from config import Config
+from fake_graph_case import FakeGraphTestCase
+from m365_reminder_project import models, token_cache
+from m365_reminder_project.fake_graph import FakeTenant
+from m365_reminder_project.metrics import get_metrics
+from m365_reminder_project.scheduler import (
+    ReminderScheduler,
+    local_day,
+    local_midnight,
+    parse_time_of_day,
+    send_slot,
+    send_time,
+)
+
+HOUR = 3600
+
+
+class TestSendTimes(unittest.TestCase):
+
+    def setUp(self):
+        self.original = Config.TIMEZONE_OFFSET
+
+    def tearDown(self):
+        Config.TIMEZONE_OFFSET = self.original
+
+    def test_parse_time_of_day(self):
+        self.assertEqual(parse_time_of_day("07:30"), 450)
+        for value in ("7h", "24:00", "07:60"):
+            with self.assertRaises(ValueError):
+                parse_time_of_day(value)
+
+    def test_slots_are_stable_and_spread_across_the_window(self):
+        slots = [send_slot(f"user-{i}", 120) for i in range(6000)]
+
+        self.assertEqual(slots[:10], [send_slot(f"user-{i}", 120) for i in range(10)])
+        self.assertTrue(all(0 <= slot < 120 * 60 for slot in slots))
+        # ~50 usuários por minuto; nenhum minuto concentra o envio
+        per_minute = Counter(slot // 60 for slot in slots)
+        self.assertEqual(len(per_minute), 120)
+        self.assertLess(max(per_minute.values()), 100)
+        self.assertEqual(send_slot("user-0", 0), 0)
+
+    def test_send_time_follows_local_timezone(self):
+        Config.TIMEZONE_OFFSET = -3
+        day = local_day(time.time())
+        due = send_time("user-0", day, window_start=7 * 60, window_minutes=0)
+
+        # 07:00 em UTC-3 são 10:00 UTC
+        self.assertEqual(due - local_midnight(day), 7 * HOUR)
+        self.assertEqual(time.gmtime(due).tm_hour, 10)
+
+
+# Executa o agendador contra o Graph simulado, com instantes controlados
+class TestReminderScheduler(FakeGraphTestCase):
+    SETTINGS = ("TIMEZONE_OFFSET", "SCHEDULE_WINDOW_START", "SCHEDULE_WINDOW_MINUTES")
+
+    def make_tenant(self):
+        return FakeTenant(users=20)
+
+    def setUp(self):
+        super().setUp()
+        Config.TIMEZONE_OFFSET = 0
+        Config.SCHEDULE_WINDOW_START = "07:00"
+        Config.SCHEDULE_WINDOW_MINUTES = 60
+        self.midnight = local_midnight(local_day(time.time()))
+
+    def test_reminders_are_sent_at_each_user_slot(self):
+        reports = []
+        scheduler = ReminderScheduler(tick=1, report=lambda: reports.append(1))
+
+        wait = scheduler.run_once(self.midnight + 6 * HOUR)
+        self.assertEqual(scheduler.pending, 20)
+        self.assertNotIn("sendmail", self.tenant.requests)
+        self.assertGreaterEqual(wait, HOUR)
+
+        scheduler.run_once(self.midnight + 7.5 * HOUR)
+        self.assertTrue(0 < self.tenant.requests["sendmail"] < 20)
+
+        wait = scheduler.run_once(self.midnight + 8 * HOUR)
+        self.assertEqual(self.tenant.requests["sendmail"], 20)
+        self.assertEqual(scheduler.summary["succeeded"], 20)
+        self.assertEqual(scheduler.pending, 0)
+        self.assertEqual(reports, [1])
+        # Aguarda a próxima meia-noite local
+        self.assertEqual(wait, 16 * HOUR)
+        # Token e lista de usuários obtidos uma única vez no dia
+        self.assertEqual(self.tenant.requests["token"], 1)
+        self.assertEqual(self.tenant.requests["users"], 1)
+
+    def test_metrics_and_caches_are_reset_each_day(self):
+        reports = []
+        scheduler = ReminderScheduler(
+            tick=1, report=lambda: reports.append(get_metrics().summary())
+        )
+
+        scheduler.run_once(self.midnight + 8 * HOUR)
+        self.assertIn("sendmail", reports[0])
+        # O relatório do dia seguinte não inclui as chamadas deste dia
+        self.assertEqual(get_metrics().summary(), {})
+
+        entry = ("Ana", "ana@example.com", "required", "accepted")
+        models._attendee_tuples[entry] = entry
+        token_cache._superseded.add("token-antigo")
+        scheduler.run_once(self.midnight + 30 * HOUR)
+        self.assertEqual(models._attendee_tuples, {})
+        self.assertEqual(token_cache._superseded, set())
+
+    def test_edited_meetings_are_not_served_from_a_previous_dispatch(self):
+        scheduler = ReminderScheduler(tick=1)
+        scheduler.run_once(self.midnight + 6 * HOUR)
+        # Usuários 0 a 9 compartilham as mesmas reuniões (mesmo iCalUId)
+        group = sorted(
+            (due, user["id"])
+            for due, _, user in scheduler._queue
+            if int(user["id"].rsplit("-", 1)[-1]) < 10
+        )
+        scheduler.run_once(group[0][0])
+
+        events = self.tenant.events
+
+        def edited_events(user_id):
+            edited = events(user_id)
+            for event in edited:
+                event["subject"] += " (alterada)"
+            return edited
+
+        self.tenant.events = edited_events
+        scheduler.run_once(self.midnight + 8 * HOUR)
+
+        (first,) = [c for (u, _), c in self.tenant.files.items() if u == group[0][1]]
+        (last,) = [c for (u, _), c in self.tenant.files.items() if u == group[-1][1]]
+        self.assertNotIn("(alterada)", first.decode())
+        self.assertIn("(alterada)", last.decode())
+
+    def test_restarted_daemon_does_not_resend(self):
+        ReminderScheduler().run_once(self.midnight + 8 * HOUR)
+        ReminderScheduler().run_once(self.midnight + 8 * HOUR)
+
+        self.assertEqual(self.tenant.requests["sendmail"], 20)
+        self.assertEqual(self.tenant.requests["users"], 2)
+
+    def test_failed_cycle_does_not_stop_the_daemon(self):
+        scheduler = ReminderScheduler(tick=0.01)
+        calls = []
+
+        def run_once():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("Graph indisponível")
+            scheduler.stop()
+            return 0
+
+        scheduler.run_once = run_once
+        scheduler.run()
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
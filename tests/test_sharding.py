@@ -0,0 +1,203 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from config import Config
+from m365_reminder_project.delivery_ledger import (
+    EMAIL,
+    DeliveryLedger,
+    get_delivery_ledger,
+    ledger_day,
+)
+from m365_reminder_project.fake_graph import FakeGraphServer, FakeTenant
+from m365_reminder_project.sharding import (
+    HashRing,
+    filter_shard,
+    merge_shards,
+    parse_shard,
+    run_local_shards,
+    seed_shards,
+    shard_path,
+    shard_stats_path,
+)
+from m365_reminder_project.state_store import StateStore, close_state_store
+
+
+class TestHashRing(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("4/4", "-1/4", "1", "a/b", "0/0"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_shards_partition_users_evenly(self):
+        users = [{"id": f"user-{i}"} for i in range(8000)]
+        shards = [list(filter_shard(users, index, 4)) for index in range(4)]
+
+        self.assertEqual(sum(len(shard) for shard in shards), len(users))
+        ids = [{u["id"] for u in shard} for shard in shards]
+        self.assertEqual(set().union(*ids), {u["id"] for u in users})
+        for shard in shards:
+            self.assertGreater(len(shard), 1600)
+            self.assertLess(len(shard), 2400)
+
+    def test_adding_a_shard_moves_few_users(self):
+        before, after = HashRing(4), HashRing(5)
+        ids = [f"user-{i}" for i in range(8000)]
+        moved = sum(before.shard_for(i) != after.shard_for(i) for i in ids)
+        # O ideal é 1/5 dos usuários; a divisão por módulo moveria ~4/5
+        self.assertLess(moved / len(ids), 0.3)
+
+    def test_shard_paths(self):
+        self.assertEqual(
+            shard_path("/var/lib/app/state.db", 1, 4),
+            "/var/lib/app/state.shard-1-of-4.db",
+        )
+        self.assertEqual(
+            shard_stats_path(1, 4, "/var/lib/app/state.db"),
+            "/var/lib/app/state.shard-1-of-4.json",
+        )
+
+
+class TestShardMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.original = {
+            name: getattr(Config, name)
+            for name in ("STATE_DB_FILE", "LOG_FILE", "LOG_CONSOLE")
+        }
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        Config.STATE_DB_FILE = os.path.join(self.tmp_dir.name, "state.db")
+        Config.LOG_FILE = os.path.join(self.tmp_dir.name, "run.log")
+        Config.LOG_CONSOLE = False
+        close_state_store()
+
+    def tearDown(self):
+        close_state_store()
+        for name, value in self.original.items():
+            setattr(Config, name, value)
+        self.tmp_dir.cleanup()
+
+    def _write_shard(self, index, count, summary, delivered):
+        store = StateStore(shard_path(Config.STATE_DB_FILE, index, count))
+        DeliveryLedger(store).record(ledger_day(), EMAIL, delivered)
+        store.close()
+        metrics = {
+            "sendmail": {
+                "buckets": [0, 0, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2],
+                "count": 2,
+                "sum": 0.06,
+                "retries": 1,
+                "bytes_sent": 10,
+                "bytes_received": 0,
+                "statuses": {"202": 2},
+            }
+        }
+        with open(shard_stats_path(index, count), "w") as f:
+            json.dump({"summary": summary, "metrics": metrics}, f)
+
+    def test_merges_summaries_metrics_and_ledgers(self):
+        self._write_shard(
+            0, 3, {"processed": 2, "succeeded": 2, "failed": 0}, [("a", True)]
+        )
+        self._write_shard(
+            1, 3, {"processed": 1, "succeeded": 0, "failed": 1}, [("b", False)]
+        )
+
+        merged = merge_shards(3)
+
+        self.assertEqual(
+            merged["summary"],
+            {"processed": 3, "succeeded": 2, "failed": 1, "skipped": 0},
+        )
+        self.assertEqual(merged["missing"], [2])
+        sendmail = merged["metrics"]["sendmail"]
+        self.assertEqual(sendmail["count"], 4)
+        self.assertEqual(sendmail["retries"], 2)
+        self.assertEqual(sendmail["statuses"], {"202": 4})
+        self.assertEqual(sendmail["p50"], 0.025)
+        self.assertEqual(
+            get_delivery_ledger().delivered(ledger_day(), ["a", "b"]),
+            {"a": {EMAIL}, "b": set()},
+        )
+
+    def test_seeds_shard_ledgers_from_the_main_ledger(self):
+        users = [f"user-{i}" for i in range(20)]
+        get_delivery_ledger().record(
+            ledger_day(), EMAIL, [(user_id, user_id != "user-0") for user_id in users]
+        )
+
+        seed_shards(3)
+
+        ring = HashRing(3)
+        for index in range(3):
+            store = StateStore(shard_path(Config.STATE_DB_FILE, index, 3))
+            delivered = DeliveryLedger(store).delivered(ledger_day(), users)
+            store.close()
+            expected = {
+                user_id: (
+                    {EMAIL}
+                    if ring.shard_for(user_id) == index and user_id != "user-0"
+                    else set()
+                )
+                for user_id in users
+            }
+            self.assertEqual(delivered, expected)
+
+
+# Executa a implantação de referência (processos locais) contra o Graph simulado
+class TestLocalShards(unittest.TestCase):
+
+    def test_local_shards_cover_every_user_once(self):
+        tenant = FakeTenant(users=40)
+        with tempfile.TemporaryDirectory() as tmp_dir, FakeGraphServer(
+            tenant
+        ) as server:
+            env = {
+                "CLIENT_ID": "client",
+                "CLIENT_SECRET": "secret",
+                "TENANT_ID": "tenant",
+                "ADMIN_EMAIL": "admin@example.com",
+                "GRAPH_BASE_URL": server.graph_url,
+                "LOGIN_BASE_URL": server.login_url,
+                "STATE_DB_FILE": os.path.join(tmp_dir, "state.db"),
+                "LOG_FILE": os.path.join(tmp_dir, "run.log"),
+                "LOG_CONSOLE": "false",
+                "TOKEN_CACHE_FILE": "",
+                "GRAPH_BATCH_SIZE": "5",
+            }
+            original = {
+                name: getattr(Config, name)
+                for name in ("STATE_DB_FILE", "LOG_FILE", "LOG_CONSOLE")
+            }
+            Config.STATE_DB_FILE = env["STATE_DB_FILE"]
+            Config.LOG_FILE = env["LOG_FILE"]
+            Config.LOG_CONSOLE = False
+            close_state_store()
+            try:
+                with patch.dict(os.environ, env):
+                    merged = run_local_shards(2)
+                    # Retomada com outra divisão: nada é enviado de novo
+                    resumed = run_local_shards(3, resume=True)
+                delivered = get_delivery_ledger().delivered(
+                    ledger_day(), [f"user-{i}" for i in range(40)]
+                )
+            finally:
+                close_state_store()
+                for name, value in original.items():
+                    setattr(Config, name, value)
+
+        self.assertEqual(merged["missing"], [])
+        self.assertEqual(merged["summary"]["succeeded"], 40)
+        self.assertEqual(tenant.requests["sendmail"], 40)
+        self.assertEqual(tenant.requests["drive"], 40)
+        self.assertTrue(all(EMAIL in channels for channels in delivered.values()))
+        self.assertEqual(resumed["missing"], [])
+        self.assertEqual(resumed["summary"]["succeeded"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
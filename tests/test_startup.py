@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Módulos caros que não podem ser importados antes de a execução começar
+HEAVY_MODULES = ("requests", "tenacity", "jinja2", "numpy", "smtplib", "email.mime")
+
+
+# Executa o Python com -X importtime e retorna (código de saída, stdout, módulos
+# importados)
+def _run_importtime(args, env=None):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    modules = {
+        line.split("|")[2].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "cumulative" not in line
+    }
+    return result.returncode, result.stdout, modules
+
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.env = dict(
+            os.environ,
+            CLIENT_ID="client",
+            CLIENT_SECRET="secret",
+            TENANT_ID="tenant",
+            ADMIN_EMAIL="admin@example.com",
+            STATE_DB_FILE=os.path.join(self.tmp_dir.name, "state.db"),
+            LOG_FILE=os.path.join(self.tmp_dir.name, "run.log"),
+            SYNC_MODE="full",
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertNotImported(self, modules):
+        for heavy in HEAVY_MODULES:
+            self.assertNotIn(heavy, modules)
+
+    def test_importing_main_is_light(self):
+        returncode, _, modules = _run_importtime(["-c", "import main"], self.env)
+
+        self.assertEqual(returncode, 0)
+        self.assertIn("main", modules)
+        self.assertNotImported(modules)
+
+    def test_check_config_exits_before_heavy_imports(self):
+        returncode, stdout, modules = _run_importtime(
+            ["main.py", "--check-config"], self.env
+        )
+
+        self.assertEqual(returncode, 0)
+        self.assertIn("Configuração válida", stdout)
+        self.assertNotImported(modules)
+
+    def test_check_config_reports_problems(self):
+        env = dict(self.env, CLIENT_ID="", SYNC_MODE="weekly")
+        returncode, _, _ = _run_importtime(["main.py", "--check-config"], env)
+
+        self.assertEqual(returncode, 1)
+
+    def test_check_config_lists_problems(self):
+        import main as reminder_main
+        from config import Config
+
+        original = Config.CLIENT_ID, Config.SYNC_MODE
+        Config.CLIENT_ID, Config.SYNC_MODE = None, "weekly"
+        try:
+            problems = reminder_main.check_config()
+        finally:
+            Config.CLIENT_ID, Config.SYNC_MODE = original
+
+        self.assertTrue(any("CLIENT_ID" in problem for problem in problems))
+        self.assertTrue(any("SYNC_MODE" in problem for problem in problems))
+
+    def test_rendering_defers_template_environment(self):
+        returncode, _, modules = _run_importtime(
+            ["-c", "import m365_reminder_project.rendering"], self.env
+        )
+
+        self.assertEqual(returncode, 0)
+        self.assertNotIn("jinja2", modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from m365_reminder_project.api import call_graph_api, call_graph_batch
+from m365_reminder_project.throttling import (
+    AdaptiveConcurrencyLimiter,
+    GraphRateLimiter,
+    TokenBucket,
+    get_rate_limiter,
+    is_retryable,
+    mailbox_for_endpoint,
+    reset_rate_limiter,
+    retry_after_seconds,
+)
+
+
+def _http_error(status_code):
+    return requests.exceptions.HTTPError(response=MagicMock(status_code=status_code))
+
+
+class TestM365Throttling(unittest.TestCase):
+
+    def setUp(self):
+        reset_rate_limiter()
+
+    def tearDown(self):
+        reset_rate_limiter()
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_after_seconds({"Retry-After": "7"}), 7.0)
+        self.assertIsNone(retry_after_seconds({}))
+        self.assertEqual(retry_after_seconds({"Retry-After": "soon"}, 0), 0)
+
+    def test_mailbox_for_endpoint(self):
+        self.assertEqual(
+            mailbox_for_endpoint("/users/ABC/calendar/events?$top=1"), "abc"
+        )
+        self.assertEqual(
+            mailbox_for_endpoint("https://graph.microsoft.com/v1.0/users/abc/sendMail"),
+            "abc",
+        )
+        self.assertIsNone(mailbox_for_endpoint("/chats"))
+
+    def test_only_transient_errors_are_retried(self):
+        self.assertTrue(is_retryable(_http_error(429)))
+        self.assertTrue(is_retryable(_http_error(503)))
+        self.assertTrue(is_retryable(requests.exceptions.ConnectionError()))
+        self.assertFalse(is_retryable(_http_error(404)))
+        self.assertFalse(is_retryable(ValueError()))
+
+    def test_token_bucket_waits_for_deficit_and_pause(self):
+        bucket = TokenBucket(rate=10, capacity=1)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+
+        bucket.pause(5)
+        self.assertGreater(bucket.reserve(), 4.9)
+
+    def test_concurrency_limit_is_aimd(self):
+        limiter = AdaptiveConcurrencyLimiter(8, cooldown=0)
+        limiter.on_throttle()
+        self.assertEqual(limiter.limit, 4)
+        limiter.on_success()
+        self.assertAlmostEqual(limiter.limit, 4.25)
+        for _ in range(100):
+            limiter.on_success()
+        self.assertEqual(limiter.limit, 8)
+
+    def test_throttle_pauses_only_the_affected_mailbox(self):
+        limiter = GraphRateLimiter(tenant_rps=100, mailbox_rps=10, max_concurrency=4)
+        limiter.on_response("/users/a/sendMail", 429, {"Retry-After": "30"})
+
+        self.assertEqual(limiter.throttled, 1)
+        self.assertGreater(limiter._mailbox_bucket("a").reserve(), 29)
+        self.assertEqual(limiter._mailbox_bucket("b").reserve(), 0.0)
+        self.assertEqual(limiter.tenant_bucket.reserve(), 0.0)
+
+    def test_batch_items_are_charged_to_their_mailboxes(self):
+        limiter = GraphRateLimiter(tenant_rps=0, mailbox_rps=2, max_concurrency=4)
+        endpoints = ["/users/a/sendMail"] * 4 + ["/users/b/calendarView", "/chats"]
+
+        with patch("m365_reminder_project.throttling.time.sleep") as mock_sleep:
+            wait = limiter.acquire_mailboxes(endpoints)
+
+        # 4 itens da caixa "a" com capacidade 2 a 2 requisições/s: ~1s de espera
+        self.assertAlmostEqual(wait, 1.0, delta=0.1)
+        mock_sleep.assert_called_once_with(wait)
+        self.assertGreater(limiter._mailbox_bucket("a").reserve(0), 0.9)
+        self.assertEqual(limiter._mailbox_bucket("b").reserve(0), 0.0)
+
+    @patch("m365_reminder_project.api.call_graph_api")
+    def test_batch_waits_for_a_paused_mailbox(self, mock_call_graph_api):
+        mock_call_graph_api.return_value = {
+            "responses": [{"id": "0", "status": 200, "body": {}}]
+        }
+        get_rate_limiter().on_response("/users/a/sendMail", 429, {"Retry-After": "30"})
+
+        with patch("m365_reminder_project.throttling.time.sleep") as mock_sleep:
+            call_graph_batch(
+                "fake_token", [{"method": "GET", "url": "/users/a/events"}]
+            )
+
+        self.assertGreater(mock_sleep.call_args.args[0], 29)
+        mock_call_graph_api.assert_called_once()
+
+    @patch("requests.Session.get")
+    def test_call_graph_api_honors_retry_after(self, mock_get):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "3"})
+        throttled.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            response=throttled
+        )
+        ok = MagicMock(status_code=200, headers={}, text='{"value": []}')
+        ok.json.return_value = {"value": []}
+        mock_get.side_effect = [throttled, ok]
+
+        with patch.object(call_graph_api.retry, "sleep") as mock_sleep, patch(
+            "m365_reminder_project.throttling.time.sleep"
+        ):
+            result = call_graph_api("fake_token", "/users/abc/calendar/events")
+
+        self.assertEqual(result, {"value": []})
+        self.assertEqual(mock_get.call_count, 2)
+        mock_sleep.assert_called_once_with(3.0)
+
+    @patch("requests.Session.get")
+    def test_call_graph_api_does_not_retry_client_errors(self, mock_get):
+        not_found = MagicMock(status_code=404, headers={}, text="")
+        not_found.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            response=not_found
+        )
+        mock_get.return_value = not_found
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            call_graph_api("fake_token", "/users/abc")
+        self.assertEqual(mock_get.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
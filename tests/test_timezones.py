@@ -0,0 +1,160 @@
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import requests
+
+from config import Config
+from fake_graph_case import FakeGraphTestCase
+from m365_reminder_project.api import _local_days, get_user_zones
+from m365_reminder_project.fake_graph import FakeTenant
+from m365_reminder_project.models import Event
+from m365_reminder_project.rendering import format_event_time
+from m365_reminder_project.scheduler import local_midnight, send_time
+from m365_reminder_project.timezones import (
+    day_bounds,
+    default_zone,
+    get_timezone_cache,
+    resolve_zone,
+)
+
+_SETTINGS = ("TIMEZONE", "TIMEZONE_OFFSET", "USER_TIMEZONE_TTL")
+
+TOKYO = ZoneInfo("Asia/Tokyo")
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def _event(start, end):
+    return Event("event1", "Planejamento", "Pauta", start, end, None, None, [], False)
+
+
+class TestTimezoneConversion(unittest.TestCase):
+
+    def setUp(self):
+        self.original = {name: getattr(Config, name) for name in _SETTINGS}
+        Config.TIMEZONE = ""
+        Config.TIMEZONE_OFFSET = -3
+
+    def tearDown(self):
+        for name, value in self.original.items():
+            setattr(Config, name, value)
+
+    def test_resolves_windows_and_iana_names(self):
+        self.assertEqual(
+            resolve_zone("E. South America Standard Time"),
+            ZoneInfo("America/Sao_Paulo"),
+        )
+        self.assertEqual(resolve_zone("Asia/Tokyo"), TOKYO)
+        self.assertIsNone(resolve_zone("Customized Time Zone"))
+        self.assertIsNone(resolve_zone(None))
+
+        hits = resolve_zone.cache_info().hits
+        resolve_zone("E. South America Standard Time")
+        self.assertEqual(resolve_zone.cache_info().hits, hits + 1)
+
+    def test_default_zone_prefers_iana_name(self):
+        self.assertEqual(default_zone().utcoffset(None), timedelta(hours=-3))
+        Config.TIMEZONE = "America/New_York"
+        self.assertEqual(default_zone(), NEW_YORK)
+
+    def test_day_bounds_follow_daylight_saving(self):
+        # Início do horário de verão nos EUA: o dia local tem 23 horas
+        start, end = day_bounds(NEW_YORK, date(2025, 3, 9))
+        self.assertEqual(start, datetime(2025, 3, 9, 5, 0, tzinfo=timezone.utc))
+        self.assertEqual(end - start, timedelta(hours=23, microseconds=-1))
+
+    def test_day_bounds_are_computed_once_per_zone(self):
+        names = [
+            "E. South America Standard Time",
+            "Eastern Standard Time",
+            "GMT Standard Time",
+            "India Standard Time",
+            "Tokyo Standard Time",
+        ]
+        zones = [resolve_zone(names[i % len(names)]) for i in range(10000)]
+        day_bounds.cache_clear()
+
+        windows = [_local_days(zone=zone) for zone in zones]
+
+        self.assertEqual(day_bounds.cache_info().misses, len(names))
+        self.assertEqual(len(set(windows)), len(names))
+
+    def test_event_times_are_formatted_in_the_user_zone(self):
+        event = _event(
+            datetime(2025, 6, 11, 12, 0, tzinfo=timezone.utc),
+            datetime(2025, 6, 11, 13, 30, tzinfo=timezone.utc),
+        )
+        self.assertEqual(format_event_time(event), "09:00 - 10:30")
+        self.assertEqual(format_event_time(event, TOKYO), "21:00 - 22:30")
+        # Em junho Nova York está no horário de verão (UTC-4)
+        self.assertEqual(format_event_time(event, NEW_YORK), "08:00 - 09:30")
+
+    def test_send_time_uses_the_user_window_within_the_scheduler_day(self):
+        day = date(2025, 6, 11)
+        due = send_time(
+            "user-0", day, window_start=7 * 60, window_minutes=0, zone=TOKYO
+        )
+
+        # 07:00 em Tóquio do dia 12 são 22:00 UTC do dia 11, dentro do dia 11 em
+        # UTC-3 (03:00 UTC do dia 11 às 03:00 UTC do dia 12)
+        self.assertTrue(local_midnight(day) <= due < local_midnight(date(2025, 6, 12)))
+        local = datetime.fromtimestamp(due, TOKYO)
+        self.assertEqual((local.day, local.hour, local.minute), (12, 7, 0))
+
+
+class TestUserTimezones(FakeGraphTestCase):
+    SETTINGS = _SETTINGS
+
+    def make_tenant(self):
+        tenant = FakeTenant(users=3)
+        tenant.time_zones = {
+            "user-1": "Tokyo Standard Time",
+            "user-2": "Customized Time Zone",
+        }
+        return tenant
+
+    def setUp(self):
+        super().setUp()
+        Config.TIMEZONE = ""
+        Config.TIMEZONE_OFFSET = -3
+        Config.USER_TIMEZONE_TTL = 3600
+        self.user_ids = ["user-0", "user-1", "user-2"]
+
+    def test_zones_are_fetched_once_and_cached(self):
+        zones = get_user_zones("token", self.user_ids)
+
+        self.assertEqual(zones, [ZoneInfo("America/Sao_Paulo"), TOKYO, default_zone()])
+        self.assertEqual(self.tenant.requests["time_zone"], 3)
+        self.assertEqual(
+            get_timezone_cache().get_many(["user-1"])["user-1"][0],
+            "Tokyo Standard Time",
+        )
+
+        # Dentro do USER_TIMEZONE_TTL os fusos vêm do cache
+        self.assertEqual(get_user_zones("token", self.user_ids), zones)
+        self.assertEqual(self.tenant.requests["time_zone"], 3)
+
+    def test_expired_zones_are_fetched_again(self):
+        get_user_zones("token", self.user_ids)
+        Config.USER_TIMEZONE_TTL = 0
+        self.tenant.time_zones["user-0"] = "Eastern Standard Time"
+
+        zones = get_user_zones("token", self.user_ids)
+
+        self.assertEqual(zones[0], NEW_YORK)
+        self.assertEqual(self.tenant.requests["time_zone"], 6)
+
+    def test_failed_batch_falls_back_to_the_default_zone(self):
+        with patch(
+            "m365_reminder_project.api.call_graph_batch",
+            side_effect=requests.exceptions.ConnectionError("falha no $batch"),
+        ):
+            zones = get_user_zones("token", self.user_ids)
+
+        self.assertEqual(zones, [default_zone()] * 3)
+        self.assertEqual(get_timezone_cache().get_many(self.user_ids), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
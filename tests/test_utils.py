@@ -0,0 +1,69 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from m365_reminder_project.models import Event
+from m365_reminder_project.utils import detect_conflict_clusters, detect_conflicts
+
+BASE = datetime(2025, 6, 11, 8, 0)
+
+
+def _event(event_id, start_minute, end_minute):
+    return Event(
+        event_id,
+        event_id,
+        None,
+        BASE + timedelta(minutes=start_minute),
+        BASE + timedelta(minutes=end_minute),
+        None,
+        None,
+        [],
+        False,
+    )
+
+
+# Implementação de referência: compara todos os pares de eventos
+def _pairwise_conflicts(events):
+    sorted_events = sorted(events, key=lambda x: x.start_datetime)
+    conflicts = []
+    for i in range(len(sorted_events)):
+        for j in range(i + 1, len(sorted_events)):
+            event1, event2 = sorted_events[i], sorted_events[j]
+            if max(event1.start_datetime, event2.start_datetime) < min(
+                event1.end_datetime, event2.end_datetime
+            ):
+                conflicts.append((event1, event2))
+    return conflicts
+
+
+class TestM365Conflicts(unittest.TestCase):
+
+    def test_detect_conflicts(self):
+        a = _event("a", 0, 60)
+        b = _event("b", 30, 90)
+        c = _event("c", 90, 120)  # começa exatamente quando b termina
+        self.assertEqual(detect_conflicts([c, b, a]), [(a, b)])
+
+    def test_matches_pairwise_comparison(self):
+        rng = random.Random(42)
+        for _ in range(50):
+            events = []
+            for i in range(rng.randint(0, 40)):
+                start = rng.randint(0, 600)
+                events.append(_event(str(i), start, start + rng.randint(0, 120)))
+            self.assertEqual(detect_conflicts(events), _pairwise_conflicts(events))
+
+    def test_conflict_clusters(self):
+        a = _event("a", 0, 60)
+        b = _event("b", 30, 90)
+        c = _event("c", 80, 100)  # conflita apenas com b
+        d = _event("d", 200, 230)
+        e = _event("e", 210, 220)
+        f = _event("f", 300, 330)
+        self.assertEqual(
+            detect_conflict_clusters([f, e, d, c, b, a]), [[a, b, c], [d, e]]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()